@@ -4,7 +4,7 @@ setuptools.setup(
     name='conan-workspace',
     version='0.1',
     entry_points = {
-        'console_scripts': ['workspace=workspace.workspace:main']},
+        'console_scripts': ['workspace=workspace.client:main']},
     packages=setuptools.find_packages(),
     install_requires=[
         'networkx',
@@ -0,0 +1,61 @@
+import unittest
+
+from workspace.build import *
+from test.workspace_test import WorkspaceTestCase
+
+
+class BuildTest(WorkspaceTestCase):
+    """
+    Tests of the build of the workspace of create_workspace.
+    """
+
+    def build(self, force = False):
+        self.conan.calls = []
+        return build(self.workspace, 2, force)
+
+    def test_build_order(self):
+        # WHEN
+        results = self.build()
+        # THEN the packages are built after the packages on which they depend
+        self.assertEqual(['c', 'b', 'a'], self.conan.call_names('build'))
+        self.assertEqual({'a': 'built', 'b': 'built', 'c': 'built'}, {name: result.value for name, result in results.items()})
+        self.assertEqual((3, 0), (self.workspace.run_installs, self.workspace.skipped_installs))
+
+    def test_unchanged_packages_are_skipped(self):
+        # GIVEN a workspace that was built
+        self.build()
+        # WHEN
+        results = self.build()
+        # THEN
+        self.assertEqual([], self.conan.call_names('build'))
+        self.assertEqual('skipped', results['a'].value)
+        # WHEN a source that is not committed changes, THEN the package and its dependents are built again
+        self.change('b')
+        self.build()
+        self.assertEqual(['b', 'a'], self.conan.call_names('build'))
+        # WHEN an untracked file is added, THEN nothing is built
+        self.change('c', 'build.log')
+        self.build()
+        self.assertEqual([], self.conan.call_names('build'))
+        # WHEN the build is forced
+        self.build(force=True)
+        self.assertEqual(['c', 'b', 'a'], self.conan.call_names('build'))
+
+    def test_failure_cancels_dependents(self):
+        # GIVEN
+        self.conan.failing.add('b')
+        # WHEN
+        results = self.build()
+        # THEN
+        self.assertEqual('succeeded', results['c'].status)
+        self.assertEqual('failed', results['b'].status)
+        self.assertEqual('cancelled', results['a'].status)
+        self.assertNotIn('a', self.conan.call_names('build'))
+        # WHEN b is fixed, THEN c is not built again
+        self.conan.failing.clear()
+        self.build()
+        self.assertEqual(['b', 'a'], self.conan.call_names('build'))
+
+
+if __name__ == '__main__':
+    unittest.main()
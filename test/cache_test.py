@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from workspace.cache import *
+from test.workspace_test import WorkspaceTestCase
+
+
+class InputCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, '.workspace', 'install_cache.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_record(self):
+        # GIVEN
+        cache = InputCache(self.path)
+        self.assertFalse(cache.is_current('a', '1'))
+        # WHEN
+        cache.record('a', '1')
+        cache.record('b', '2')
+        cache.forget('b')
+        # THEN the digests are saved
+        loaded = InputCache(self.path)
+        self.assertTrue(loaded.is_current('a', '1'))
+        self.assertFalse(loaded.is_current('a', '2'))
+        self.assertFalse(loaded.is_current('b', '2'))
+
+    def test_digest(self):
+        def digest(*inputs):
+            result = Digest()
+            for name, value in inputs:
+                result.add(name, value)
+            return result.hexdigest()
+        self.assertEqual(digest(('a', 1)), digest(('a', '1')))
+        self.assertNotEqual(digest(('a', 1), ('b', 2)), digest(('b', 2), ('a', 1)))
+        # The inputs are separated, such that they cannot be confused.
+        self.assertNotEqual(digest(('ab', 'c')), digest(('a', 'bc')))
+        missing = Digest()
+        missing.add_file('file', os.path.join(self.directory.name, 'missing'))
+        self.assertEqual(digest(('file', None)), missing.hexdigest())
+
+
+class InstallCacheTest(WorkspaceTestCase):
+    """
+    Tests of the installs of the workspace of create_workspace that are skipped when their inputs did not change.
+    """
+
+    def test_unchanged_installs_are_skipped(self):
+        # GIVEN a workspace that was pegged
+        self.change('c')
+        self.workspace.peg('Change c')
+        self.conan.calls = []
+        # WHEN it is pegged again without changes
+        self.workspace.peg()
+        # THEN
+        self.assertEqual([], self.conan.call_names('install'))
+        self.workspace.peg(force_install=True)
+        self.assertEqual(['c', 'b', 'a'], self.conan.call_names('install'))
+
+    def test_changed_inputs_are_installed(self):
+        # GIVEN installed packages
+        for name in ['c', 'b', 'a']:
+            self.workspace.install(self.workspace.package(name))
+        self.conan.calls = []
+        # WHEN the files of an install of b are removed and the editable of c changes
+        os.remove(os.path.join(self.root, 'b', 'conaninfo.txt'))
+        self.workspace.package('c').close()
+        for name in ['c', 'b', 'a']:
+            self.workspace.install(self.workspace.package(name))
+        # THEN b is installed again, and so are the packages that depend on c
+        self.assertEqual(['b', 'a'], self.conan.call_names('install'))
+
+    def test_conan_home(self):
+        # GIVEN installed packages with a Conan home
+        os.makedirs(os.path.join(self.directory, '.conan', 'profiles'))
+        with mock.patch.dict(os.environ, {"CONAN_USER_HOME": self.directory}):
+            self.workspace.install(self.workspace.package('c'))
+            self.conan.calls = []
+            # WHEN the default profile of the Conan home changes
+            with open(os.path.join(self.directory, '.conan', 'profiles', 'default'), 'w') as file:
+                file.write('[settings]\n')
+            self.workspace.install(self.workspace.package('c'))
+        # THEN
+        self.assertEqual(['c'], self.conan.call_names('install'))
+
+    def test_failed_install_is_not_recorded(self):
+        # GIVEN
+        self.conan.failing = {'c'}
+        with self.assertRaises(Exception):
+            self.workspace.install(self.workspace.package('c'))
+        self.conan.failing = set()
+        # WHEN
+        self.workspace.install(self.workspace.package('c'))
+        # THEN
+        self.assertEqual(['c', 'c'], self.conan.call_names('install'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from workspace.conan import *
+
+
+class FakeConanError(Exception):
+    pass
+
+
+class FakeApi:
+    """ The methods of the Conan API that the tests call, with the parameters of a Conan version. """
+    def __init__(self):
+        self.calls = []
+
+    def editable_add(self, path, reference, layout, cwd):
+        self.calls.append(('editable_add', path, reference, layout, cwd))
+
+    def install(self, path = "", name = None, cwd = None):
+        self.calls.append(('install', path, cwd))
+        if path == 'broken':
+            raise FakeConanError('Broken.')
+
+    def source(self, path, source_folder = None, cwd = None):
+        self.calls.append(('source', path))
+
+
+class ApiConanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.conan = ApiConan(supervised=False)
+        self.conan._api = FakeApi()
+        self.conan.error_type = FakeConanError
+
+    def test_call(self):
+        # Arguments that are None and that the method does not accept are dropped.
+        self.assertTrue(self.conan.editable_add('/a', 'a/1.0.1.x@user/channel', '/'))
+        self.assertEqual(('editable_add', '/a', 'a/1.0.1.x@user/channel', None, '/'), self.conan.api.calls[-1])
+        self.assertTrue(self.conan.install('/a'))
+        self.assertEqual(('install', '/a', '/a'), self.conan.api.calls[-1])
+        # Errors of Conan are failures.
+        with mock.patch('builtins.print'):
+            self.assertFalse(self.conan.install('broken'))
+
+    def test_wrong_call(self):
+        # An argument that the method does not accept is not dropped.
+        with self.assertRaises(Exception):
+            self.conan.source('/a')
+        # A required parameter must be given.
+        with self.assertRaises(Exception):
+            self.conan.call(self.conan.api.editable_add, path='/a', reference='a/1.0.1.x@user/channel', cwd='/')
+        self.assertEqual([], self.conan.api.calls)
+
+    def test_calls_one_at_a_time(self):
+        # GIVEN an API method that records how many calls run at the same time
+        running = []
+        peak = []
+
+        def install(path, cwd = None):
+            running.append(path)
+            peak.append(len(running))
+            time.sleep(0.02)
+            running.remove(path)
+        self.conan.api.install = install
+        # WHEN
+        threads = [threading.Thread(target=self.conan.install, args=(str(index),)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # THEN
+        self.assertEqual(1, max(peak))
+
+    def test_supervised(self):
+        # GIVEN
+        conan = ApiConan(timeouts={'conan install': 5})
+        conan._api = FakeApi()
+        # WHEN
+        with mock.patch('workspace.process.run', return_value=subprocess.CompletedProcess([], 0)) as run:
+            self.assertTrue(conan.install('/a'))
+        # THEN the install runs in a supervised process with the timeouts
+        run.assert_called_once_with(['conan', 'install', '.'], cwd='/a', timeouts={'conan install': 5})
+        self.assertEqual([], conan.api.calls)
+
+    def test_editables(self):
+        # GIVEN
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, ".conan"))
+            editables = {"a/1.0.1.x@user/channel": {"path": "/a", "layout": None}}
+            with open(os.path.join(directory, ".conan", "editable_packages.json"), 'w') as json_file:
+                json.dump(editables, json_file)
+            # THEN the editables are read without loading the API
+            with mock.patch.dict(os.environ, {"CONAN_USER_HOME": directory}):
+                self.assertEqual(editables, ApiConan().editables())
+                self.assertEqual(editables, SubprocessConan().editables())
+
+    def test_conan_backend(self):
+        self.assertIsInstance(conan_backend('subprocess'), SubprocessConan)
+        with mock.patch('importlib.util.find_spec', return_value=None):
+            self.assertIsInstance(conan_backend(), SubprocessConan)
+            with self.assertRaises(ImportError):
+                conan_backend('api')
+        with mock.patch('importlib.util.find_spec', return_value=object()):
+            # The API is not loaded before it is used.
+            self.assertIsNone(conan_backend()._api)
+            # Only the api backend installs in this process.
+            self.assertIsNotNone(conan_backend().supervised)
+            self.assertIsNone(conan_backend('api').supervised)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import contextlib
+import io
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+from workspace.daemon import *
+from test.workspace_test import WorkspaceTestCase, git
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), 'The daemon uses Unix domain sockets.')
+class DaemonTest(WorkspaceTestCase):
+    """
+    Tests of a daemon of the workspace of create_workspace.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # The daemon replaces the standard output, which must not outlive the test.
+        self.stdout = mock.patch('sys.stdout', io.StringIO())
+        self.stdout.start()
+        self.daemon = WorkspaceDaemon(self.workspace)
+
+    def tearDown(self):
+        self.stdout.stop()
+        super().tearDown()
+
+    def request(self, method, **params):
+        return self.daemon.dispatch({"jsonrpc": "2.0", "id": 7, "method": method, "params": params})
+
+    def editable(self, name):
+        return [status["editable"] for status in self.request('status')["result"] if status["name"] == name][0]
+
+    def test_dispatch(self):
+        response = self.request('list', branch=True)
+        self.assertEqual(7, response["id"])
+        self.assertEqual(3, len(response["result"]))
+        self.assertEqual(-32601, self.request('unknown')["error"]["code"])
+        self.assertEqual(-32000, self.request('close', packages=['unknown'])["error"]["code"])
+
+    def test_mutation_clears_cache(self):
+        # GIVEN a cached status
+        self.assertTrue(self.editable('c'))
+        # WHEN
+        response = self.request('close', packages=['c'])
+        # THEN
+        self.assertIn('output', response["result"])
+        self.assertFalse(self.editable('c'))
+
+    def test_file_change_clears_cache(self):
+        # GIVEN a cached list
+        self.assertNotIn('other', ' '.join(self.request('list', branch=True)["result"]))
+        # WHEN the branch of a package is changed outside of the daemon
+        git(os.path.join(self.root, 'b'), 'checkout', '-q', '-b', 'other')
+        self.daemon.check_for_changes()
+        # THEN
+        self.assertIn('other', ' '.join(self.request('list', branch=True)["result"]))
+
+    def test_watched_editables(self):
+        with mock.patch.dict(os.environ, {"CONAN_USER_HOME": self.directory}):
+            self.assertIn(os.path.join(self.directory, ".conan", "editable_packages.json"), self.daemon.package_paths())
+
+    def test_operations_are_recorded(self):
+        # WHEN
+        self.request('list')
+        self.request('list')
+        self.request('status')
+        self.request('close')
+        # THEN
+        self.assertEqual(['list', 'list', 'status', 'close'], [record["operation"] for record in self.workspace.history.records()])
+        self.assertEqual(-32601, self.request('peg')["error"]["code"])
+
+    def test_failed_action_output(self):
+        # GIVEN
+        def action():
+            print('Pegging c')
+            raise Exception('Broken.')
+        # WHEN
+        with self.assertRaises(ActionError) as context:
+            self.daemon.mutate(action)
+        # THEN what the action printed is kept
+        self.assertEqual('Broken.', str(context.exception))
+        self.assertEqual('Pegging c\n', context.exception.output)
+
+    def test_output_per_thread(self):
+        # GIVEN two threads that print at the same time, of which one captures its output
+        started = threading.Event()
+        printed = threading.Event()
+
+        def other():
+            started.wait(10)
+            print('other')
+            printed.set()
+        thread = threading.Thread(target=other)
+        thread.start()
+        # WHEN
+        with thread_output().capture() as output:
+            print('request')
+            started.set()
+            printed.wait(10)
+        thread.join()
+        # THEN
+        self.assertEqual('request\n', output.getvalue())
+        self.assertEqual('other\n', sys.stdout.stream.getvalue())
+
+    def test_client(self):
+        # GIVEN a running daemon
+        server = self.daemon.create_server()
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            # THEN a client gets the answers of the daemon
+            with WorkspaceClient.connect(self.root) as client:
+                self.assertEqual(self.request('list')["result"], client.call('list'))
+                with self.assertRaises(Exception):
+                    client.call('close', packages=['unknown'])
+            # THEN the commands are run on the daemon, unless the daemon is not used
+            output = io.StringIO()
+            with mock.patch('os.getcwd', return_value=self.root), contextlib.redirect_stdout(output):
+                self.assertTrue(run_on_daemon(create_parser().parse_args(['list'])))
+                self.assertFalse(run_on_daemon(create_parser().parse_args(['--no-daemon', 'list'])))
+                self.assertFalse(run_on_daemon(create_parser().parse_args(['download', 'c'])))
+            self.assertEqual(3, len(output.getvalue().splitlines()))
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        # THEN without a daemon the commands run in this process
+        os.remove(socket_path(self.root))
+        self.assertEqual(None, WorkspaceClient.connect(self.root))
+        with mock.patch('os.getcwd', return_value=self.root):
+            self.assertFalse(run_on_daemon(create_parser().parse_args(['list'])))
+
+
+if __name__ == '__main__':
+    unittest.main()
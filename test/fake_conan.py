@@ -0,0 +1,46 @@
+import os
+
+from workspace.conan import *
+
+
+class FakeConan(Conan):
+    """
+    A Conan backend for tests that keeps the editables in memory and records the calls.
+    Install, source and build fail for the packages whose directory name is in failing.
+    """
+    def __init__(self):
+        self.editable_packages = {}
+        self.calls = []
+        self.failing = set()
+
+    def editable_add(self, path, reference, cwd = None):
+        self.calls.append(('editable_add', reference))
+        self.editable_packages[reference] = {"path": path, "layout": None}
+        return True
+
+    def editable_remove(self, reference):
+        self.calls.append(('editable_remove', reference))
+        return self.editable_packages.pop(reference, None) is not None
+
+    def editables(self):
+        return dict(self.editable_packages)
+
+    def install(self, directory):
+        self.calls.append(('install', os.path.basename(directory)))
+        if os.path.basename(directory) in self.failing:
+            return False
+        with open(os.path.join(directory, "conaninfo.txt"), "w") as file:
+            file.write("[settings]\n")
+        return True
+
+    def source(self, directory):
+        self.calls.append(('source', os.path.basename(directory)))
+        return os.path.basename(directory) not in self.failing
+
+    def build(self, directory):
+        self.calls.append(('build', os.path.basename(directory)))
+        return os.path.basename(directory) not in self.failing
+
+    def call_names(self, name):
+        """ Return the arguments of the calls of the given operation in order. """
+        return [argument for call, argument in self.calls if call == name]
@@ -0,0 +1,102 @@
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+from workspace.foreach import *
+from test.workspace_test import WorkspaceTestCase
+
+
+class OutputPrinterTest(unittest.TestCase):
+
+    def test_prefix(self):
+        # GIVEN
+        stream = io.StringIO()
+        printer = OutputPrinter(3, stream=stream)
+        # WHEN
+        printer.line('a', 'first')
+        printer.line('abc', 'second')
+        printer.finished('a')
+        # THEN every line is prefixed with its package
+        self.assertEqual('a   | first\nabc | second\n', stream.getvalue())
+
+    def test_group(self):
+        # GIVEN
+        stream = io.StringIO()
+        printer = OutputPrinter(3, True, stream)
+        # WHEN the output of two packages is interleaved
+        printer.line('a', 'first')
+        printer.line('b', 'other')
+        printer.line('a', 'second')
+        self.assertEqual('', stream.getvalue())
+        printer.finished('a')
+        printer.finished('b')
+        # THEN the output of a package is printed in one block
+        self.assertEqual('==> a\nfirst\nsecond\n==> b\nother\n', stream.getvalue())
+
+    def test_exit_status(self):
+        self.assertEqual(0, exit_status({'a': TaskResult('a', 'succeeded', 0)}))
+        self.assertEqual(3, exit_status({'a': TaskResult('a', 'failed', 3), 'b': TaskResult('b', 'failed', 1)}))
+        self.assertEqual(1, exit_status({'a': TaskResult('a', 'succeeded', 0), 'b': TaskResult('b', 'cancelled')}))
+        self.assertEqual(1, exit_status({'a': TaskResult('a', 'failed', None, 'Timed out.')}))
+
+
+@unittest.skipUnless(os.name == 'posix', 'The tests use a POSIX shell.')
+class ForeachTest(WorkspaceTestCase):
+    """
+    Tests of commands that run in the packages of the workspace of create_workspace.
+    """
+
+    def foreach(self, command, editable_only = False, topological = False, timeout = 0):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            results = foreach(self.workspace, command, editable_only, topological, 2, timeout=timeout)
+        return results, output.getvalue()
+
+    def test_foreach(self):
+        # WHEN
+        results, output = self.foreach(['sh', '-c', 'echo $(basename $PWD); test $(basename $PWD) != b'])
+        # THEN the command runs in every package and its output is prefixed with the package
+        self.assertEqual(['a | a', 'b | b', 'c | c'], sorted(output.splitlines()))
+        self.assertEqual({'a': 0, 'b': 1, 'c': 0}, {name: result.value for name, result in results.items()})
+        self.assertEqual(1, exit_status(results))
+
+    def test_selection(self):
+        # GIVEN b is not editable
+        self.workspace.package('b').close()
+        # WHEN
+        results, output = self.foreach(['true'], editable_only=True)
+        # THEN
+        self.assertEqual(['a', 'c'], sorted(results))
+
+    def test_topological(self):
+        # GIVEN a command that fails in b, on which a depends
+        results, output = self.foreach(['sh', '-c', 'test $(basename $PWD) != b'], topological=True)
+        # THEN the packages are run after their dependencies, and a is cancelled
+        self.assertEqual('succeeded', results['c'].status)
+        self.assertEqual('failed', results['b'].status)
+        self.assertEqual('cancelled', results['a'].status)
+        self.assertEqual(['c', 'b', 'a'], list(results))
+
+    def test_command_not_found(self):
+        # WHEN
+        results, output = self.foreach(['no-such-command-of-the-workspace'])
+        # THEN
+        self.assertEqual(127, exit_status(results))
+        self.assertIn('Command not found: no-such-command-of-the-workspace', output)
+
+    def test_timeout(self):
+        # GIVEN a command of which the prefix has a short timeout
+        with mock.patch.dict(process.supervisor.timeouts, {'sleep': 0.1}):
+            # WHEN
+            results, output = self.foreach(['sleep', '0.5'])
+            # THEN the timeouts of the commands of the workspace do not apply
+            self.assertEqual(0, exit_status(results))
+        # WHEN a timeout is given, THEN the command is stopped
+        results, output = self.foreach(['sleep', '30'], timeout=0.5)
+        self.assertEqual({'failed'}, {result.status for result in results.values()})
+        self.assertIn('did not finish within', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
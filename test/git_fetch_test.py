@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from workspace.git import *
+from test.git_refs_test import git
+
+
+class GitFetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.root = self.temporary_directory.name
+        self.origin = os.path.join(self.root, 'origin')
+        os.mkdir(self.origin)
+        git(self.origin, 'init', '-q')
+        git(self.origin, 'commit', '-q', '--allow-empty', '-m', 'init')
+        git(self.origin, 'branch', 'develop')
+        git(self.root, 'clone', '-q', self.origin, 'clone')
+        self.clone = os.path.join(self.root, 'clone')
+        # The remote gets new commits on its branches and new feature branches.
+        git(self.origin, 'commit', '-q', '--allow-empty', '-m', 'master')
+        git(self.origin, 'checkout', '-q', '-b', 'feature/other')
+        git(self.origin, 'commit', '-q', '--allow-empty', '-m', 'other')
+        self.other_revision = git(self.origin, 'rev-parse', 'HEAD')
+        git(self.origin, 'checkout', '-q', 'master')
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_fetch_branches(self):
+        # WHEN
+        self.assertTrue(Git(self.clone).fetch_branches(['master', 'develop', 'missing']))
+        # THEN only the given branches that changed are fetched
+        self.assertEqual(git(self.origin, 'rev-parse', 'master'), Git(self.clone).ref_revision('refs/remotes/origin/master'))
+        self.assertEqual(None, Git(self.clone).ref_revision('refs/remotes/origin/feature/other'))
+        self.assertNotIn('feature/other', Git(self.clone).remote_branches())
+
+    def test_fetch_revision(self):
+        # GIVEN a revision that is only on a branch that is not fetched
+        self.assertFalse(Git(self.clone).has_commit(self.other_revision))
+        # WHEN
+        self.assertTrue(Git(self.clone).fetch_branches(['master'], self.other_revision))
+        # THEN
+        self.assertTrue(Git(self.clone).has_commit(self.other_revision))
+        self.assertNotIn('feature/other', Git(self.clone).remote_branches())
+
+    def test_unreachable_remote(self):
+        # GIVEN
+        git(self.clone, 'remote', 'set-url', 'origin', os.path.join(self.root, 'missing'))
+        # THEN the failure is not mistaken for a remote without the branches
+        with self.assertRaises(Exception):
+            Git(self.clone).remote_heads(['master'])
+        with self.assertRaises(Exception):
+            Git(self.clone).fetch_branches(['master'])
+
+    def test_full_fetch(self):
+        self.assertTrue(Git(self.clone).fetch())
+        self.assertIn('feature/other', Git(self.clone).remote_branches())
+
+
+if __name__ == '__main__':
+    unittest.main()
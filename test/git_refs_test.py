@@ -0,0 +1,117 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from workspace.git import *
+
+
+def git(directory, *args):
+    command = ['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com', '-c', 'init.defaultBranch=master'] + list(args)
+    completed_process = subprocess.run(command, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if completed_process.returncode != 0:
+        raise Exception(completed_process.stderr.decode('utf-8'))
+    return completed_process.stdout.decode('utf-8').strip()
+
+
+class GitRefsTest(unittest.TestCase):
+    """
+    Conformance tests that compare the answers of the refs reader with those of git.
+    """
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.root = self.temporary_directory.name
+        self.origin = os.path.join(self.root, 'origin')
+        os.mkdir(self.origin)
+        git(self.origin, 'init', '-q')
+        for number in range(3):
+            with open(os.path.join(self.origin, 'conanfile.py'), 'a') as file:
+                file.write('# %d\n' % number)
+            git(self.origin, 'commit', '-q', '-a' if number else '--allow-empty', '-m', str(number))
+            if number == 0:
+                git(self.origin, 'add', 'conanfile.py')
+                git(self.origin, 'commit', '-q', '-m', 'add')
+        git(self.origin, 'branch', 'develop', 'HEAD~1')
+        git(self.origin, 'branch', 'feature/nested')
+        self.clone = os.path.join(self.root, 'clone')
+        git(self.root, 'clone', '-q', self.origin, 'clone')
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def assertConforms(self, directory):
+        fast = Git(directory)
+        slow = Git(directory, read_refs=False)
+        refs = GitRefs(directory)
+        # The refs reader must answer these queries itself rather than fall back to git.
+        refs.revision()
+        refs.branch()
+        refs.local_branches()
+        refs.full_remote_branches()
+        refs.remotes()
+        self.assertEqual(slow.revision(), fast.revision())
+        self.assertEqual(slow.branch(), fast.branch())
+        self.assertEqual(slow.local_branches(), fast.local_branches())
+        self.assertEqual(slow.local_branches_of(slow.revision()), fast.local_branches_of(fast.revision()))
+        self.assertEqual(slow.full_remote_branches(), fast.full_remote_branches())
+        self.assertEqual(slow.remote_branches(), fast.remote_branches())
+        self.assertEqual(slow.upstream_branch(), fast.upstream_branch())
+        self.assertEqual(slow.remotes(), fast.remotes())
+
+    def test_repository(self):
+        self.assertConforms(self.origin)
+
+    def test_clone(self):
+        git(self.clone, 'checkout', '-q', '-b', 'develop', 'origin/develop')
+        git(self.clone, 'branch', 'local-only')
+        self.assertConforms(self.clone)
+        self.assertEqual('origin/develop', Git(self.clone).upstream_branch())
+
+    def test_packed_refs(self):
+        git(self.clone, 'pack-refs', '--all')
+        git(self.clone, 'commit', '-q', '--allow-empty', '-m', 'loose')
+        self.assertConforms(self.clone)
+        self.assertIn('refs/heads/master', GitRefs(self.clone).packed_refs())
+
+    def test_detached_head(self):
+        git(self.clone, 'checkout', '-q', 'HEAD~1')
+        self.assertConforms(self.clone)
+        self.assertEqual(None, Git(self.clone).branch())
+
+    def test_worktree(self):
+        git(self.clone, 'worktree', 'add', '-q', '-b', 'other', os.path.join(self.root, 'worktree'), 'origin/develop')
+        self.assertConforms(os.path.join(self.root, 'worktree'))
+        self.assertConforms(self.clone)
+
+    def test_separate_git_directory(self):
+        directory = os.path.join(self.root, 'separate')
+        git(self.root, 'clone', '-q', '--separate-git-dir', os.path.join(self.root, 'separate.git'), self.origin, 'separate')
+        self.assertTrue(os.path.isfile(os.path.join(directory, '.git')))
+        self.assertConforms(directory)
+
+    def test_several_remotes(self):
+        git(self.clone, 'remote', 'add', 'mirror', self.origin)
+        git(self.clone, 'fetch', '-q', 'mirror')
+        git(self.clone, 'branch', '--set-upstream-to', 'mirror/develop')
+        self.assertConforms(self.clone)
+
+    def test_remote_settings(self):
+        git(self.clone, 'config', 'remote.pushDefault', 'origin')
+        self.assertConforms(self.clone)
+        self.assertEqual(['origin'], GitRefs(self.clone).remotes())
+
+    def test_fallback(self):
+        # GIVEN a repository with an unborn branch, which the refs reader does not support
+        directory = os.path.join(self.root, 'empty')
+        os.mkdir(directory)
+        git(directory, 'init', '-q')
+        with self.assertRaises(UnsupportedRepository):
+            GitRefs(directory).branch()
+        # THEN the answers of git are used
+        self.assertEqual(Git(directory, read_refs=False).branch(), Git(directory).branch())
+        self.assertEqual([], Git(directory).local_branches())
+
+
+if __name__ == '__main__':
+    unittest.main()
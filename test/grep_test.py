@@ -0,0 +1,57 @@
+import contextlib
+import io
+import os
+import unittest
+
+from workspace.grep import *
+from test.workspace_test import WorkspaceTestCase
+
+
+class GrepTest(WorkspaceTestCase):
+    """
+    Tests of the search of the workspace of create_workspace.
+    """
+
+    def test_grep(self):
+        # GIVEN
+        streamed = []
+        # WHEN
+        matches = grep(self.workspace, ['c/1\\.0'], on_match=streamed.append)
+        # THEN the matches are in the order of the packages, with package-relative paths
+        self.assertEqual(['a/conan.lock', 'a/conanfile.py', 'b/conanfile.py'], ['%s/%s' % (match.package, match.path) for match in matches])
+        self.assertEqual(2, matches[1].line_number)
+        self.assertEqual(sorted(map(str, matches)), sorted(map(str, streamed)))
+
+    def test_options(self):
+        self.assertEqual(['a', 'b'], [match.package for match in grep(self.workspace, ['c/1.0'], conanfiles_only=True, fixed_strings=True)])
+        self.assertEqual(['a', 'b', 'c'], [match.package for match in grep(self.workspace, ['^# [ABC]$'], ignore_case=True, related='c')])
+        self.assertEqual([], grep(self.workspace, ['^# [ABC]$']))
+        with self.assertRaises(Exception):
+            grep(self.workspace, ['x'], related='unknown')
+
+    def test_check_pins(self):
+        # GIVEN a consistent workspace
+        self.assertEqual([], check_pins(self.workspace))
+        # WHEN b pins a revision of c that the workspace does not use
+        conanfile = os.path.join(self.root, 'b', 'conanfile.py')
+        with open(conanfile, 'a') as file:
+            file.write("# c/1.0.0.%s@user/channel\n" % self.revisions['b'])
+        # THEN
+        messages = check_pins(self.workspace)
+        self.assertEqual(1, len(messages))
+        self.assertTrue(messages[0].startswith('b/conanfile.py:3 pins c/1.0.0.'))
+
+    def test_peg_checks_pins(self):
+        # GIVEN
+        self.change('c')
+        # WHEN
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.workspace.peg('Change c')
+        # THEN the pins are consistent after the peg
+        self.assertNotIn('Warning', output.getvalue())
+        self.assertIn("c/1.0.2.%s" % self.revision('c'), self.conanfile('b'))
+
+
+if __name__ == '__main__':
+    unittest.main()
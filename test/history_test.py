@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from workspace.history import *
+
+
+class HistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = History(os.path.join(self.directory.name, ".workspace", "history.sqlite"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_percentile(self):
+        self.assertEqual(None, percentile([], 50))
+        self.assertEqual(3, percentile([5, 1, 3], 50))
+        self.assertEqual(2.5, percentile([1, 2, 3, 4], 50))
+        self.assertEqual(4, percentile([1, 2, 3, 4], 100))
+
+    def test_record(self):
+        # GIVEN an operation with two phases
+        with self.history.record('peg', 12) as record:
+            with self.history.phase('check'):
+                pass
+            with self.history.phase('install'):
+                # A nested operation is part of the outer operation.
+                with self.history.record('download', 12) as nested:
+                    self.assertIs(record, nested)
+        # THEN
+        records = self.history.records()
+        self.assertEqual(1, len(records))
+        self.assertEqual('peg', records[0]["operation"])
+        self.assertEqual(12, records[0]["package_count"])
+        self.assertEqual({'check', 'install'}, set(records[0]["phases"]))
+
+    def test_on_start(self):
+        # GIVEN
+        started = []
+        self.history.on_start.append(lambda record: started.append(record.operation))
+        # WHEN
+        with self.history.record('peg', 3):
+            with self.history.record('download', 3):
+                pass
+        with self.history.record('list', 3):
+            pass
+        # THEN only the outer operations are started
+        self.assertEqual(['peg', 'list'], started)
+
+    def test_failed_operations_are_not_reported(self):
+        # GIVEN an operation that fails
+        with self.assertRaises(ValueError):
+            with self.history.record('fetch', 3):
+                raise ValueError()
+        # THEN
+        self.assertEqual([], self.history.records())
+
+    def test_regression(self):
+        # GIVEN fast runs of peg followed by slow runs, and runs of list with a stable duration
+        for index in range(10):
+            self.history.add('peg', index, 10, 1.0, {}, 20)
+            self.history.add('list', index, 10, 0.5, {}, 40)
+        for index in range(10, 15):
+            self.history.add('peg', index, 10, 2.0, {}, 20)
+            self.history.add('list', index, 10, 0.5, {}, 40)
+        # WHEN
+        statistics = {entry["operation"]: entry for entry in self.history.statistics()}
+        # THEN
+        self.assertTrue(statistics['peg']["regression"])
+        self.assertEqual(2.0, statistics['peg']["recent_median"])
+        self.assertEqual(1.0, statistics['peg']["previous_median"])
+        self.assertFalse(statistics['list']["regression"])
+        self.assertEqual(15, statistics['list']["count"])
+        self.assertEqual(['peg'], [entry["operation"] for entry in self.history.statistics('peg')])
+
+
+if __name__ == '__main__':
+    unittest.main()
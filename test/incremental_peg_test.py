@@ -0,0 +1,58 @@
+import contextlib
+import io
+import os
+import unittest
+
+from test.workspace_test import WorkspaceTestCase, git
+
+
+class IncrementalPegTest(WorkspaceTestCase):
+    """
+    Tests of the incremental peg and the dry run of a peg of the workspace of create_workspace.
+    """
+
+    def test_incremental_plan(self):
+        # GIVEN
+        self.change('b')
+        # THEN
+        self.assertEqual(['b', 'a'], self.workspace.peg_plan(incremental=True))
+        self.assertEqual(['c', 'b', 'a'], self.workspace.peg_plan())
+
+    def test_committed_change_is_changed(self):
+        # GIVEN a change that was committed but not pegged
+        self.change('c')
+        git(os.path.join(self.root, 'c'), 'commit', '-q', '-a', '-m', 'Change c')
+        # THEN
+        self.assertEqual(['c'], self.workspace.changed_package_names())
+        self.assertEqual(['c', 'b', 'a'], self.workspace.peg_plan(incremental=True))
+
+    def test_incremental_peg(self):
+        # GIVEN
+        self.change('b')
+        revision = self.revision('c')
+        # WHEN
+        self.workspace.peg('Change b', incremental=True)
+        # THEN only b and the packages that depend on it are pegged and installed
+        self.assertEqual(revision, self.revision('c'))
+        self.assertEqual(['b', 'a'], self.conan.call_names('install'))
+        self.assertIn("'b/1.0.2.%s@user/channel'" % self.revision('b'), self.conanfile('a'))
+        self.assertEqual([], self.workspace.changed_package_names())
+
+    def test_dry_run(self):
+        # GIVEN
+        self.change('b')
+        conanfile = self.conanfile('a')
+        # WHEN
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.workspace.peg('Change b', incremental=True, dry_run=True)
+        # THEN the plan is printed and nothing is changed
+        self.assertIn('Packages affected by the peg (2 of 3): b, a', output.getvalue())
+        self.assertEqual(conanfile, self.conanfile('a'))
+        self.assertEqual([], self.conan.calls)
+        self.assertFalse(self.workspace.peg_journal().exists())
+        self.assertEqual('peg --dry-run', self.workspace.history.records()[-1]["operation"])
+
+
+if __name__ == '__main__':
+    unittest.main()
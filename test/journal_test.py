@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from workspace.journal import *
+from workspace.workspace import Workspace
+from test.workspace_test import WorkspaceTestCase, git
+
+
+class PegJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, '.workspace', 'peg_journal.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_record(self):
+        # GIVEN
+        journal = PegJournal(self.path)
+        journal.start(['c', 'b'], 'Change c')
+        journal.record(peg_step('c'), revision='1' * 40)
+        journal.record(pin_step('b', 'c'), revision='1' * 40)
+        # WHEN
+        loaded = PegJournal.load(self.path)
+        # THEN
+        self.assertEqual(['c', 'b'], loaded.editable_package_names)
+        self.assertEqual('Change c', loaded.commit_message)
+        self.assertEqual('1' * 40, loaded.step(peg_step('c'))["revision"])
+        self.assertEqual(None, loaded.step(install_step('c')))
+        self.assertTrue(loaded.has_changed('c'))
+        self.assertTrue(loaded.has_changed('b'))
+        self.assertFalse(loaded.has_changed('a'))
+        loaded.finish()
+        self.assertFalse(journal.exists())
+
+    def test_start_discards_steps(self):
+        journal = PegJournal(self.path)
+        journal.start(['c'], None)
+        journal.record(install_step('c'))
+        journal.start(['c'], None)
+        self.assertEqual(None, PegJournal.load(self.path).step(install_step('c')))
+
+
+class PegResumeTest(WorkspaceTestCase):
+    """
+    Tests of a peg of the workspace of create_workspace that is resumed after it failed or was interrupted.
+    """
+
+    def test_resume(self):
+        # GIVEN a peg that fails to install b
+        self.change('c')
+        self.conan.failing = {'b'}
+        with self.assertRaises(Exception):
+            self.workspace.peg('Change c')
+        revision = self.revision('c')
+        self.conan.failing = set()
+        self.conan.calls = []
+        # WHEN
+        self.workspace.peg(resume=True)
+        # THEN the completed steps are not done again
+        self.assertEqual(revision, self.revision('c'))
+        self.assertEqual(['b', 'a'], self.conan.call_names('install'))
+        self.assertNotIn('c/1.0.2.%s@user/channel' % revision, self.conan.call_names('editable_add'))
+        self.assertFalse(self.workspace.peg_journal().exists())
+
+    def test_resume_interrupted_pin(self):
+        # GIVEN a peg without a commit message that is interrupted after the revision of c was pinned in b and a
+        self.change('c')
+        git(os.path.join(self.root, 'c'), 'commit', '-q', '-a', '-m', 'Change c')
+        editable_add = self.conan.editable_add
+
+        def interrupted_editable_add(path, reference, cwd = None):
+            if reference.startswith('b/'):
+                raise KeyboardInterrupt()
+            return editable_add(path, reference, cwd)
+        with mock.patch.object(self.conan, 'editable_add', interrupted_editable_add):
+            with self.assertRaises(KeyboardInterrupt):
+                self.workspace.peg()
+        self.assertNotEqual('', git(os.path.join(self.root, 'a'), 'status', '--porcelain', '--untracked-files=no'))
+        # WHEN
+        Workspace('a', self.root, self.conan).peg(resume=True)
+        # THEN the pins are committed
+        self.assertIn("'c/1.0.2.%s@user/channel'" % self.revision('c'), self.conanfile('b'))
+        self.assertIn("'b/1.0.2.%s@user/channel'" % self.revision('b'), self.conanfile('a'))
+        self.assertEqual('', git(os.path.join(self.root, 'a'), 'status', '--porcelain', '--untracked-files=no'))
+        self.assertFalse(self.workspace.peg_journal().exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
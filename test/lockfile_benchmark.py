@@ -0,0 +1,75 @@
+"""
+Compare the time and the peak memory of reading a lockfile with json.load and with the
+streaming loader of the workspace. Run it with python -m test.lockfile_benchmark.
+"""
+import json
+import os
+import time
+import tracemalloc
+from workspace.lockfile import *
+
+
+def benchmark(path, repeat = 3):
+    """
+    Measure the time and the peak memory of reading the nodes of the given lockfile, both with
+    json.load and with the streaming loader. Return a dictionary from the loader to its best
+    time in seconds and its peak memory in bytes.
+    """
+    def load():
+        with open(path) as json_file:
+            return json.load(json_file)["graph_lock"]["nodes"]
+
+    def stream():
+        return LockFile(path).graph_nodes()
+
+    result = {}
+    for name, loader in [('json', load), ('streaming', stream)]:
+        times = []
+        for index in range(repeat):
+            start = time.perf_counter()
+            loader()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        nodes = loader()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del nodes
+        result[name] = {"time": min(times), "peak_memory": peak}
+    return result
+
+
+def generate(path, node_count):
+    """
+    Write a lockfile with the given number of nodes, each of which requires up to
+    ten of the nodes after it, with the fields that Conan writes for every node.
+    """
+    nodes = {}
+    for index in range(node_count):
+        nodes[str(index)] = {
+            "ref": "package%d/1.0.%d.%040x@user/channel" % (index, index, index),
+            "options": "shared=False\nfPIC=True",
+            "package_id": "%040x" % (index * 7),
+            "prev": "0",
+            "requires": [str(dependency) for dependency in range(index + 1, min(index + 11, node_count))],
+            "context": "host"
+        }
+    with open(path, 'w') as json_file:
+        json.dump({"graph_lock": {"nodes": nodes, "revisions_enabled": False}, "version": "0.4"}, json_file, indent=1)
+
+
+if __name__ == '__main__':
+    import argparse
+    import tempfile
+    parser = argparse.ArgumentParser(description='Compare the time and the peak memory of reading a lockfile with json.load and with the streaming loader.')
+    parser.add_argument('lockfile', nargs='?', help='the lockfile to read; by default a lockfile is generated')
+    parser.add_argument('--nodes', type=int, default=20000, help='the number of nodes of the generated lockfile')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.lockfile
+        if not path:
+            path = os.path.join(directory, 'conan.lock')
+            generate(path, args.nodes)
+        print('%s: %.1f MB' % (path, os.path.getsize(path) / 1e6))
+        for name, measurement in benchmark(path, args.repeat).items():
+            print('%-10s %8.3fs %10.1f MB peak' % (name, measurement["time"], measurement["peak_memory"] / 1e6))
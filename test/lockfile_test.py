@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import unittest
+
+from workspace.lockfile import *
+from workspace.packagereference import *
+from test.lockfile_benchmark import generate
+from test.workspace_test import WorkspaceTestCase
+
+
+class LockFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'conan.lock')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertNodesEqual(self, expected, actual):
+        self.assertEqual(sorted(expected), sorted(actual))
+        for index, node in expected.items():
+            self.assertEqual(node["ref"], actual[index].ref)
+            self.assertEqual(node.get("requires", []), actual[index].requires)
+
+    def test_graph_nodes(self):
+        # GIVEN
+        generate(self.path, 50)
+        with open(self.path) as json_file:
+            expected = json.load(json_file)["graph_lock"]["nodes"]
+        # THEN the streaming loader reads the same nodes as json.load, regardless of the chunk size
+        for chunk_size in [1, 7, 100, 1 << 16]:
+            self.assertNodesEqual(expected, LockFile(self.path).graph_nodes(chunk_size))
+
+    def test_other_fields(self):
+        # GIVEN a lockfile with fields before and after the nodes
+        data = {
+            "profile_host": "[settings]\nos=Linux\n",
+            "graph_lock": {
+                "revisions_enabled": False,
+                "nodes": {
+                    "0": {"ref": "a/1.0.1.%s@user/channel" % ('1' * 40), "requires": ["1"], "options": "shared=True"},
+                    "1": {"ref": "b/1.0.1.%s@user/channel" % ('2' * 40), "modified": True}
+                },
+                "sizes": [1, 2.5, None, "}"]
+            },
+            "version": "0.4"
+        }
+        with open(self.path, 'w') as json_file:
+            json.dump(data, json_file)
+        # THEN
+        for chunk_size in [1, 3, 1 << 16]:
+            self.assertNodesEqual(data["graph_lock"]["nodes"], LockFile(self.path).graph_nodes(chunk_size))
+
+    def test_truncated_lockfile(self):
+        generate(self.path, 3)
+        with open(self.path) as json_file:
+            content = json_file.read()
+        with open(self.path, 'w') as json_file:
+            json_file.write(content[:len(content) // 2])
+        with self.assertRaises(ValueError):
+            LockFile(self.path).graph_nodes(5)
+
+    def test_requirement_ids_are_shared(self):
+        generate(self.path, 20)
+        nodes = LockFile(self.path).graph_nodes()
+        self.assertIs(nodes["5"].requires[0], nodes["4"].requires[1])
+
+    def test_update_references(self):
+        # GIVEN
+        nodes = {
+            "0": {"ref": "a/1.0.1.%s@user/channel" % ('1' * 40), "requires": ["1"]},
+            "1": {"ref": "b/1.0.1.%s@user/channel" % ('2' * 40), "modified": True}
+        }
+        with open(self.path, 'w') as json_file:
+            json.dump({"graph_lock": {"nodes": nodes}, "version": "0.4"}, json_file)
+        lock_file = LockFile(self.path)
+        # WHEN
+        references = {
+            'b': PackageReference.from_string("b/1.0.2.%s@user/channel" % ('3' * 40)),
+            'c': PackageReference.from_string("c/1.0.2.%s@user/channel" % ('4' * 40))
+        }
+        self.assertEqual(1, lock_file.update_references(references))
+        self.assertEqual(0, lock_file.update_references(references))
+        lock_file.save()
+        # THEN only the reference of b changed and the other fields are kept
+        saved = LockFile(self.path).nodes()
+        self.assertEqual("b/1.0.2.%s@user/channel" % ('3' * 40), saved["1"]["ref"])
+        self.assertEqual(nodes["0"], saved["0"])
+        self.assertTrue(saved["1"]["modified"])
+
+
+class LockFilePegTest(WorkspaceTestCase):
+    """
+    Tests of the lockfile of the main package of the workspace of create_workspace after a peg.
+    """
+
+    def test_peg_updates_lockfile(self):
+        # GIVEN
+        self.change('c')
+        # WHEN
+        self.workspace.peg('Change c')
+        # THEN the lockfile contains the new references, and is committed with the main package
+        nodes = LockFile(os.path.join(self.root, 'a', 'conan.lock')).nodes()
+        self.assertEqual('c/1.0.2.%s@user/channel' % self.revision('c'), nodes["2"]["ref"])
+        self.assertEqual('b/1.0.2.%s@user/channel' % self.revision('b'), nodes["1"]["ref"])
+        self.assertFalse(self.workspace.package('a').git.is_dirty())
+        # THEN the workspace uses the new references without reading the lockfile again,
+        # and the main package keeps the reference of the lockfile
+        self.assertEqual(self.revision('c'), self.workspace.main_references['c'].revision)
+        self.assertEqual(self.revisions['a'], self.workspace.main_references['a'].revision)
+        self.assertEqual([], self.workspace.changed_package_names())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import unittest
+
+from workspace.multistatus import *
+from test.workspace_test import WorkspaceTestCase, git
+
+
+class MultiStatusTest(WorkspaceTestCase):
+    workspace_names = ['first', 'second']
+
+    def setUp(self):
+        super().setUp()
+        os.mkdir(os.path.join(self.directory, 'other'))
+
+    def test_discover_workspaces(self):
+        first = os.path.join(self.directory, 'first')
+        self.assertEqual([(first, 'a'), (os.path.join(self.directory, 'second'), 'a')], discover_workspaces([self.directory]))
+        self.assertEqual([(first, 'a')], discover_workspaces([first]))
+
+    def test_multi_status(self):
+        # GIVEN a workspace with a package on another branch and a package with local changes
+        second = os.path.join(self.directory, 'second')
+        git(os.path.join(second, 'b'), 'checkout', '-q', '-b', 'other')
+        with open(os.path.join(second, 'c', 'conanfile.py'), 'a') as file:
+            file.write('# changed\n')
+        # WHEN
+        summaries = multi_status([self.directory], 2, self.conan)
+        # THEN
+        self.assertEqual([os.path.join(self.directory, 'first'), second], [summary["root"] for summary in summaries])
+        self.assertTrue(summaries[0]["consistent"])
+        self.assertEqual([], summaries[0]["dirty"])
+        self.assertFalse(summaries[1]["consistent"])
+        self.assertEqual([{"name": "b", "branch": "other"}], summaries[1]["other_branch"])
+        self.assertEqual(['c'], summaries[1]["dirty"])
+        self.assertEqual([], summaries[1]["invalid"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import threading
+import time
+import unittest
+
+from workspace.process import *
+
+
+@unittest.skipUnless(os.name == 'posix', 'The tests use a POSIX shell.')
+class SupervisorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.supervisor = Supervisor()
+
+    def test_timeout_of(self):
+        self.supervisor = Supervisor({'git fetch': 5, 'git gc': None})
+        self.assertEqual(5, self.supervisor.timeout_of(['git', 'fetch', 'origin']))
+        self.assertEqual(None, self.supervisor.timeout_of(['git', 'gc']))
+        self.assertEqual(120, self.supervisor.timeout_of(['git', 'status']))
+        self.assertEqual(None, self.supervisor.timeout_of(['make']))
+        # The timeouts of a workspace override those of the supervisor without changing them.
+        self.assertEqual(7, self.supervisor.timeout_of(['git', 'fetch'], {'git fetch': 7}))
+        self.assertEqual(5, self.supervisor.timeout_of(['git', 'fetch']))
+
+    def test_timeout(self):
+        # GIVEN a process that does not finish, with a child process
+        start = time.monotonic()
+        with self.assertRaises(ProcessTimeout):
+            self.supervisor.run(['sh', '-c', 'sleep 30 & sleep 30'], timeout=0.5)
+        # THEN the process is stopped at the timeout
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_cancel(self):
+        # GIVEN
+        threading.Timer(0.5, self.supervisor.cancel).start()
+        # THEN the running process is stopped and no processes are started until the supervisor is reset
+        with self.assertRaises(Cancelled):
+            self.supervisor.run(['sleep', '30'])
+        with self.assertRaises(Cancelled):
+            self.supervisor.run(['true'])
+        self.supervisor.reset()
+        self.assertEqual(0, self.supervisor.run(['true']).returncode)
+
+    def test_output(self):
+        # GIVEN
+        lines = []
+        self.supervisor.max_output = 8
+        # WHEN
+        completed_process = self.supervisor.run(['sh', '-c', 'echo one; echo two; echo three; exit 3'], stdout=subprocess.PIPE, on_line=lines.append)
+        # THEN all lines are streamed and the captured output is bounded
+        self.assertEqual(3, completed_process.returncode)
+        self.assertEqual(['one', 'two', 'three'], lines)
+        self.assertEqual(b'one\ntwo\n', completed_process.stdout)
+
+    def test_non_interactive(self):
+        completed_process = self.supervisor.run(['sh', '-c', 'echo $GIT_TERMINAL_PROMPT $CONAN_NON_INTERACTIVE; read line || echo no input'], stdout=subprocess.PIPE)
+        self.assertEqual(b'0 1\nno input\n', completed_process.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
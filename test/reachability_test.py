@@ -0,0 +1,70 @@
+import random
+import unittest
+
+import networkx as nx
+
+from workspace.reachability import *
+
+
+class ReachabilityIndexTest(unittest.TestCase):
+
+    def diamond(self):
+        # main depends on left and right, which both depend on base.
+        graph = nx.DiGraph()
+        graph.add_edges_from([("main", "left"), ("main", "right"), ("left", "base"), ("right", "base"), ("right", "extra")])
+        return graph
+
+    def test_ancestors_and_descendants(self):
+        # GIVEN a diamond shaped graph
+        index = ReachabilityIndex(self.diamond())
+        # THEN
+        self.assertEqual({"main", "left", "right"}, index.ancestors("base"))
+        self.assertEqual({"left", "right", "base", "extra"}, index.descendants("main"))
+        self.assertEqual(set(), index.ancestors("main"))
+        self.assertTrue(index.depends_on("main", "base"))
+        self.assertFalse(index.depends_on("base", "main"))
+        self.assertFalse(index.depends_on("left", "extra"))
+
+    def test_affected(self):
+        # GIVEN a diamond shaped graph
+        index = ReachabilityIndex(self.diamond())
+        # THEN
+        self.assertEqual({"extra", "right", "main"}, index.affected(["extra"]))
+        self.assertEqual({"left", "extra", "right", "main"}, index.affected(["left", "extra"]))
+
+    def test_levels(self):
+        # GIVEN a diamond shaped graph
+        index = ReachabilityIndex(self.diamond())
+        # THEN
+        self.assertEqual(0, index.level("base"))
+        self.assertEqual(2, index.level("main"))
+        self.assertEqual({"extra": 0, "right": 1, "main": 2}, index.levels(["extra", "right", "main"]))
+        self.assertEqual({"left": 0, "main": 1}, index.levels(["left", "main"]))
+
+    def test_critical_path(self):
+        # GIVEN a diamond shaped graph
+        index = ReachabilityIndex(self.diamond())
+        # THEN
+        self.assertEqual(3, len(index.critical_path(index.affected(["base"]))))
+        self.assertEqual(["extra", "right", "main"], index.critical_path(index.affected(["extra"])))
+        self.assertEqual([], index.critical_path([]))
+
+    def test_matches_networkx(self):
+        # GIVEN a random directed acyclic graph
+        generator = random.Random(42)
+        graph = nx.DiGraph()
+        names = ["package%d" % number for number in range(300)]
+        graph.add_nodes_from(names)
+        for number in range(1500):
+            first, second = sorted(generator.sample(range(len(names)), 2))
+            graph.add_edge(names[first], names[second])
+        index = ReachabilityIndex(graph)
+        # THEN
+        for name in names:
+            self.assertEqual(nx.ancestors(graph, name), index.ancestors(name))
+            self.assertEqual(nx.descendants(graph, name), index.descendants(name))
+        self.assertEqual(nx.dag_longest_path_length(graph) + 1, len(index.critical_path(names)))
+
+
+if __name__ == '__main__':
+    unittest.main()
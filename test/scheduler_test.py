@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+import unittest
+
+from workspace.scheduler import *
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_concurrent(self):
+        # GIVEN tasks that can only finish when they all run at the same time
+        barrier = threading.Barrier(3, timeout=10)
+        tasks = {name: barrier.wait for name in ['a', 'b', 'c']}
+        # WHEN
+        results = Scheduler(3).run(tasks)
+        # THEN
+        self.assertTrue(all(result.succeeded for result in results.values()))
+
+    def test_dependency_order(self):
+        # GIVEN a depends on b, and b on c
+        order = []
+        tasks = {name: (lambda name=name: order.append(name)) for name in ['a', 'b', 'c']}
+        # WHEN
+        Scheduler(3).run(tasks, {'a': ['b', 'x'], 'b': ['c']})
+        # THEN
+        self.assertEqual(['c', 'b', 'a'], order)
+
+    def test_failure_cancels_dependents(self):
+        # GIVEN
+        def fail():
+            raise Exception('Broken.')
+        tasks = {'a': lambda: 'a', 'b': lambda: TaskResult('b', 'failed', 2), 'c': fail, 'd': lambda: 'd'}
+        # WHEN
+        results = Scheduler(2).run(tasks, {'a': ['b'], 'b': ['d']})
+        # THEN
+        self.assertEqual('succeeded', results['d'].status)
+        self.assertEqual(('failed', 2), (results['b'].status, results['b'].value))
+        self.assertEqual(('failed', 'Broken.'), (results['c'].status, results['c'].error))
+        self.assertEqual('cancelled', results['a'].status)
+        self.assertEqual(None, results['a'].start)
+
+    def test_cycle(self):
+        tasks = {'a': lambda: None, 'b': lambda: None}
+        with self.assertRaises(Exception):
+            Scheduler(2).run(tasks, {'a': ['b'], 'b': ['a']})
+
+    def test_jobs(self):
+        # GIVEN
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def task():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+        # WHEN
+        Scheduler(2).run({str(index): task for index in range(6)})
+        # THEN
+        self.assertEqual(2, max(peak))
+
+    def test_queued_tasks_are_not_started(self):
+        # GIVEN
+        started = []
+
+        def interrupt(result):
+            raise KeyboardInterrupt()
+        # WHEN the run is interrupted while one task ran
+        with self.assertRaises(KeyboardInterrupt):
+            Scheduler(1).run({name: (lambda name=name: started.append(name)) for name in ['a', 'b', 'c']}, on_finished=interrupt)
+        process.reset()
+        # THEN the ready tasks that did not fit on the threads were not started
+        self.assertEqual(['a'], started)
+
+    @unittest.skipUnless(os.name == 'posix', 'The test uses a POSIX shell.')
+    def test_interrupt_cancels_processes(self):
+        # GIVEN a task with a process that does not finish, and a task that finishes once the process runs
+        running = threading.Event()
+        stopped = threading.Event()
+
+        def slow():
+            try:
+                process.run(['sh', '-c', 'echo running; sleep 30'], on_line=lambda line: running.set())
+            finally:
+                stopped.set()
+
+        def interrupt(result):
+            raise KeyboardInterrupt()
+        # WHEN the run is interrupted
+        start = time.monotonic()
+        with self.assertRaises(KeyboardInterrupt):
+            Scheduler(2).run({'slow': slow, 'quick': lambda: running.wait(10)}, on_finished=interrupt)
+        # THEN the run does not wait for the process, and the process is stopped
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertTrue(stopped.wait(10))
+        process.reset()
+
+
+if __name__ == '__main__':
+    unittest.main()
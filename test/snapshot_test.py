@@ -0,0 +1,68 @@
+import os
+import unittest
+
+from workspace.snapshot import *
+from test.workspace_test import WorkspaceTestCase, git
+
+
+class SnapshotTest(WorkspaceTestCase):
+    workspace_names = ['source']
+
+    def setUp(self):
+        super().setUp()
+        self.source = self.root
+        self.target = os.path.join(self.directory, 'target')
+        with open(os.path.join(self.source, 'workspace.yml'), 'w') as stream:
+            stream.write('git_prefix: %s/\n' % self.source)
+        # b is on a feature branch, one commit ahead of its pegged revision.
+        git(os.path.join(self.source, 'b'), 'checkout', '-q', '-b', 'feature')
+        git(os.path.join(self.source, 'b'), 'commit', '-q', '--allow-empty', '-m', 'ahead')
+        self.workspace = Workspace('a', self.source, self.conan)
+        self.workspace.package('c').close()
+
+    def test_snapshot(self):
+        snapshot = create_snapshot(self.workspace)
+        self.assertEqual('a', snapshot["main"])
+        self.assertEqual(['a', 'b', 'c'], [entry["name"] for entry in snapshot["packages"]])
+        b = snapshot["packages"][1]
+        self.assertEqual('feature', b["branch"])
+        self.assertEqual(git(os.path.join(self.source, 'b'), 'rev-parse', 'HEAD'), b["revision"])
+        self.assertEqual(2, b["sequence_in_branch"])
+        self.assertTrue(b["editable"])
+        self.assertFalse(snapshot["packages"][2]["editable"])
+
+    def test_restore(self):
+        # GIVEN
+        snapshot = create_snapshot(self.workspace)
+        self.conan.calls = []
+        # WHEN
+        workspace = restore_snapshot(self.target, snapshot, 2, conan=self.conan)
+        # THEN the packages are at the revisions and branches of the snapshot
+        for entry in snapshot["packages"]:
+            directory = os.path.join(self.target, entry["name"])
+            self.assertEqual(entry["revision"], git(directory, 'rev-parse', 'HEAD'))
+            self.assertEqual(entry["branch"], git(directory, 'rev-parse', '--abbrev-ref', 'HEAD'))
+        # THEN the editables refer to the restored packages and the packages are installed in dependency order
+        editables = workspace.editables()
+        self.assertEqual(['a', 'b'], sorted(editables))
+        self.assertEqual(os.path.join(self.target, 'b'), editables['b'].path)
+        self.assertEqual(['c', 'b', 'a'], self.conan.call_names('install'))
+
+    def test_restore_keeps_local_commits(self):
+        # GIVEN a restored workspace in which b has a commit that is not in the snapshot
+        snapshot = create_snapshot(self.workspace)
+        restore_snapshot(self.target, snapshot, 2, conan=self.conan)
+        restore_snapshot(self.target, snapshot, 2, conan=self.conan)
+        directory = os.path.join(self.target, 'b')
+        git(directory, 'commit', '-q', '--allow-empty', '-m', 'local')
+        revision = git(directory, 'rev-parse', 'HEAD')
+        # WHEN
+        with self.assertRaises(Exception) as context:
+            restore_snapshot(self.target, snapshot, 2, conan=self.conan)
+        # THEN the branch is not moved
+        self.assertIn('Branch feature of package b has commits that are not in the snapshot.', str(context.exception))
+        self.assertEqual(revision, git(directory, 'rev-parse', 'HEAD'))
+
+
+if __name__ == '__main__':
+    unittest.main()
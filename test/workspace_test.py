@@ -0,0 +1,184 @@
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from workspace.workspace import *
+from workspace.grep import check_pins
+from test.fake_conan import FakeConan
+
+
+def git(directory, *args):
+    completed_process = subprocess.run(['git'] + list(args), cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if completed_process.returncode != 0:
+        raise Exception(completed_process.stderr.decode('utf-8'))
+    return completed_process.stdout.decode('utf-8').strip()
+
+
+# The identity of the commits of the tests, regardless of the configuration of the user.
+git_environment = {
+    'GIT_AUTHOR_NAME': 'Test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+    'GIT_COMMITTER_NAME': 'Test', 'GIT_COMMITTER_EMAIL': 'test@example.com',
+    'GIT_CONFIG_NOSYSTEM': '1'
+}
+
+
+def reference(name, revision):
+    return '%s/1.0.1.%s@user/channel' % (name, revision)
+
+
+def create_workspace(root, conan):
+    """
+    Create the packages of a workspace in which a depends on b and c, and b depends on c,
+    and make them editable. The main package is a.
+    """
+    revisions = {}
+    requirements = {'c': [], 'b': ['c'], 'a': ['b', 'c']}
+    for name in ['c', 'b', 'a']:
+        directory = os.path.join(root, name)
+        os.mkdir(directory)
+        git(directory, 'init', '-q')
+        with open(os.path.join(directory, 'conanfile.py'), 'w') as file:
+            file.write('# %s\n' % name)
+            if requirements[name]:
+                file.write('requires = %s\n' % ', '.join("'%s'" % reference(requirement, revisions[requirement]) for requirement in requirements[name]))
+        git(directory, 'add', 'conanfile.py')
+        git(directory, 'commit', '-q', '-m', 'init')
+        revisions[name] = git(directory, 'rev-parse', 'HEAD')
+    nodes = {
+        "0": {"ref": reference('a', revisions['a']), "requires": ["1", "2"]},
+        "1": {"ref": reference('b', revisions['b']), "requires": ["2"]},
+        "2": {"ref": reference('c', revisions['c'])}
+    }
+    with open(os.path.join(root, 'a', 'conan.lock'), 'w') as file:
+        json.dump({"graph_lock": {"nodes": nodes}, "version": "0.4"}, file, indent=1)
+    git(os.path.join(root, 'a'), 'add', 'conan.lock')
+    git(os.path.join(root, 'a'), 'commit', '-q', '-m', 'lock')
+    for name in ['a', 'b', 'c']:
+        conan.editable_add(os.path.join(root, name), reference(name, revisions[name]))
+    return revisions
+
+
+class WorkspaceTestCase(unittest.TestCase):
+    """
+    A test that runs in a temporary directory, with the git identity of the tests and a FakeConan.
+    The workspace of create_workspace is created in each of the subdirectories workspace_names of
+    the temporary directory, or in the temporary directory itself if there are none.
+    The root and the workspace are those of the first of them.
+    """
+    workspace_names = []
+
+    def setUp(self):
+        self.environment = mock.patch.dict(os.environ, git_environment)
+        self.environment.start()
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.directory = self.temporary_directory.name
+        self.conan = FakeConan()
+        roots = [os.path.join(self.directory, name) for name in self.workspace_names] or [self.directory]
+        for root in reversed(roots):
+            os.makedirs(root, exist_ok=True)
+            self.revisions = create_workspace(root, self.conan)
+        self.root = roots[0]
+        self.conan.calls = []
+        self.workspace = Workspace('a', self.root, self.conan)
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+        self.environment.stop()
+
+    def change(self, name, file_name = 'conanfile.py'):
+        with open(os.path.join(self.root, name, file_name), 'a') as file:
+            file.write('# changed\n')
+
+    def revision(self, name):
+        return git(os.path.join(self.root, name), 'rev-parse', 'HEAD')
+
+    def conanfile(self, name):
+        with open(os.path.join(self.root, name, 'conanfile.py')) as file:
+            return file.read()
+
+
+class WorkspaceTest(WorkspaceTestCase):
+    """
+    Tests of the peg of the workspace of create_workspace.
+    """
+
+    def test_peg(self):
+        # GIVEN
+        self.change('c')
+        # WHEN
+        self.workspace.peg('Change c')
+        # THEN the new revisions are pinned in the packages that depend on them
+        self.assertIn("'c/1.0.2.%s@user/channel'" % self.revision('c'), self.conanfile('b'))
+        self.assertIn("'b/1.0.2.%s@user/channel', 'c/1.0.2.%s@user/channel'" % (self.revision('b'), self.revision('c')), self.conanfile('a'))
+        self.assertEqual(['c', 'b', 'a'], self.conan.call_names('install'))
+        # THEN the pegged references are editable
+        self.assertEqual(['a', 'b', 'c'], sorted(self.workspace.editables()))
+        self.assertFalse(self.workspace.peg_journal().exists())
+
+    def test_peg_after_reload(self):
+        # GIVEN a pegged workspace that is loaded again
+        self.change('c')
+        self.workspace.peg('Change c')
+        workspace = Workspace('a', self.root, self.conan)
+        self.assertEqual(['a', 'b', 'c'], sorted(workspace.editables()))
+        # WHEN
+        self.change('c')
+        workspace.peg('Change c again')
+        # THEN the main package takes part in the peg again
+        self.assertIn("'c/1.0.3.%s@user/channel'" % self.revision('c'), self.conanfile('a'))
+        self.assertEqual([], check_pins(workspace))
+
+    def test_fetch_failures(self):
+        # GIVEN a package with a remote and packages of which the remote cannot be read
+        git(self.directory, 'clone', '-q', '--bare', os.path.join(self.root, 'c'), os.path.join(self.directory, 'c.git'))
+        git(os.path.join(self.root, 'c'), 'remote', 'add', 'origin', os.path.join(self.directory, 'c.git'))
+        # WHEN
+        with self.assertRaises(Exception) as context:
+            with mock.patch('builtins.print'):
+                self.workspace.fetch()
+        # THEN
+        self.assertEqual('Could not fetch the packages a, b.', str(context.exception))
+
+    def test_timeouts(self):
+        # GIVEN a configuration with timeouts
+        with open(os.path.join(self.root, 'workspace.yml'), 'w') as stream:
+            stream.write('timeouts:\n  git fetch: 5\n')
+        # WHEN
+        configured = Workspace('a', self.root, self.conan)
+        # THEN the timeouts are used by the processes of that workspace only
+        self.assertEqual({'git fetch': 5}, configured.package('c').git.timeouts)
+        self.assertIsNone(self.workspace.package('c').git.timeouts)
+        self.assertEqual(600, process.supervisor.timeout_of(['git', 'fetch']))
+
+    def test_package_identity(self):
+        self.assertIs(self.workspace.package('b'), self.workspace.package('b'))
+        self.assertIs(self.workspace.package('b'), [package for package in self.workspace.packages() if package.name == 'b'][0])
+
+    def test_operation(self):
+        git = self.workspace.package('c').git
+        with self.workspace.operation():
+            # GIVEN facts that were determined in the operation
+            self.assertFalse(git.is_dirty())
+            count = process.process_count()
+            # THEN they are not determined again
+            self.assertFalse(git.is_dirty())
+            self.assertEqual(1, git.sequence_in_branch())
+            self.assertEqual(1, git.sequence_in_branch())
+            self.assertEqual(count + 1, process.process_count())
+            # WHEN the workspace changes the package, THEN the facts are determined again
+            self.change('c')
+            git.add('conanfile.py')
+            self.assertTrue(git.is_dirty())
+            git.commit('Change c')
+            self.assertEqual(2, git.sequence_in_branch())
+            # WHEN an editable is removed, THEN the editables are determined again
+            self.assertIn('c', self.workspace.editables())
+            self.workspace.package('c').close()
+            self.assertNotIn('c', self.workspace.editables())
+
+
+if __name__ == '__main__':
+    unittest.main()
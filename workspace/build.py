@@ -0,0 +1,58 @@
+from workspace.scheduler import *
+
+
+def build(workspace, jobs = 8, force = False):
+    """
+    Build the downloaded editable packages with conan build, with at most jobs builds at the
+    same time. A package is installed and built after the editable packages on which it depends
+    were built, and is cancelled if one of them failed. A package of which the sources, the
+    inputs of its install and the builds of its dependencies did not change since its last
+    successful build is skipped, unless force is true. Return a dictionary from package names
+    to TaskResult objects of which the value is 'built' or 'skipped'.
+    """
+    digests = {}
+
+    def task(name):
+        def run():
+            if not force and workspace.build_cache.is_current(name, digests[name]):
+                return 'skipped'
+            workspace.build_cache.forget(name)
+            print('Building ' + name)
+            package = workspace.package(name)
+            workspace.install(package)
+            if not workspace.conan.build(package.directory()):
+                raise Exception('Conan build failed for package %s.' % name)
+            workspace.build_cache.record(name, digests[name])
+            return 'built'
+        return run
+
+    def finished(result):
+        if result.status == 'failed':
+            print('Failed to build %s: %s' % (result.name, result.error))
+        elif result.status == 'cancelled':
+            print('Did not build %s. %s' % (result.name, result.error))
+
+    with workspace.history.record('build', workspace.graph.number_of_nodes()):
+        with workspace.history.phase('digest'), workspace.operation():
+            names = [name for name in workspace.reversed_package_name_order()
+                     if workspace.package(name).is_downloaded() and workspace.package(name).is_editable()]
+            # The digests are determined before the builds start, such that changes to the sources
+            # during a build cause the package to be built again the next time.
+            for name in names:
+                digests[name] = workspace.build_digest(workspace.package(name), digests)
+        tasks = {name: task(name) for name in names}
+        dependencies = {name: workspace.reachability.descendants(name) for name in names}
+        with workspace.history.phase('build'):
+            return Scheduler(jobs).run(tasks, dependencies, finished)
+
+
+def print_build_summary(results, order):
+    """ Print the outcome and the duration of the build of every package in the given order. """
+    for name in order:
+        if name in results:
+            result = results[name]
+            outcome = result.value if result.succeeded else result.status
+            print('%-24s %-10s %8.2fs' % (name, outcome, result.duration))
+    built = len([result for result in results.values() if result.value == 'built'])
+    skipped = len([result for result in results.values() if result.value == 'skipped'])
+    print('Built %d and skipped %d of %d packages.' % (built, skipped, len(results)))
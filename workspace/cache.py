@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import threading
+
+
+class InputCache:
+    """
+    A cache that records, for each package, a digest of the inputs of the last
+    successful run of an operation. If the digest of the current inputs is equal
+    to the recorded digest, the operation does not have to be run again.
+
+    The cache is stored as a json file and is loaded when it is first used.
+    It can be used by several threads at the same time.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._digests = None
+        self.lock = threading.RLock()
+
+    @property
+    def digests(self):
+        with self.lock:
+            if self._digests is None:
+                self._digests = {}
+                if os.path.exists(self.path):
+                    with open(self.path) as json_file:
+                        self._digests = json.load(json_file)
+            return self._digests
+
+    def is_current(self, package_name, digest):
+        return self.digests.get(package_name) == digest
+
+    def record(self, package_name, digest):
+        with self.lock:
+            self.digests[package_name] = digest
+            self.save()
+
+    def forget(self, package_name):
+        with self.lock:
+            if package_name in self.digests:
+                del self.digests[package_name]
+                self.save()
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temporary_path = self.path + '.tmp'
+            with open(temporary_path, 'w') as json_file:
+                json.dump(self.digests, json_file, indent=4, sort_keys=True)
+            os.replace(temporary_path, self.path)
+
+
+class Digest:
+    """
+    Incrementally compute the digest of a number of named inputs.
+    """
+    def __init__(self):
+        self._hash = hashlib.sha256()
+
+    def add(self, name, value):
+        self._hash.update(name.encode('utf-8'))
+        self._hash.update(b'\0')
+        self._hash.update(str(value).encode('utf-8'))
+        self._hash.update(b'\0')
+
+    def add_file(self, name, path):
+        """
+        Add the contents of the given file. A missing file is an input as well.
+        """
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                self.add(name, hashlib.sha256(file.read()).hexdigest())
+        else:
+            self.add(name, None)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
@@ -0,0 +1,133 @@
+import argparse
+import json
+
+
+def create_parser():
+    """
+    Return the parser of the command line arguments of the workspace command.
+    """
+    parser = argparse.ArgumentParser(description='Manage a feature branch workspace.')
+    subparsers = parser.add_subparsers(help='sub-command help', dest='command')
+    parser_peg = subparsers.add_parser('peg', help='peg the revision of a package or all packages')
+    parser_peg.add_argument('--push', action="store_true")
+    parser_peg.add_argument('--resume', action="store_true", help='resume a peg that was interrupted, skipping the steps that were completed')
+    parser_peg.add_argument('--incremental', action="store_true", help='only peg the changed packages and the packages that depend on them')
+    parser_peg.add_argument('--dry-run', action="store_true", help='print the packages that would be pegged without changing anything')
+    parser_peg.add_argument('--force-install', action="store_true", help='run conan install even if its inputs did not change')
+
+    # Download
+    parser_download = subparsers.add_parser('download', help='download help')
+    parser_download.add_argument('package')
+    parser_download.add_argument('--force-install', action="store_true", help='run conan install even if its inputs did not change')
+    parser.add_argument('-m', '--main', type=str, required=False)
+    parser.add_argument('--no-daemon', action="store_true", help='do not use a running workspace daemon')
+
+    # Fetch
+    parser_fetch = subparsers.add_parser('fetch', help='Fetch the branch of the workspace, the stable branches and the pegged revisions of the editable packages')
+    parser_fetch.add_argument('--full', action="store_true", help='fetch all branches and tags of all remotes')
+
+    # Edit
+    parser_edit = subparsers.add_parser('edit', help='Make the specified packages editable. If no packages are provided, all packages in the workspace are made editable.')
+    parser_edit.add_argument('package', nargs='*')
+    parser_edit.add_argument('--actual', action="store_true")
+
+    # List
+    parser_list = subparsers.add_parser('list', help='List all packages in the workspace')
+    parser_list.add_argument('--revision', action="store_true")
+    parser_list.add_argument('--branch', action="store_true")
+    parser_list.add_argument('--branches', action="store_true")
+    parser_list.add_argument('--remote-branches', action="store_true")
+    parser_list.add_argument('--upstream', action="store_true")
+    parser_list.add_argument('--remotes', action="store_true")
+
+    # Impact
+    parser_impact = subparsers.add_parser('impact', help='List the packages that are affected by a change of the specified package')
+    parser_impact.add_argument('package')
+    parser_impact.add_argument('--levels', action="store_true", help='group the affected packages by the level at which they are rebuilt')
+    parser_impact.add_argument('--critical-path', action="store_true", help='show the longest chain of packages that must be rebuilt one after the other')
+
+    # Status
+    parser_status = subparsers.add_parser('status', help='Show the branch, revision and state of all packages in the workspace')
+    parser_status.add_argument('--json', action="store_true", help='print the status as json')
+    parser_status.add_argument('--roots', nargs='+', metavar='DIR', help='show the consistency of all workspaces in the given directories and the directories in them')
+    parser_status.add_argument('-j', '--jobs', type=int, default=8, help='the number of workspaces that are evaluated at the same time')
+
+    # Snapshot
+    subparsers.add_parser('snapshot', help='Print the branch, revision and editable state of all packages as json')
+
+    # Restore
+    parser_restore = subparsers.add_parser('restore', help='Clone or check out all packages of a snapshot at their revisions, make them editable and install them')
+    parser_restore.add_argument('snapshot', help='the snapshot file that was written by the snapshot command')
+    parser_restore.add_argument('-j', '--jobs', type=int, default=8, help='the number of packages that are cloned or checked out at the same time')
+    parser_restore.add_argument('--force-install', action="store_true", help='run conan install even if its inputs did not change')
+
+    # Foreach
+    parser_foreach = subparsers.add_parser('foreach', help='Run a command in the directory of every downloaded package')
+    parser_foreach.add_argument('--editable', action="store_true", help='only run the command in the editable packages')
+    parser_foreach.add_argument('--topo', action="store_true", help='run the command in a package only after it succeeded in the packages on which it depends')
+    parser_foreach.add_argument('-j', '--jobs', type=int, default=8, help='the number of commands that run at the same time')
+    parser_foreach.add_argument('--group', action="store_true", help='print the output of a package in one block when its command finished')
+    parser_foreach.add_argument('--timeout', type=float, default=0, help='stop a command after the given number of seconds, by default never')
+    parser_foreach.add_argument('cmd', nargs=argparse.REMAINDER, help='the command, after --')
+
+    # Build
+    parser_build = subparsers.add_parser('build', help='Build the editable packages in dependency order, skipping those of which nothing changed')
+    parser_build.add_argument('-j', '--jobs', type=int, default=4, help='the number of packages that are built at the same time')
+    parser_build.add_argument('--force', action="store_true", help='build all editable packages, even if their inputs did not change')
+
+    # Grep
+    parser_grep = subparsers.add_parser('grep', help='Search the tracked files of all downloaded packages')
+    parser_grep.add_argument('pattern', help='the extended regular expression to search for')
+    parser_grep.add_argument('--conanfiles-only', action="store_true", help='only search the conanfiles')
+    parser_grep.add_argument('--related', metavar='PACKAGE', help='only search the given package and the packages that depend on it or on which it depends')
+    parser_grep.add_argument('-i', '--ignore-case', action="store_true", help='ignore the case of letters')
+    parser_grep.add_argument('-F', '--fixed-strings', action="store_true", help='search for the pattern as a fixed string')
+    parser_grep.add_argument('-j', '--jobs', type=int, default=8, help='the number of packages that are searched at the same time')
+
+    # Serve
+    parser_serve = subparsers.add_parser('serve', help='Run a daemon that keeps the workspace loaded and answers the list, status, peg, edit and close commands')
+    parser_serve.add_argument('--interval', type=float, default=1.0, help='the number of seconds between checks for changes in the workspace')
+
+    # Stats
+    parser_stats = subparsers.add_parser('stats', help='Show the statistics of the durations of the operations on the workspace and flag regressions')
+    parser_stats.add_argument('--operation', type=str, help='only show the statistics of the given operation')
+    parser_stats.add_argument('--window', type=int, default=5, help='the number of recent runs that are compared with the runs before them')
+
+    # Close
+    parser_close = subparsers.add_parser('close', help='Remove the editable for the specified packages. If not packages are provided, the editable is removed for all packages in the workspace.')
+    parser_close.add_argument('package', nargs='*')
+
+    return parser
+
+
+def status_message(status):
+    msg = status["reference"]
+    if not status["downloaded"]:
+        return msg + " is not downloaded"
+    msg = msg + " : " + (status["branch"] if status["branch"] else "detached") + " : " + status["revision"]
+    if not status["valid"]:
+        msg = msg + " : invalid revision"
+    if status.get("dirty"):
+        msg = msg + " : local changes"
+    if status["editable"]:
+        msg = msg + " : editable"
+    return msg
+
+
+def print_status(statuses, as_json = False):
+    if as_json:
+        print(json.dumps(statuses, indent=4))
+    else:
+        for status in statuses:
+            print(status_message(status))
+
+
+def print_statistics(statistics):
+    def seconds(value):
+        return '%.2fs' % value if value is not None else '-'
+    print('%-16s %6s %9s %9s %9s %9s %9s %10s' % ('operation', 'runs', 'p50', 'p90', 'p99', 'last', 'packages', 'processes'))
+    for entry in statistics:
+        msg = '%-16s %6d %9s %9s %9s %9s %9d %10d' % (entry["operation"], entry["count"], seconds(entry["p50"]), seconds(entry["p90"]), seconds(entry["p99"]), seconds(entry["last"]), entry["package_count"], entry["process_count"])
+        if entry["regression"]:
+            msg = msg + '  REGRESSION: recent median %s, before %s' % (seconds(entry["recent_median"]), seconds(entry["previous_median"]))
+        print(msg)
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import socket
+import sys
+import tempfile
+from workspace.cli import *
+
+# The commands that are answered by a running workspace daemon. The peg runs in the process
+# of the command, such that the output of its installs goes to the terminal and Ctrl-C cancels it.
+daemon_commands = ('list', 'status', 'edit', 'close')
+
+
+def socket_path(root):
+    """
+    Return the path of the Unix domain socket of the daemon of the workspace with the given root.
+    Socket paths are limited to about 100 characters, so for deep roots a path
+    in the temporary directory is used instead.
+    """
+    path = os.path.join(root, ".workspace", "daemon.sock")
+    if len(path.encode('utf-8')) > 100:
+        digest = hashlib.sha256(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(tempfile.gettempdir(), "workspace-" + digest + ".sock")
+    return path
+
+
+class WorkspaceClient:
+    """
+    A client of a running workspace daemon.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.file = connection.makefile('rwb')
+        self.next_id = 1
+
+    @classmethod
+    def connect(cls, root):
+        """
+        Return a client that is connected to the daemon of the workspace with the given root,
+        or None if no daemon is running.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            return None
+        path = socket_path(root)
+        if not os.path.exists(path):
+            return None
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(path)
+        except OSError:
+            connection.close()
+            return None
+        return WorkspaceClient(connection)
+
+    def call(self, method, **params):
+        request = {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}
+        self.next_id = self.next_id + 1
+        self.file.write((json.dumps(request) + "\n").encode('utf-8'))
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise Exception('The workspace daemon closed the connection.')
+        response = json.loads(line)
+        if "error" in response:
+            # Print what a failed action printed before it failed, as it would have without the daemon.
+            print(response["error"].get("data", {}).get("output", ""), end='')
+            raise Exception(response["error"]["message"])
+        return response["result"]
+
+    def run_command(self, args):
+        """
+        Run the command of the given command line arguments on the daemon and print the result.
+        """
+        if args.command == 'list':
+            for msg in self.call('list', revision=args.revision, branch=args.branch, branches=args.branches, remote_branches=args.remote_branches, upstream=args.upstream, remotes=args.remotes):
+                print(msg)
+        elif args.command == 'status':
+            print_status(self.call('status'), args.json)
+        elif args.command == 'edit':
+            print(self.call('edit', packages=args.package, actual=args.actual)["output"], end='')
+        elif args.command == 'close':
+            print(self.call('close', packages=args.package)["output"], end='')
+
+    def close(self):
+        self.file.close()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def run_on_daemon(args):
+    """
+    Run the command of the given command line arguments on the daemon of the workspace
+    in the current directory. Return false if the command must run in this process.
+    """
+    # The daemon serves a workspace with an auto-detected or configured main package.
+    if args.command not in daemon_commands or args.main or args.no_daemon or getattr(args, 'roots', None):
+        return False
+    client = WorkspaceClient.connect(os.getcwd())
+    if not client:
+        return False
+    with client:
+        client.run_command(args)
+    return True
+
+
+def main():
+    """
+    The entry point of the workspace command. This module does not import the workspace
+    itself, such that commands that are answered by a running daemon start quickly.
+    """
+    args = create_parser().parse_args()
+    try:
+        if not run_on_daemon(args):
+            from workspace.workspace import run
+            run(args)
+    except KeyboardInterrupt:
+        # The supervisor has stopped the running process and its children.
+        print('Interrupted.')
+        sys.exit(130)
@@ -0,0 +1,184 @@
+import importlib.util
+import inspect
+import json
+import os
+import threading
+from pathlib import Path
+from workspace import process
+
+
+def conan_home():
+    """ Return the directory of the configuration of Conan 1.x, which CONAN_USER_HOME moves. """
+    return os.path.join(os.environ.get("CONAN_USER_HOME", Path.home()), ".conan")
+
+
+def editable_packages_path():
+    """ Return the path of the file in which Conan 1.x registers the editable packages. """
+    return os.path.join(conan_home(), "editable_packages.json")
+
+
+def read_editable_packages():
+    """
+    Read the editable packages from the file in which Conan 1.x registers them, as a dictionary
+    from reference strings to dictionaries with their path and layout.
+    """
+    editable_packages_file = editable_packages_path()
+    if (os.path.exists(editable_packages_file)):
+        with open(editable_packages_file) as json_file:
+            return json.load(json_file)
+    return {}
+
+
+class Conan:
+    """
+    The Conan operations that are used by the workspace. References are passed
+    as strings, and the operations that can fail return whether they succeeded.
+    """
+    def editable_add(self, path, reference, cwd = None):
+        raise NotImplementedError()
+
+    def editable_remove(self, reference):
+        raise NotImplementedError()
+
+    def editables(self):
+        """
+        Return the editable packages that are registered in Conan as a dictionary
+        from reference strings to dictionaries with their path and layout.
+        """
+        raise NotImplementedError()
+
+    def install(self, directory):
+        raise NotImplementedError()
+
+    def source(self, directory):
+        raise NotImplementedError()
+
+    def build(self, directory):
+        """ Build the package in the given directory, which must be installed. """
+        raise NotImplementedError()
+
+
+class SubprocessConan(Conan):
+    """
+    Run the Conan command line interface for every operation. The given timeouts of Conan
+    commands override the default timeouts.
+    """
+    def __init__(self, timeouts = None):
+        self.timeouts = timeouts
+
+    def editable_add(self, path, reference, cwd = None):
+        return process.run(['conan', 'editable', 'add', path, reference], cwd=cwd, timeouts=self.timeouts).returncode == 0
+
+    def editable_remove(self, reference):
+        return process.run(['conan', 'editable', 'remove', reference], timeouts=self.timeouts).returncode == 0
+
+    def editables(self):
+        return read_editable_packages()
+
+    def install(self, directory):
+        return process.run(['conan', 'install', '.'], cwd=directory, timeouts=self.timeouts).returncode == 0
+
+    def source(self, directory):
+        return process.run(['conan', 'source', '.'], cwd=directory, timeouts=self.timeouts).returncode == 0
+
+    def build(self, directory):
+        return process.run(['conan', 'build', '.'], cwd=directory, timeouts=self.timeouts).returncode == 0
+
+
+class ApiConan(Conan):
+    """
+    Use the Python API of Conan 1.x in this process. The API is loaded when it is first used,
+    and only once, such that the start-up of the interpreter and the loading of the Conan
+    configuration are only paid once per run, and not at all by commands that only read
+    the editables.
+
+    Calls of the API cannot be timed out or cancelled, so unless supervised is false, the
+    installs, sources and builds, which can take very long, run the command line interface
+    with the given timeouts instead.
+
+    The API changes the working directory and the environment of the process, so its calls
+    are made one at a time, also when the workspace installs or builds concurrently.
+    """
+    def __init__(self, supervised = True, timeouts = None):
+        self.lock = threading.Lock()
+        self.call_lock = threading.Lock()
+        self._api = None
+        self.supervised = SubprocessConan(timeouts) if supervised else None
+
+    @property
+    def api(self):
+        with self.lock:
+            if self._api is None:
+                from conans.client.conan_api import Conan as ConanAPI
+                from conans.errors import ConanException
+                api = ConanAPI.factory()
+                # Older versions of Conan return a tuple with the API and the cache.
+                self._api = api[0] if isinstance(api, tuple) else api
+                self.error_type = ConanException
+            return self._api
+
+    def call(self, method, **arguments):
+        """
+        Call a method of the API with the given keyword arguments. The parameters of the API differ
+        between Conan versions, so arguments that are None are dropped if the method does not accept
+        them. Raise an exception if the method does not accept another argument, or if it has
+        a required parameter that is not given.
+        """
+        parameters = inspect.signature(method).parameters
+        for name, value in arguments.items():
+            if name not in parameters and value is not None:
+                raise Exception('The Conan API method %s does not accept the argument %s.' % (method.__name__, name))
+        for name, parameter in parameters.items():
+            if name not in arguments and parameter.default is inspect.Parameter.empty and parameter.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                raise Exception('The Conan API method %s requires the argument %s.' % (method.__name__, name))
+        keyword_arguments = {name: value for name, value in arguments.items() if name in parameters}
+        with self.call_lock:
+            try:
+                method(**keyword_arguments)
+                return True
+            except self.error_type as error:
+                print(str(error))
+                return False
+
+    def editable_add(self, path, reference, cwd = None):
+        return self.call(self.api.editable_add, path=path, reference=reference, layout=None, output_folder=None, cwd=cwd or os.getcwd())
+
+    def editable_remove(self, reference):
+        return self.call(self.api.editable_remove, reference=reference)
+
+    def editables(self):
+        # Reading the file of the editables is much faster than loading the API.
+        return read_editable_packages()
+
+    def install(self, directory):
+        if self.supervised:
+            return self.supervised.install(directory)
+        return self.call(self.api.install, path=directory, cwd=directory)
+
+    def source(self, directory):
+        if self.supervised:
+            return self.supervised.source(directory)
+        return self.call(self.api.source, path=directory, source_folder=directory, info_folder=directory, cwd=directory)
+
+    def build(self, directory):
+        if self.supervised:
+            return self.supervised.build(directory)
+        return self.call(self.api.build, conanfile_path=directory, source_folder=directory, build_folder=directory,
+                         install_folder=directory, cwd=directory)
+
+
+def conan_backend(name = None, timeouts = None):
+    """
+    Return the Conan backend with the given name: 'api' or 'subprocess'. By default, the Python API
+    is used for the editables if Conan can be imported in this interpreter, and the command line
+    interface for everything else. The 'api' backend also installs, sources and builds in this
+    process, which then cannot be timed out or cancelled.
+    """
+    if name == 'subprocess':
+        return SubprocessConan(timeouts)
+    # Conan is only imported when the API is first used, so check that it can be imported without importing it.
+    if importlib.util.find_spec('conans') is None:
+        if name == 'api':
+            raise ImportError('The Conan API cannot be imported.')
+        return SubprocessConan(timeouts)
+    return ApiConan(supervised=name != 'api', timeouts=timeouts)
@@ -0,0 +1,265 @@
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from workspace.workspace import *
+from workspace.client import *
+
+
+class ThreadOutput:
+    """
+    A standard output of which the output can be captured per thread. The daemon handles
+    every request in its own thread, so what a request prints is captured without the
+    output of the other threads.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def target(self):
+        return getattr(self._local, 'stream', None) or self.stream
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.target(), name)
+
+    @contextlib.contextmanager
+    def capture(self):
+        """ Capture what the current thread prints in the body of the with statement in a StringIO. """
+        previous = getattr(self._local, 'stream', None)
+        self._local.stream = io.StringIO()
+        try:
+            yield self._local.stream
+        finally:
+            self._local.stream = previous
+
+
+def thread_output():
+    """ Replace the standard output by a ThreadOutput, if it is not one yet, and return it. """
+    if not isinstance(sys.stdout, ThreadOutput):
+        sys.stdout = ThreadOutput(sys.stdout)
+    return sys.stdout
+
+
+class ActionError(Exception):
+    """ Raised when an action of the daemon failed, with what the action printed before it failed. """
+    def __init__(self, message, output):
+        super().__init__(message)
+        self.output = output
+
+
+class WorkspaceDaemon:
+    """
+    A daemon that keeps a workspace loaded and answers JSON-RPC requests on a Unix domain socket.
+    Every request and response is a single line of json.
+
+    The answers to the list and status requests are cached. The cache is cleared when
+    the daemon changes the workspace itself, or when the lockfile, the workspace
+    configuration, the Conan editables or the git metadata of a package change.
+    Local changes in the working trees are not watched, so whether a package is dirty
+    is determined for every status request.
+    """
+    commands = daemon_commands
+
+    def __init__(self, workspace, interval = 1.0):
+        self.workspace = workspace
+        # The main package is only passed on if it was not auto-detected.
+        self.main = workspace.main if workspace.yaml and "main" in workspace.yaml else None
+        self.interval = interval
+        self.lock = threading.RLock()
+        self.cache = {}
+        self.watched_state = self.current_watched_state()
+        self.methods = {
+            'list': self.list,
+            'status': self.status,
+            'edit': self.edit,
+            'close': self.close
+        }
+
+    @property
+    def root(self):
+        return self.workspace.root
+
+    def workspace_paths(self):
+        """ Return the paths that determine the graph of the workspace. """
+        return [
+            os.path.join(self.workspace.main_directory, "conan.lock"),
+            os.path.join(self.root, "workspace.yml")
+        ]
+
+    def package_paths(self):
+        """ Return the paths that determine the editables and the git state of the packages. """
+        result = [editable_packages_path()]
+        for package in self.workspace.packages():
+            git_directory = os.path.join(package.directory(), ".git")
+            result.append(git_directory)
+            for name in ("HEAD", "index", "packed-refs", "config", "FETCH_HEAD", os.path.join("refs", "heads"), os.path.join("refs", "remotes", "origin")):
+                result.append(os.path.join(git_directory, name))
+            # Commits on the current branch only change the file of the branch.
+            head_path = os.path.join(git_directory, "HEAD")
+            if os.path.isfile(head_path):
+                with open(head_path) as head_file:
+                    head = head_file.read().strip()
+                if head.startswith("ref: "):
+                    result.append(os.path.join(git_directory, head[5:]))
+        return result
+
+    def current_watched_state(self):
+        def modification_time(path):
+            try:
+                return os.stat(path).st_mtime_ns
+            except OSError:
+                return None
+        return {
+            "workspace": [modification_time(path) for path in self.workspace_paths()],
+            "packages": {path: modification_time(path) for path in self.package_paths()}
+        }
+
+    def check_for_changes(self):
+        with self.lock:
+            state = self.current_watched_state()
+            if state["workspace"] != self.watched_state["workspace"]:
+                self.workspace = Workspace(self.main, self.root, self.workspace.conan.conan)
+                self.cache = {}
+                state = self.current_watched_state()
+            elif state["packages"] != self.watched_state["packages"]:
+                self.cache = {}
+            self.watched_state = state
+
+    def watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check_for_changes()
+            except Exception as error:
+                print("Could not check the workspace for changes: " + str(error))
+
+    def cached(self, key, compute):
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    def mutate(self, action):
+        """
+        Run an action that changes the workspace and return what it printed. If the action
+        fails, an ActionError with what it printed is raised.
+        """
+        try:
+            with thread_output().capture() as output:
+                try:
+                    action()
+                except Exception as error:
+                    raise ActionError(str(error), output.getvalue())
+        finally:
+            self.cache = {}
+            self.watched_state = self.current_watched_state()
+        return {"output": output.getvalue()}
+
+    def list(self, revision = False, branch = False, branches = False, remote_branches = False, upstream = False, remotes = False):
+        key = json.dumps(['list', revision, branch, branches, remote_branches, upstream, remotes])
+        with self.workspace.history.record('list', self.workspace.graph.number_of_nodes()):
+            return self.cached(key, lambda: list_messages(self.workspace, revision, branch, branches, remote_branches, upstream, remotes))
+
+    def status(self):
+        with self.workspace.history.record('status', self.workspace.graph.number_of_nodes()):
+            statuses = self.cached('status', lambda: self.workspace.status(include_dirty=False))
+            result = []
+            for status in statuses:
+                status = dict(status)
+                if status["downloaded"]:
+                    status["dirty"] = self.workspace.package(status["name"]).git.is_dirty()
+                result.append(status)
+            return result
+
+    def edit(self, packages = [], actual = False):
+        def action():
+            if not packages:
+                self.workspace.edit(actual)
+            else:
+                for package_name in packages:
+                    self.workspace.package(package_name).edit(actual)
+        return self.mutate(action)
+
+    def close(self, packages = []):
+        def action():
+            if not packages:
+                self.workspace.close()
+            else:
+                for package_name in packages:
+                    self.workspace.package(package_name).close()
+        return self.mutate(action)
+
+    def dispatch(self, request):
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        method = self.methods.get(request.get("method"))
+        if not method:
+            response["error"] = {"code": -32601, "message": "Unknown method " + str(request.get("method"))}
+            return response
+        try:
+            with self.lock:
+                response["result"] = method(**request.get("params", {}))
+        except ActionError as error:
+            response["error"] = {"code": -32000, "message": str(error), "data": {"output": error.output}}
+        except Exception as error:
+            response["error"] = {"code": -32000, "message": str(error)}
+        return response
+
+    def create_server(self):
+        """
+        Return a server that handles the requests on the socket of the workspace in a thread per connection.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise Exception('The workspace daemon requires Unix domain sockets.')
+        path = socket_path(self.root)
+        if os.path.exists(path):
+            if WorkspaceClient.connect(self.root):
+                raise Exception('A workspace daemon is already running on ' + path)
+            # The socket was left behind by a daemon that did not stop cleanly.
+            os.remove(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        daemon = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = daemon.dispatch(json.loads(line))
+                    except ValueError as error:
+                        response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": str(error)}}
+                    self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+                    self.wfile.flush()
+
+        server = socketserver.ThreadingUnixStreamServer(path, RequestHandler)
+        server.daemon_threads = True
+        return server
+
+    def serve(self):
+        def server_exit():
+            raise SystemExit()
+
+        server = self.create_server()
+        path = server.server_address
+        thread_output()
+        threading.Thread(target=self.watch, daemon=True).start()
+        print("Serving workspace " + self.root + " on " + path)
+        # Stop cleanly on a termination request, such that the socket is removed.
+        signal.signal(signal.SIGTERM, lambda signal_number, frame: server_exit())
+        try:
+            server.serve_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            server.server_close()
+            if os.path.exists(path):
+                os.remove(path)
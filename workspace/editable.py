@@ -1,15 +1,12 @@
-import subprocess
-
 class Editable:
-    def __init__(self, package_reference, path, layout):
+    def __init__(self, package_reference, path, layout, conan):
         self.package_reference = package_reference
         self.path = path
         self.layout = layout
+        self.conan = conan
 
     def disable(self):
-        subprocess.run(['conan', 'editable', 'remove', self.package_reference.to_string()])
+        self.conan.editable_remove(self.package_reference.to_string())
 
     def edit(self):
-        ref = self.package_reference
-        subprocess.run(['conan', 'editable', 'add', self.path, ref.to_string()])
-
+        self.conan.editable_add(self.path, self.package_reference.to_string())
@@ -0,0 +1,95 @@
+import subprocess
+import sys
+import threading
+from workspace import process
+from workspace.scheduler import *
+
+
+class OutputPrinter:
+    """
+    Prints the output of commands that run concurrently. Every line is prefixed with the
+    name of its package, or, if group is true, the output of a package is printed in one block
+    when its command finished.
+    """
+    def __init__(self, width, group = False, stream = None):
+        self.width = width
+        self.group = group
+        self.stream = stream if stream else sys.stdout
+        self.lock = threading.Lock()
+        self.groups = {}
+
+    def line(self, name, line):
+        if self.group:
+            with self.lock:
+                self.groups.setdefault(name, []).append(line)
+        else:
+            with self.lock:
+                self.stream.write('%-*s | %s\n' % (self.width, name, line))
+                self.stream.flush()
+
+    def finished(self, name):
+        if self.group:
+            with self.lock:
+                lines = self.groups.pop(name, [])
+                self.stream.write('==> %s\n' % name)
+                for line in lines:
+                    self.stream.write(line + '\n')
+                self.stream.flush()
+
+
+def foreach(workspace, command, editable_only = False, topological = False, jobs = 8, group = False, timeout = 0):
+    """
+    Run the command in the directory of every downloaded package, optionally only of the
+    editable packages, with at most jobs commands at the same time. If topological is true,
+    a command starts only after the commands of the packages on which the package depends
+    succeeded. The command is stopped after timeout seconds, unless the timeout is 0, because
+    the default timeouts of the commands of the workspace do not fit arbitrary commands.
+    Return a dictionary from package names to TaskResult objects of which the value is the
+    exit status of the command.
+    """
+    with workspace.operation():
+        packages = [package for package in workspace.packages() if package.is_downloaded() and (not editable_only or package.is_editable())]
+    names = [package.name for package in packages]
+    printer = OutputPrinter(max([len(name) for name in names] + [1]), group)
+
+    def task(package):
+        def run():
+            try:
+                completed_process = process.run(command, stderr=subprocess.STDOUT, cwd=package.directory(), timeout=timeout,
+                                                 on_line=lambda line: printer.line(package.name, line))
+            except process.ProcessTimeout as error:
+                printer.line(package.name, str(error))
+                return TaskResult(package.name, 'failed', None, str(error))
+            except FileNotFoundError:
+                printer.line(package.name, 'Command not found: ' + command[0])
+                return TaskResult(package.name, 'failed', 127, 'Command not found.')
+            finally:
+                printer.finished(package.name)
+            if completed_process.returncode != 0:
+                return TaskResult(package.name, 'failed', completed_process.returncode, 'Exit status %d.' % completed_process.returncode)
+            return 0
+        return run
+
+    tasks = {package.name: task(package) for package in packages}
+    dependencies = {name: workspace.reachability.descendants(name) for name in names} if topological else None
+    return Scheduler(jobs).run(tasks, dependencies)
+
+
+def exit_status(results):
+    """ Return 0 if all commands succeeded, and otherwise the highest exit status, where cancelled commands count as 1. """
+    return max([0] + [result.value if result.status == 'failed' and result.value else 1 for result in results.values() if not result.succeeded])
+
+
+def print_summary(results, order):
+    """ Print the status and the duration of the command of every package in the given order. """
+    print('%-24s %-10s %6s %9s %9s' % ('package', 'status', 'exit', 'start', 'duration'))
+    for name in order:
+        if name in results:
+            result = results[name]
+            code = '-' if result.value is None else str(result.value)
+            start = '-' if result.start is None else '%.2fs' % result.start
+            print('%-24s %-10s %6s %9s %8.2fs' % (name, result.status, code, start, result.duration))
+    total = sum(result.duration for result in results.values())
+    wall = max([result.start + result.duration for result in results.values() if result.start is not None] + [0.0])
+    succeeded = len([result for result in results.values() if result.succeeded])
+    print('%d of %d succeeded in %.2fs, %.2fs of command time.' % (succeeded, len(results), wall, total))
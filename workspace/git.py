@@ -1,11 +1,45 @@
+import os
 import subprocess
+import tempfile
+from workspace import process
+from workspace.gitrefs import *
 
 class Git:
-    def __init__(self, directory):
+    """
+    The git repository of a package. Queries that only look up refs are answered by
+    reading the repository files directly if possible, and by running git otherwise.
+    If an operation scope is given, the answers are memoized within an operation
+    until the repository is changed through this object. The given timeouts of git commands
+    override the default timeouts.
+    """
+    def __init__(self, directory, read_refs = True, scope = None, timeouts = None):
         self.directory = directory
+        self.refs = GitRefs(directory) if read_refs else None
+        self.scope = scope
+        self.timeouts = timeouts
 
-    def git_run(self, args):
-        return subprocess.run(['git'] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.directory)
+    def memoized(self, fact, compute):
+        return self.scope.memoized((self.directory, fact), compute) if self.scope else compute()
+
+    def changed(self):
+        """ Forget the memoized answers about this repository. """
+        if self.scope:
+            self.scope.invalidate(self.directory)
+
+    def read(self, query, fallback):
+        """
+        Answer the query with the refs of the repository, or call the fallback
+        if the query cannot be answered without git.
+        """
+        if self.refs:
+            try:
+                return query(self.refs)
+            except (UnsupportedRepository, OSError):
+                pass
+        return fallback()
+
+    def git_run(self, args, env = None):
+        return process.run(['git'] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.directory, env=env, timeouts=self.timeouts)
 
     def decode_stdout(self, completed_process):
         return completed_process.stdout.rstrip().decode('utf-8')
@@ -13,30 +47,69 @@ class Git:
     def git(self, args):
         return self.decode_stdout(self.git_run(args))
 
+    def mutate(self, args):
+        """ Run a git command that changes the repository. """
+        try:
+            return self.git(args)
+        finally:
+            self.changed()
+
     def add(self, file):
-        return self.git(['add', file])
+        return self.mutate(['add', file])
+
+    def add_tracked(self, file):
+        """
+        Add the given file only if it is already tracked.
+        """
+        return self.mutate(['add', '--update', '--', file])
 
     def commit(self, message):
-        self.git(['commit', '-m', message])
+        self.mutate(['commit', '-m', message])
 
     def revision(self):
-        return self.revision_of('HEAD')
+        return self.memoized('revision', lambda: self.read(GitRefs.revision, lambda: self.revision_of('HEAD')))
 
     def is_ancestor(self, potential_ancestor, commit):
-        completed_process = self.git_run(['merge-base', '--is-ancestor', potential_ancestor, commit])
-        return completed_process.returncode == 0
+        def compute():
+            completed_process = self.git_run(['merge-base', '--is-ancestor', potential_ancestor, commit])
+            return completed_process.returncode == 0
+        # Only the answers for commit hashes can be memoized, because refs move.
+        if hash_pattern.match(potential_ancestor) and hash_pattern.match(commit):
+            return self.memoized(('is_ancestor', potential_ancestor, commit), compute)
+        return compute()
 
     def contains(self, revision):
         return self.is_ancestor(revision, self.revision())
 
     def is_dirty(self):
-        completed_process = self.git_run(['diff', '--quiet', 'HEAD'])
-        return completed_process.returncode != 0
+        return self.memoized('dirty', lambda: self.git_run(['diff', '--quiet', 'HEAD']).returncode != 0)
+
+    def source_tree(self):
+        """
+        Return the hash of the tree of the tracked files as they are in the working tree,
+        including the changes that are not committed. Untracked files are not part of it,
+        such that build output in the working tree does not change it.
+        """
+        def compute():
+            if not self.is_dirty():
+                return self.git(['rev-parse', 'HEAD^{tree}'])
+            # Stage the changes in a temporary index, such that the index of the package is not touched.
+            with tempfile.TemporaryDirectory() as directory:
+                env = dict(os.environ, GIT_INDEX_FILE=os.path.join(directory, 'index'))
+                for args in [['read-tree', 'HEAD'], ['add', '--update', '--', '.']]:
+                    completed_process = self.git_run(args, env)
+                    if completed_process.returncode != 0:
+                        raise Exception('Could not read the working tree of ' + self.directory + ': ' + completed_process.stderr.decode('utf-8').strip())
+                return self.decode_stdout(self.git_run(['write-tree'], env))
+        return self.memoized('source_tree', compute)
 
     def revision_of(self, branch_name):
         return self.git(['rev-parse', branch_name])
 
     def branch(self):
+        return self.memoized('branch', lambda: self.read(GitRefs.branch, self.git_branch))
+
+    def git_branch(self):
         branch = self.git(['rev-parse', '--symbolic-full-name', '--abbrev-ref', 'HEAD'])
         if branch == 'HEAD':
             return None
@@ -49,18 +122,23 @@ class Git:
         Note that this number is unique only within a certain branch.
         :return: The number of commits from HEAD until the first commit of the repository.
         """
-        sequence_in_branch_string = self.git(['rev-list', '--count', '--first-parent', 'HEAD'])
-        return int(sequence_in_branch_string)
+        return self.memoized('sequence_in_branch', lambda: int(self.git(['rev-list', '--count', '--first-parent', 'HEAD'])))
 
     def current_branches(self):
         return self.local_branches_of(self.revision())
 
     def local_branches_of(self, hash):
+        return self.read(lambda refs: refs.local_branches_of(hash), lambda: self.git_local_branches_of(hash))
+
+    def git_local_branches_of(self, hash):
         branches = self.git(['branch', '--format="%(refname)"', '--points-at', hash]).split('\n')
         result = [branch[12:-1] for branch in branches if branch.startswith('"refs/heads/')]
         return result
 
     def upstream_branch(self):
+        return self.memoized('upstream_branch', lambda: self.read(GitRefs.upstream_branch, self.git_upstream_branch))
+
+    def git_upstream_branch(self):
         completed_process = self.git_run(['rev-parse', '--abbrev-ref', '--symbolic-full-name', '@{u}'])
         if completed_process.returncode == 0:
             return self.decode_stdout(completed_process)
@@ -68,20 +146,30 @@ class Git:
             return None
 
     def local_branches(self):
+        return self.memoized('local_branches', lambda: self.read(GitRefs.local_branches, self.git_local_branches))
+
+    def git_local_branches(self):
         local_branches = self.git(['branch', '--list', '--format="%(refname)"']).split('\n')
         result = [branch[12:-1] for branch in local_branches if branch.startswith('"refs/heads/')]
         return result
 
     def full_remote_branches(self):
+        """
+        Return the full names of the remote tracking branches, without the symbolic HEAD refs of the remotes.
+        """
+        return self.memoized('full_remote_branches', lambda: self.read(GitRefs.full_remote_branches, self.git_full_remote_branches))
+
+    def git_full_remote_branches(self):
         remote_branches = self.git(['branch', '--list', '--remotes', '--format="%(refname)"']).split('\n')
-        result = [branch for branch in remote_branches if branch != 'refs/remotes/origin/HEAD']
+        result = [branch[1:-1] for branch in remote_branches if branch.startswith('"refs/remotes/') and not branch.endswith('/HEAD"')]
         return result
 
     def full_remote_branch_of(self, branch_name):
         return 'refs/remotes/origin/' + branch_name
 
     def remote_branches(self):
-        result = [branch[21:-1] for branch in self.full_remote_branches()]
+        prefix = self.full_remote_branch_of('')
+        result = [branch[len(prefix):] for branch in self.full_remote_branches() if branch.startswith(prefix)]
         return result
 
     def remote_branches_containing(self, commit):
@@ -107,6 +195,9 @@ class Git:
         """
         Return the remotes.
         """
+        return self.memoized('remotes', lambda: self.read(GitRefs.remotes, self.git_remotes))
+
+    def git_remotes(self):
         remotes = self.git(['remote']).split('\n')
         result = [remote for remote in remotes if remote and len(remote) > 0]
         return result
@@ -115,10 +206,10 @@ class Git:
         return len(self.remotes()) > 0
 
     def create_branch(self, name):
-        self.git(['checkout', '-b', name])
+        self.mutate(['checkout', '-b', name])
 
     def checkout_branch(self, name):
-        self.git(['checkout', name])
+        self.mutate(['checkout', name])
 
     def force_create_branch(self, name, revision):
         """
@@ -132,17 +223,82 @@ class Git:
 
     def push(self):
         if self.upstream_branch():
-            self.git(['push'])
+            self.mutate(['push'])
         else:
             self.set_upstream()
-            self.git(['push'])
+            self.mutate(['push'])
 
     def set_upstream(self):
-        self.git(['branch', '--set-upstream', 'origin', self.branch()])
+        self.mutate(['branch', '--set-upstream', 'origin', self.branch()])
 
     def checkout(self, revision):
-        self.git(['checkout', revision])
+        self.mutate(['checkout', revision])
+
+    def fetch(self, refspecs = None, negotiation_tips = None, remote = 'origin'):
+        """
+        Fetch the given refspecs from the given remote, or all branches and tags of all
+        remotes if no refspecs are given. Only the commits of the negotiation tips are
+        offered to the remote as common history. Return whether the fetch succeeded.
+        """
+        try:
+            if refspecs is None:
+                return self.git_run(['fetch']).returncode == 0
+            tips = ['--negotiation-tip=' + tip for tip in (negotiation_tips or [])]
+            return self.git_run(['fetch', '--no-tags'] + tips + [remote] + refspecs).returncode == 0
+        finally:
+            self.changed()
+
+    def remote_heads(self, branch_names, remote = 'origin'):
+        """
+        Return a dictionary from the given branch names that exist on the remote to their revision.
+        Raise an exception if the remote cannot be read.
+        """
+        if not branch_names:
+            return {}
+        completed_process = self.git_run(['ls-remote', '--heads', remote] + branch_names)
+        if completed_process.returncode != 0:
+            raise Exception('Could not list the branches of %s in %s: %s' % (remote, self.directory, completed_process.stderr.decode('utf-8').strip()))
+        result = {}
+        for line in self.decode_stdout(completed_process).split('\n'):
+            parts = line.split()
+            if len(parts) == 2 and parts[1].startswith('refs/heads/') and parts[1][len('refs/heads/'):] in branch_names:
+                result[parts[1][len('refs/heads/'):]] = parts[0]
+        return result
+
+    def ref_revision(self, name):
+        """
+        Return the revision of the ref with the given full name, or None if it does not exist.
+        """
+        return self.read(lambda refs: refs.resolve(name) if refs.read_ref(name) is not None else None,
+                         lambda: self.git(['rev-parse', '--verify', '--quiet', name]) or None)
+
+    def has_commit(self, revision):
+        return self.git_run(['cat-file', '-e', revision + '^{commit}']).returncode == 0
 
-    def fetch(self):
-        self.git(['fetch'])
+    def fetch_branches(self, branch_names, revision = None, remote = 'origin'):
+        """
+        Fetch only the given branches that exist on the remote and of which the remote-tracking
+        branch is out of date, and the given revision if it is not in the repository.
+        The current HEAD and the remote-tracking branches are used as negotiation tips.
+        Return whether the fetch succeeded, and raise an exception if the remote cannot be read.
+        """
+        heads = self.remote_heads(branch_names, remote)
+        refspecs = []
+        tips = ['HEAD']
+        for branch_name, head in sorted(heads.items()):
+            tracking_ref = 'refs/remotes/' + remote + '/' + branch_name
+            tracking_revision = self.ref_revision(tracking_ref)
+            if tracking_revision != head:
+                refspecs.append('+refs/heads/' + branch_name + ':' + tracking_ref)
+                if tracking_revision:
+                    tips.append(tracking_ref)
+        if not refspecs and (not revision or self.has_commit(revision)):
+            return True
+        if revision and revision not in heads.values() and not self.has_commit(revision):
+            # The revision is only reachable from another branch. Fetch it directly, which needs
+            # a remote that allows fetching reachable commits by hash.
+            if self.fetch(refspecs + [revision], tips, remote):
+                return True
+            print('Could not fetch revision ' + revision + ' from ' + remote + ' in ' + self.directory)
+        return self.fetch(refspecs, tips, remote) if refspecs else False
 
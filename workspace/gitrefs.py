@@ -0,0 +1,245 @@
+import os
+import re
+
+
+class UnsupportedRepository(Exception):
+    """
+    Raised when a query cannot be answered by reading the repository files directly.
+    The query must then be answered by git itself.
+    """
+    pass
+
+
+hash_pattern = re.compile('^[0-9a-f]{40}$')
+
+
+class GitRefs:
+    """
+    Read-only access to the references of a git repository by reading HEAD, the loose refs,
+    packed-refs and the config file directly, without starting git. Worktrees and
+    repositories of which .git is a 'gitdir:' file are supported.
+
+    For anything that is not supported, such as unborn branches, reftable storage
+    or config includes, UnsupportedRepository is raised.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def git_directory(self):
+        dot_git = os.path.join(self.directory, ".git")
+        if os.path.isdir(dot_git):
+            return dot_git
+        if os.path.isfile(dot_git):
+            with open(dot_git) as file:
+                content = file.read().strip()
+            if content.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(self.directory, content[7:].strip()))
+        raise UnsupportedRepository('No git directory in ' + self.directory)
+
+    def common_directory(self):
+        """
+        Return the directory that contains the refs that are shared by all worktrees.
+        """
+        git_directory = self.git_directory()
+        commondir = os.path.join(git_directory, "commondir")
+        if os.path.isfile(commondir):
+            with open(commondir) as file:
+                return os.path.normpath(os.path.join(git_directory, file.read().strip()))
+        return git_directory
+
+    def config(self):
+        """
+        Return the config of the repository as a dictionary from (section, subsection, key) to the last value.
+        Sections and keys are lower case. The subsection is None for sections without one.
+        """
+        result = {}
+        path = os.path.join(self.common_directory(), "config")
+        if not os.path.isfile(path):
+            return result
+        section = None
+        subsection = None
+        with open(path) as file:
+            for line in file:
+                line = line.strip()
+                if not line or line[0] in '#;':
+                    continue
+                header = re.match(r'^\[\s*([A-Za-z0-9.-]+)\s*(?:"((?:[^"\\]|\\.)*)")?\s*\](.*)$', line)
+                if header:
+                    section = header.group(1).lower()
+                    subsection = re.sub(r'\\(.)', r'\1', header.group(2)) if header.group(2) is not None else None
+                    if section.startswith('include') or '.' in section:
+                        raise UnsupportedRepository('Unsupported config section ' + section)
+                    line = header.group(3).strip()
+                    if not line or line[0] in '#;':
+                        continue
+                if line.endswith('\\') or section is None:
+                    raise UnsupportedRepository('Unsupported config line ' + line)
+                key, separator, value = line.partition('=')
+                result[(section, subsection, key.strip().lower())] = parse_config_value(value) if separator else 'true'
+        if result.get(('extensions', None, 'refstorage'), 'files') != 'files':
+            raise UnsupportedRepository('Unsupported ref storage')
+        return result
+
+    def head(self):
+        """
+        Return the content of HEAD of the current worktree.
+        """
+        with open(os.path.join(self.git_directory(), "HEAD")) as file:
+            return file.read().strip()
+
+    def packed_refs(self):
+        result = {}
+        path = os.path.join(self.common_directory(), "packed-refs")
+        if os.path.isfile(path):
+            with open(path) as file:
+                for line in file:
+                    if line.startswith('#') or line.startswith('^'):
+                        continue
+                    parts = line.split()
+                    if len(parts) == 2:
+                        result[parts[1]] = parts[0]
+        return result
+
+    def loose_refs(self, prefix):
+        """
+        Return a dictionary from the names of the loose refs that start with the given prefix to their content.
+        """
+        result = {}
+        base = os.path.join(self.common_directory(), *prefix.split('/'))
+        for root, directories, files in os.walk(base):
+            for file_name in files:
+                if file_name.endswith('.lock'):
+                    continue
+                path = os.path.join(root, file_name)
+                name = prefix + os.path.relpath(path, base).replace(os.sep, '/')
+                with open(path) as file:
+                    result[name] = file.read().strip()
+        return result
+
+    def refs(self, prefix):
+        """
+        Return a dictionary from the names of the refs that start with the given prefix
+        to their content: a hash or, for symbolic refs, 'ref: ' followed by the target.
+        """
+        result = {name: value for name, value in self.packed_refs().items() if name.startswith(prefix)}
+        result.update(self.loose_refs(prefix))
+        return result
+
+    def read_ref(self, name):
+        """
+        Return the content of the ref with the given full name, or None if it does not exist.
+        """
+        if name == 'HEAD':
+            return self.head()
+        path = os.path.join(self.common_directory(), *name.split('/'))
+        if os.path.isfile(path):
+            with open(path) as file:
+                return file.read().strip()
+        return self.packed_refs().get(name)
+
+    def resolve(self, name):
+        """
+        Return the hash to which the ref with the given full name resolves, following symbolic refs.
+        """
+        for depth in range(5):
+            value = self.read_ref(name)
+            if value is None:
+                raise UnsupportedRepository('Unknown ref ' + name)
+            if value.startswith('ref:'):
+                name = value[4:].strip()
+            elif hash_pattern.match(value):
+                return value
+            else:
+                raise UnsupportedRepository('Unsupported ref ' + name)
+        raise UnsupportedRepository('Symbolic ref loop at ' + name)
+
+    def revision(self):
+        return self.resolve('HEAD')
+
+    def branch(self):
+        """ Return the name of the current branch, or None if HEAD is detached. """
+        head = self.head()
+        if not head.startswith('ref:'):
+            return None
+        name = head[4:].strip()
+        # An unborn branch is handled by git.
+        self.resolve(name)
+        if not name.startswith('refs/heads/'):
+            raise UnsupportedRepository('HEAD refers to ' + name)
+        return name[len('refs/heads/'):]
+
+    def branch_refs(self, prefix):
+        """
+        Return a sorted list of (name, hash) of the refs that start with the given prefix.
+        Symbolic refs are omitted.
+        """
+        return sorted((name, value) for name, value in self.refs(prefix).items() if hash_pattern.match(value))
+
+    def local_branches(self):
+        return [name[len('refs/heads/'):] for name, value in self.branch_refs('refs/heads/')]
+
+    def local_branches_of(self, hash):
+        if not hash_pattern.match(hash):
+            raise UnsupportedRepository('Not a full hash: ' + hash)
+        return [name[len('refs/heads/'):] for name, value in self.branch_refs('refs/heads/') if value == hash]
+
+    def full_remote_branches(self):
+        return [name for name, value in self.branch_refs('refs/remotes/') if not name.endswith('/HEAD')]
+
+    def remotes(self):
+        result = []
+        for (section, subsection, key) in self.config():
+            # Settings such as remote.pushDefault are in a remote section without a subsection.
+            if section == 'remote' and subsection is not None and subsection not in result:
+                result.append(subsection)
+        # Git lists the remotes in alphabetical order.
+        return sorted(result)
+
+    def upstream_branch(self):
+        """
+        Return the short name of the upstream branch of the current branch, or None if there is none.
+        """
+        branch = self.branch()
+        if branch is None:
+            return None
+        config = self.config()
+        remote = config.get(('branch', branch, 'remote'))
+        merge = config.get(('branch', branch, 'merge'))
+        if remote is None or merge is None:
+            return None
+        if not merge.startswith('refs/heads/'):
+            raise UnsupportedRepository('Unsupported upstream ' + merge)
+        merge_branch = merge[len('refs/heads/'):]
+        if remote == '.':
+            tracking_ref = merge
+        else:
+            fetch = config.get(('remote', remote, 'fetch'))
+            if fetch != '+refs/heads/*:refs/remotes/' + remote + '/*':
+                raise UnsupportedRepository('Unsupported fetch refspec for remote ' + remote)
+            tracking_ref = 'refs/remotes/' + remote + '/' + merge_branch
+        if self.read_ref(tracking_ref) is None:
+            raise UnsupportedRepository('Missing upstream ' + tracking_ref)
+        return tracking_ref[len('refs/heads/'):] if remote == '.' else tracking_ref[len('refs/remotes/'):]
+
+
+def parse_config_value(value):
+    """
+    Return the value of a config line without its comment and with its quotes and escapes resolved.
+    """
+    result = ''
+    quoted = False
+    index = 0
+    value = value.strip()
+    while index < len(value):
+        character = value[index]
+        if character == '"':
+            quoted = not quoted
+        elif character == '\\' and index + 1 < len(value):
+            index = index + 1
+            result = result + {'n': '\n', 't': '\t', 'b': '\b'}.get(value[index], value[index])
+        elif character in '#;' and not quoted:
+            break
+        else:
+            result = result + character
+        index = index + 1
+    return result.strip()
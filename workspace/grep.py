@@ -0,0 +1,114 @@
+import re
+import subprocess
+import sys
+import threading
+from workspace import process
+from workspace.packagereference import *
+from workspace.scheduler import *
+
+
+class Match:
+    """
+    A line of a file of a package that matches a search. The path is relative to the package directory.
+    """
+    __slots__ = ('package', 'path', 'line_number', 'text')
+
+    def __init__(self, package, path, line_number, text):
+        self.package = package
+        self.path = path
+        self.line_number = line_number
+        self.text = text
+
+    def __str__(self):
+        return '%s/%s:%d:%s' % (self.package, self.path, self.line_number, self.text)
+
+
+def searched_package_names(workspace, related = None):
+    """
+    Return the names of the downloaded packages in topological order, or only those of them that
+    are the given package or depend on it or on which it depends.
+    """
+    names = [name for name in workspace.package_name_order() if workspace.package(name).is_downloaded()]
+    if related:
+        if not workspace.has_package(related):
+            raise Exception("The workspace does not have a package named " + related)
+        related_names = workspace.reachability.ancestors(related) | workspace.reachability.descendants(related) | {related}
+        names = [name for name in names if name in related_names]
+    return names
+
+
+def grep(workspace, patterns, conanfiles_only = False, related = None, ignore_case = False, fixed_strings = False, jobs = 8, on_match = None):
+    """
+    Search the tracked files of the downloaded packages, optionally only their conanfiles or only
+    the packages related to the given package, for lines that match one of the extended regular
+    expressions with git grep. The packages are searched by at most jobs processes at the same time,
+    and on_match is called with every Match as soon as it is found, from one thread at a time.
+    Return the matches in the order of the packages.
+    """
+    names = searched_package_names(workspace, related)
+    lock = threading.Lock()
+    matches = {name: [] for name in names}
+    arguments = ['git', 'grep', '-n', '--null', '-I', '--no-color', '-F' if fixed_strings else '-E']
+    if ignore_case:
+        arguments = arguments + ['-i']
+    for pattern in patterns:
+        arguments = arguments + ['-e', pattern]
+    if conanfiles_only:
+        arguments = arguments + ['--', 'conanfile.py']
+
+    def task(name):
+        def run():
+            errors = []
+
+            def line(text):
+                # With --null the path and the line number are followed by a null character,
+                # which separates the matches from the errors on the same stream.
+                fields = text.split('\0', 2)
+                if len(fields) < 3:
+                    errors.append(text)
+                    return
+                match = Match(name, fields[0], int(fields[1]), fields[2])
+                with lock:
+                    matches[name].append(match)
+                    if on_match:
+                        on_match(match)
+            completed_process = process.run(arguments, stderr=subprocess.PIPE, cwd=workspace.package(name).directory(),
+                                            on_line=line, timeouts=workspace.timeouts)
+            # git grep exits with 1 if nothing matches.
+            if completed_process.returncode > 1:
+                raise Exception('Could not search package %s: %s' % (name, ' '.join(errors)))
+            return len(matches[name])
+        return run
+
+    results = Scheduler(jobs).run({name: task(name) for name in names})
+    errors = [result.error for result in results.values() if not result.succeeded]
+    if errors:
+        raise Exception('\n'.join(sorted(errors)))
+    return [match for name in names for match in matches[name]]
+
+
+def check_pins(workspace, jobs = 8):
+    """
+    Search the conanfiles of the downloaded packages for the references of the packages of the
+    workspace, and return a message for every pinned sequence in the branch and revision that
+    differs from the main reference of the package.
+    """
+    names = sorted(workspace.main_references, key=len, reverse=True)
+    if not names:
+        return []
+    # The requirement pattern of the peg, for all packages at once.
+    regex = re.compile(requirement_pattern % '|'.join(re.escape(name) for name in names))
+    messages = []
+    for match in grep(workspace, [r'\.[0-9]+\.[a-z0-9]{40}'], conanfiles_only=True, jobs=jobs):
+        for name, semantic_version, sequence_in_branch, revision in regex.findall(match.text):
+            main_reference = workspace.main_references[name]
+            if int(sequence_in_branch) != main_reference.sequence_in_branch or revision != main_reference.revision:
+                messages.append('%s/%s:%d pins %s/%s.%s.%s, but the workspace uses %s.' % (
+                    match.package, match.path, match.line_number, name, semantic_version, sequence_in_branch, revision,
+                    main_reference.to_string()))
+    return messages
+
+
+def print_match(match):
+    sys.stdout.write(str(match) + '\n')
+    sys.stdout.flush()
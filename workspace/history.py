@@ -0,0 +1,181 @@
+import contextlib
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from workspace import process
+
+
+class OperationRecord:
+    """
+    The measurements of a single operation on a workspace while it runs.
+    """
+    def __init__(self, operation, package_count):
+        self.operation = operation
+        self.package_count = package_count
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.start_process_count = process.process_count()
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """ Measure the duration of a phase of the operation. A phase can be measured several times. """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def duration(self):
+        return time.perf_counter() - self.start
+
+    def process_count(self):
+        return process.process_count() - self.start_process_count
+
+
+class History:
+    """
+    The history of the operations on a workspace, stored in a SQLite database under the
+    workspace root. For every operation it records when it ran, the number of packages,
+    its duration, the durations of its phases and the number of processes it started.
+    The functions in on_start are called with the record of every operation that starts.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.on_start = []
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute('''CREATE TABLE IF NOT EXISTS operations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp REAL NOT NULL,
+            operation TEXT NOT NULL,
+            package_count INTEGER NOT NULL,
+            duration REAL NOT NULL,
+            phases TEXT NOT NULL,
+            process_count INTEGER NOT NULL,
+            succeeded INTEGER NOT NULL)''')
+        return connection
+
+    @property
+    def current(self):
+        """ Return the record of the operation that runs in the current thread, or None. """
+        return getattr(self._local, 'current', None)
+
+    @contextlib.contextmanager
+    def record(self, operation, package_count):
+        """
+        Record the operation that runs in the body of the with statement. Operations that are
+        started while another operation runs in the same thread are part of that operation.
+        """
+        if self.current:
+            yield self.current
+            return
+        record = OperationRecord(operation, package_count)
+        self._local.current = record
+        for function in self.on_start:
+            function(record)
+        succeeded = False
+        try:
+            yield record
+            succeeded = True
+        finally:
+            self._local.current = None
+            try:
+                self.add(record.operation, record.timestamp, record.package_count, record.duration(), record.phases, record.process_count(), succeeded)
+            except sqlite3.Error as error:
+                # The history must never break the operation itself.
+                print("Could not record the operation in the history: " + str(error))
+
+    def phase(self, name):
+        """ Measure a phase of the operation that runs in the current thread, if any. """
+        return self.current.phase(name) if self.current else contextlib.nullcontext()
+
+    def add(self, operation, timestamp, package_count, duration, phases, process_count, succeeded = True):
+        with contextlib.closing(self.connect()) as connection:
+            with connection:
+                connection.execute('INSERT INTO operations (timestamp, operation, package_count, duration, phases, process_count, succeeded) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   (timestamp, operation, package_count, duration, json.dumps(phases), process_count, 1 if succeeded else 0))
+
+    def records(self, operation = None):
+        """
+        Return the records of the successful operations, optionally only those of the given
+        operation, as dictionaries in chronological order.
+        """
+        query = 'SELECT timestamp, operation, package_count, duration, phases, process_count FROM operations WHERE succeeded = 1'
+        parameters = ()
+        if operation:
+            query = query + ' AND operation = ?'
+            parameters = (operation,)
+        with contextlib.closing(self.connect()) as connection:
+            rows = connection.execute(query + ' ORDER BY timestamp', parameters).fetchall()
+        return [{
+            "timestamp": row[0],
+            "operation": row[1],
+            "package_count": row[2],
+            "duration": row[3],
+            "phases": json.loads(row[4]),
+            "process_count": row[5]
+        } for row in rows]
+
+    def statistics(self, operation = None, window = 5, threshold = 1.25):
+        """
+        Return the statistics of the durations per operation, sorted by operation.
+        An operation is flagged as a regression if the median duration of its last
+        window runs exceeds the median duration of the runs before by the given factor.
+        """
+        records_per_operation = {}
+        for record in self.records(operation):
+            records_per_operation.setdefault(record["operation"], []).append(record)
+        result = []
+        for name, records in sorted(records_per_operation.items()):
+            durations = [record["duration"] for record in records]
+            recent = durations[-window:]
+            previous = durations[-4 * window:-window]
+            recent_median = percentile(recent, 50)
+            previous_median = percentile(previous, 50) if len(previous) >= 3 else None
+            result.append({
+                "operation": name,
+                "count": len(records),
+                "p50": percentile(durations, 50),
+                "p90": percentile(durations, 90),
+                "p99": percentile(durations, 99),
+                "last": durations[-1],
+                "package_count": records[-1]["package_count"],
+                "process_count": records[-1]["process_count"],
+                "recent_median": recent_median,
+                "previous_median": previous_median,
+                "regression": previous_median is not None and recent_median > threshold * previous_median
+            })
+        return result
+
+
+def percentile(values, percent):
+    """
+    Return the given percentile of the values using linear interpolation, or None if there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def recorded(operation):
+    """
+    Decorate a method of a workspace such that every call is recorded in the history of the workspace.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.history.record(operation, self.graph.number_of_nodes()):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
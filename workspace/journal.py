@@ -0,0 +1,89 @@
+import json
+import os
+import time
+
+
+class PegJournal:
+    """
+    The journal of a peg. Every completed step of a peg is recorded in a file under
+    the workspace root, such that a peg that was interrupted can be resumed without
+    redoing the steps that were already completed.
+
+    Step keys are created with peg_step, pin_step and install_step.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.editable_package_names = []
+        self.commit_message = None
+        self.steps = {}
+
+    @classmethod
+    def load(cls, path):
+        journal = PegJournal(path)
+        with open(path) as json_file:
+            data = json.load(json_file)
+            journal.editable_package_names = data["editable_package_names"]
+            journal.commit_message = data["commit_message"]
+            journal.steps = data["steps"]
+        return journal
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def start(self, editable_package_names, commit_message):
+        """
+        Start a new journal. Any steps of a previous peg are discarded.
+        """
+        self.editable_package_names = list(editable_package_names)
+        self.commit_message = commit_message
+        self.steps = {}
+        self.save()
+
+    def step(self, key):
+        """
+        Return the data that was recorded for the given step, or None if the step
+        has not been completed.
+        """
+        return self.steps.get(key)
+
+    def record(self, key, **data):
+        data["time"] = time.time()
+        self.steps[key] = data
+        self.save()
+
+    def has_changed(self, package_name):
+        """
+        Check if the peg changed the given package: if it was pegged or if a revision was pinned in its conanfile.
+        """
+        return any(key == peg_step(package_name) or (key.startswith('pin ') and key.endswith(' in ' + package_name)) for key in self.steps)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write to a temporary file first such that an interruption cannot leave a corrupt journal.
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as json_file:
+            json.dump({
+                "editable_package_names": self.editable_package_names,
+                "commit_message": self.commit_message,
+                "steps": self.steps
+            }, json_file, indent=4)
+        os.replace(temporary_path, self.path)
+
+    def finish(self):
+        """
+        Remove the journal. This is done when the peg has completed.
+        """
+        if self.exists():
+            os.remove(self.path)
+
+
+def peg_step(package_name):
+    return 'peg ' + package_name
+
+
+def pin_step(dependency_name, package_name):
+    return 'pin ' + package_name + ' in ' + dependency_name
+
+
+def install_step(package_name):
+    return 'install ' + package_name
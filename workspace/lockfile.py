@@ -0,0 +1,172 @@
+import json
+import os
+import re
+import sys
+from workspace.packagereference import *
+
+
+class LockNode:
+    """
+    The fields of a node of a lockfile that the workspace needs: the reference
+    of the package and the ids of the nodes that it requires.
+    """
+    __slots__ = ('ref', 'requires')
+
+    def __init__(self, ref, requires):
+        self.ref = ref
+        self.requires = requires
+
+
+whitespace = re.compile(r'[ \t\n\r]*')
+
+
+class JsonStream:
+    """
+    Incremental reading of a JSON document from a file. The values are decoded one at a
+    time from a buffer that is filled with chunks of the file, such that only the part of
+    the document that is being decoded is kept in memory.
+    """
+    def __init__(self, file, chunk_size = 1 << 16):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.end_of_file = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, size):
+        """ Read at least size characters more, unless the end of the file is reached. Return whether anything was read. """
+        if self.position > 0:
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+        chunk = self.file.read(max(size, self.chunk_size))
+        if not chunk:
+            self.end_of_file = True
+            return False
+        self.buffer = self.buffer + chunk
+        return True
+
+    def peek(self):
+        """ Skip whitespace and return the next character, or '' at the end of the file. """
+        while True:
+            self.position = whitespace.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill(self.chunk_size):
+                return ''
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError('Expected %s at offset %d of the lockfile.' % (character, self.position))
+        self.position = self.position + 1
+
+    def value(self):
+        """
+        Decode the next value. A value that does not fit in the buffer is decoded again
+        after reading more of the file.
+        """
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number at the end of the buffer may continue in the next chunk.
+                if end < len(self.buffer) or self.end_of_file:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.end_of_file:
+                    raise
+            self.fill(size)
+            size = size * 2
+
+    def members(self):
+        """
+        Iterate the keys of the next object. The caller must read the value of
+        every key before the next key is read.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.position = self.position + 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.position = self.position + 1
+            else:
+                self.expect('}')
+                return
+
+
+class LockFile:
+    """
+    The conan.lock file of a package. The references of the nodes are stored
+    in the 'ref' fields of graph_lock.nodes.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            with open(self.path) as json_file:
+                self._data = json.load(json_file)
+        return self._data
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def nodes(self):
+        return self.data["graph_lock"]["nodes"]
+
+    def graph_nodes(self, chunk_size = 1 << 16):
+        """
+        Return the nodes of the lockfile as a dictionary from node ids to LockNode objects.
+        The file is read incrementally and only the reference and the requirements of
+        every node are kept. The node ids are interned, because every id is repeated in
+        the requirements of the nodes that depend on it.
+        """
+        if self._data is not None:
+            return {sys.intern(index): LockNode(node["ref"], [sys.intern(dependency) for dependency in node.get("requires", [])]) for index, node in self.nodes().items()}
+        result = {}
+        with open(self.path) as json_file:
+            stream = JsonStream(json_file, chunk_size)
+            for key in stream.members():
+                if key != "graph_lock":
+                    stream.value()
+                    continue
+                for graph_lock_key in stream.members():
+                    if graph_lock_key != "nodes":
+                        stream.value()
+                        continue
+                    for index in stream.members():
+                        node = stream.value()
+                        result[sys.intern(index)] = LockNode(node["ref"], [sys.intern(dependency) for dependency in node.get("requires", [])])
+        return result
+
+    def update_references(self, references):
+        """
+        Replace the references of the nodes of the packages in the given dictionary
+        from package names to package references.
+        Return the number of nodes of which the reference changed.
+        """
+        changed = 0
+        for node in self.nodes().values():
+            reference = PackageReference.from_string(node["ref"])
+            if reference.name in references:
+                new_reference_string = references[reference.name].to_string()
+                if node["ref"] != new_reference_string:
+                    node["ref"] = new_reference_string
+                    changed = changed + 1
+        return changed
+
+    def save(self):
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as json_file:
+            # Conan writes lockfiles with an indentation of a single space.
+            json.dump(self.data, json_file, indent=1)
+        os.replace(temporary_path, self.path)
+
@@ -0,0 +1,108 @@
+import contextlib
+import functools
+import threading
+from workspace.conan import *
+
+
+class Memo:
+    """
+    The facts that were determined during an operation. The keys are tuples of which
+    the first element is the subject of the fact, such as the directory of a package,
+    such that all facts about a subject can be forgotten at once.
+    """
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key, compute):
+        if key not in self.values:
+            self.values[key] = compute()
+        return self.values[key]
+
+    def invalidate(self, subject = None):
+        """ Forget the facts about the given subject, or all facts if no subject is given. """
+        if subject is None:
+            self.values.clear()
+        else:
+            for key in [key for key in self.values if key[0] == subject]:
+                del self.values[key]
+
+
+class OperationScope:
+    """
+    The operation that runs in the current thread. Within an operation the facts about the
+    packages are memoized. Outside of an operation every fact is determined again.
+    An operation that is started within another operation is part of that operation.
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def memo(self):
+        return getattr(self._local, 'memo', None)
+
+    @contextlib.contextmanager
+    def operation(self):
+        if self.memo is not None:
+            yield self.memo
+            return
+        self._local.memo = Memo()
+        try:
+            yield self._local.memo
+        finally:
+            self._local.memo = None
+
+    def memoized(self, key, compute):
+        memo = self.memo
+        return memo.get(key, compute) if memo is not None else compute()
+
+    def invalidate(self, subject = None):
+        memo = self.memo
+        if memo is not None:
+            memo.invalidate(subject)
+
+
+def in_operation(method):
+    """
+    Decorate a method of a workspace such that every call runs in an operation.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.operation():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ScopedConan(Conan):
+    """
+    A Conan backend of which the editables are memoized in an operation scope.
+    They are forgotten when an editable is added or removed.
+    """
+    subject = 'conan'
+
+    def __init__(self, conan, scope):
+        self.conan = conan
+        self.scope = scope
+
+    def editable_add(self, path, reference, cwd = None):
+        try:
+            return self.conan.editable_add(path, reference, cwd)
+        finally:
+            self.scope.invalidate(self.subject)
+
+    def editable_remove(self, reference):
+        try:
+            return self.conan.editable_remove(reference)
+        finally:
+            self.scope.invalidate(self.subject)
+
+    def editables(self):
+        return self.scope.memoized((self.subject, 'editables'), self.conan.editables)
+
+    def install(self, directory):
+        return self.conan.install(directory)
+
+    def source(self, directory):
+        return self.conan.source(directory)
+
+    def build(self, directory):
+        return self.conan.build(directory)
@@ -0,0 +1,142 @@
+import concurrent.futures
+import json
+import os
+import threading
+import yaml
+from workspace.conan import *
+from workspace.workspace import Workspace, detect_main
+
+
+class CachingConan(Conan):
+    """
+    A Conan backend that is shared by several workspaces. The editables are registered
+    in the Conan cache of the user, so they are read once for all of the workspaces.
+    """
+    def __init__(self, conan):
+        self.conan = conan
+        self.lock = threading.Lock()
+        self.editable_packages = None
+
+    def editable_add(self, path, reference, cwd = None):
+        self.invalidate()
+        return self.conan.editable_add(path, reference, cwd)
+
+    def editable_remove(self, reference):
+        self.invalidate()
+        return self.conan.editable_remove(reference)
+
+    def editables(self):
+        with self.lock:
+            if self.editable_packages is None:
+                self.editable_packages = self.conan.editables()
+            return self.editable_packages
+
+    def install(self, directory):
+        return self.conan.install(directory)
+
+    def source(self, directory):
+        return self.conan.source(directory)
+
+    def build(self, directory):
+        return self.conan.build(directory)
+
+    def invalidate(self):
+        with self.lock:
+            self.editable_packages = None
+
+
+def workspace_main(directory):
+    """
+    Return the main package of the workspace in the given directory as configured
+    in its workspace.yml or detected from the conan.lock files, or None if the
+    directory is not a workspace.
+    """
+    path = os.path.join(directory, "workspace.yml")
+    if os.path.exists(path):
+        with open(path) as stream:
+            configuration = yaml.safe_load(stream)
+        if configuration and configuration.get("main"):
+            return configuration["main"]
+    return detect_main(directory)
+
+
+def discover_workspaces(roots):
+    """
+    Return a sorted list of (directory, main) of the workspaces in the given directories.
+    A directory that is not a workspace itself is searched for workspaces one level deep.
+    """
+    result = {}
+    for root in roots:
+        root = os.path.abspath(root)
+        main = workspace_main(root)
+        if main:
+            result[root] = main
+            continue
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir() and not entry.name.startswith('.'):
+                    main = workspace_main(entry.path)
+                    if main:
+                        result[entry.path] = main
+    return sorted(result.items())
+
+
+def workspace_summary(directory, main, conan):
+    """
+    Return the status of the workspace in the given directory together with the
+    packages that violate its consistency: the packages on another branch than
+    the main package, the packages with local changes and the packages whose
+    revision does not contain the pegged revision.
+    """
+    summary = {"root": directory, "main": main}
+    try:
+        statuses = Workspace(main, directory, conan).status()
+    except Exception as error:
+        summary["error"] = str(error)
+        return summary
+    downloaded = [status for status in statuses if status["downloaded"]]
+    main_status = next((status for status in downloaded if status["name"] == main), None)
+    branch = main_status["branch"] if main_status else None
+    summary["branch"] = branch
+    summary["package_count"] = len(statuses)
+    summary["downloaded_count"] = len(downloaded)
+    summary["other_branch"] = [{"name": status["name"], "branch": status["branch"]} for status in downloaded if status["branch"] != branch]
+    summary["dirty"] = [status["name"] for status in downloaded if status["dirty"]]
+    summary["invalid"] = [status["name"] for status in downloaded if not status["valid"]]
+    summary["consistent"] = not summary["other_branch"] and not summary["invalid"]
+    summary["packages"] = statuses
+    return summary
+
+
+def multi_status(roots, jobs = 8, conan = None):
+    """
+    Return the summaries of all workspaces in the given directories, sorted by directory.
+    The workspaces are evaluated concurrently and share one Conan backend.
+    """
+    conan = CachingConan(conan if conan else conan_backend())
+    workspaces = discover_workspaces(roots)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return list(executor.map(lambda workspace: workspace_summary(workspace[0], workspace[1], conan), workspaces))
+
+
+def summary_message(summary):
+    if "error" in summary:
+        return summary["root"] + " : error : " + summary["error"]
+    msg = summary["root"] + " : " + summary["main"] + " : " + (summary["branch"] if summary["branch"] else "detached")
+    msg = msg + " : %d of %d downloaded" % (summary["downloaded_count"], summary["package_count"])
+    msg = msg + (" : consistent" if summary["consistent"] else " : inconsistent")
+    for entry in summary["other_branch"]:
+        msg = msg + "\n    " + entry["name"] + " is on " + (entry["branch"] if entry["branch"] else "a detached head")
+    for name in summary["invalid"]:
+        msg = msg + "\n    " + name + " has an invalid revision"
+    for name in summary["dirty"]:
+        msg = msg + "\n    " + name + " has local changes"
+    return msg
+
+
+def print_summaries(summaries, as_json = False):
+    if as_json:
+        print(json.dumps(summaries, indent=4))
+    else:
+        for summary in summaries:
+            print(summary_message(summary))
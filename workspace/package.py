@@ -1,4 +1,3 @@
-import subprocess
 import os
 from workspace.git import *
 from workspace.editable import *
@@ -8,11 +7,14 @@ class Package:
     def __init__(self, name, workspace):
         self.name = name
         self.workspace = workspace
-        self.git = Git(self.directory())
+        self.git = Git(self.directory(), scope=workspace.scope, timeouts=workspace.timeouts)
 
     def directory(self):
         return os.path.join(self.workspace.root, self.name)
 
+    def conanfile(self):
+        return os.path.join(self.directory(), 'conanfile.py')
+
     def commit(self, commit_message = None):
         """
         Commit the current package if it is dirty.
@@ -22,6 +24,8 @@ class Package:
         """
         if self.git.is_dirty():
             self.git.add('conanfile.py')
+            if self.name == self.workspace.main:
+                self.git.add_tracked('conan.lock')
             self.git.commit('Requirements version bump' if not commit_message else commit_message)
         return self.git.revision()
 
@@ -55,16 +59,16 @@ class Package:
 
     def toggle_editable(self):
         if self.is_editable():
-            subprocess.run(['conan', 'editable', 'remove', self.main_reference()])
+            self.workspace.conan.editable_remove(str(self.main_reference()))
         else:
-            subprocess.run(['conan', 'editable', 'add', str(Path(self.directory(), 'conanfile.py')), str(self.main_reference())])
+            self.workspace.conan.editable_add(str(Path(self.directory(), 'conanfile.py')), str(self.main_reference()))
 
     def edit(self, actual = False):
         if self.is_downloaded():
             ref = self.workspace.main_references[self.name]
             if actual:
                 ref = ref.clone(self.git.sequence_in_branch(), self.git.revision())
-            subprocess.run(['conan', 'editable', 'add', self.directory(), ref.to_string()], cwd=self.workspace.root)
+            self.workspace.conan.editable_add(self.directory(), ref.to_string(), cwd=self.workspace.root)
 
     def close(self):
         if self.is_editable():
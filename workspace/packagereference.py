@@ -1,6 +1,11 @@
 import re
+import sys
 from workspace.contract import *
 
+# The pattern of a requirement of packages in a conanfile, for a pattern of package names.
+# The groups are the package name, the semantic version, the sequence in the branch and the revision.
+requirement_pattern = r'(?<![\w.+-])(%s)/([^/@\s\'"]*)\.([0-9]+)\.([a-z0-9]{40})'
+
 
 class PackageReference:
     """
@@ -24,7 +29,9 @@ class PackageReference:
 
         channel_match = re.search('@[a-zA-Z]*/([a-zA-Z]*)', reference_string)
         channel = channel_match.group(1) if channel_match else None
-        return PackageReference(name, semantic_version, sequence_in_branch, revision, user, channel)
+        # The names, versions, users and channels are shared by many references of a lockfile.
+        return PackageReference(sys.intern(name), sys.intern(semantic_version), sequence_in_branch, revision,
+                                sys.intern(user) if user else user, sys.intern(channel) if channel else channel)
 
     def __init__(self, name, semantic_version, sequence_in_branch, revision, user, channel):
         require(name)
@@ -0,0 +1,208 @@
+import os
+import signal
+import subprocess
+import threading
+
+
+class ProcessTimeout(Exception):
+    """ Raised when a process did not finish within the timeout of its command. """
+    pass
+
+
+class Cancelled(Exception):
+    """ Raised when a process was stopped, or not started, because the operation was cancelled. """
+    pass
+
+
+# The default timeouts in seconds of the commands, by the longest matching command prefix.
+# Commands without a matching prefix have no timeout.
+default_timeouts = {
+    'git': 120,
+    'git clone': 1800,
+    'git fetch': 600,
+    'git ls-remote': 120,
+    'git push': 600,
+    'conan': 600,
+    'conan install': 3600,
+    'conan source': 1800,
+    'conan build': 7200
+}
+
+# Git and Conan must fail instead of waiting for input that never comes.
+non_interactive_environment = {
+    'GIT_TERMINAL_PROMPT': '0',
+    'GCM_INTERACTIVE': 'never',
+    'GIT_SSH_COMMAND': 'ssh -o BatchMode=yes',
+    'CONAN_NON_INTERACTIVE': '1'
+}
+
+
+class Supervisor:
+    """
+    Starts and supervises all processes of the workspace. Every process runs without input
+    in a non-interactive environment, in its own process group, and is killed together with
+    its children when it exceeds the timeout of its command, when the operation is cancelled,
+    or when the workspace is interrupted with Ctrl-C. Captured output is read line by line
+    and bounded by max_output characters per stream.
+    """
+    def __init__(self, timeouts = None, max_output = 32 << 20):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.processes = set()
+        self.cancelled = threading.Event()
+        self.timeouts = dict(default_timeouts)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.max_output = max_output
+
+    def timeout_of(self, args, timeouts = None):
+        """
+        Return the timeout of the command with the given arguments. The given timeouts of
+        command prefixes, such as those of a workspace, override the timeouts of the supervisor.
+        """
+        if timeouts:
+            timeouts = dict(self.timeouts, **timeouts)
+        else:
+            timeouts = self.timeouts
+        for length in range(len(args), 0, -1):
+            prefix = ' '.join(str(arg) for arg in args[:length])
+            if prefix in timeouts:
+                return timeouts[prefix]
+        return None
+
+    def environment(self, env = None):
+        result = dict(os.environ if env is None else env)
+        for key, value in non_interactive_environment.items():
+            result.setdefault(key, value)
+        return result
+
+    def run(self, args, stdout = None, stderr = None, cwd = None, env = None, timeout = None, on_line = None, timeouts = None):
+        """
+        Run a process like subprocess.run and return a subprocess.CompletedProcess.
+        Output that is captured with subprocess.PIPE is returned as bytes. If on_line is
+        given, it is called with every line of output, as a string, while the process runs.
+        If no timeout is given, the timeout of the command is looked up in timeouts and in the
+        timeouts of the supervisor. A timeout of 0 disables the timeout.
+        """
+        if self.cancelled.is_set():
+            raise Cancelled('Cancelled before running ' + ' '.join(args))
+        timeout = timeout if timeout is not None else self.timeout_of(args, timeouts)
+        capture = {'stdout': stdout == subprocess.PIPE, 'stderr': stderr == subprocess.PIPE}
+        if on_line:
+            stdout = subprocess.PIPE
+            stderr = subprocess.PIPE if stderr is None else stderr
+        options = {'start_new_session': True} if os.name == 'posix' else {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        with self.lock:
+            self.count = self.count + 1
+        popen = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=stdout, stderr=stderr, cwd=cwd, env=self.environment(env), **options)
+        outputs = {}
+        readers = []
+        for name, stream in [('stdout', popen.stdout), ('stderr', popen.stderr)]:
+            if stream:
+                outputs[name] = []
+                reader = threading.Thread(target=self.read_lines, args=(stream, outputs[name], capture[name], on_line), daemon=True)
+                reader.start()
+                readers.append(reader)
+        with self.lock:
+            self.processes.add(popen)
+        popen.expired = False
+        timer = threading.Timer(timeout, self.expire, (popen,)) if timeout else None
+        try:
+            if self.cancelled.is_set():
+                # The operation was cancelled while the process started.
+                self.kill(popen)
+            if timer:
+                timer.start()
+            # The process is killed by the timer or by cancel, so waiting blocks without polling.
+            popen.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            with self.lock:
+                self.processes.discard(popen)
+            if popen.poll() is None:
+                self.kill(popen)
+            for reader in readers:
+                reader.join()
+        if popen.expired:
+            raise ProcessTimeout('%s did not finish within %d seconds.' % (' '.join(args), timeout))
+        if self.cancelled.is_set():
+            raise Cancelled('Cancelled ' + ' '.join(args))
+        return subprocess.CompletedProcess(args, popen.returncode,
+                                           b''.join(outputs['stdout']) if capture['stdout'] else None,
+                                           b''.join(outputs['stderr']) if capture['stderr'] else None)
+
+    def read_lines(self, stream, lines, capture, on_line):
+        """
+        Read the lines of the stream until it is closed. The lines after the first line
+        that exceeds max_output are not captured, but they are still passed to on_line.
+        """
+        size = 0
+        with stream:
+            for line in stream:
+                if on_line:
+                    on_line(line.decode('utf-8', errors='replace').rstrip('\r\n'))
+                if capture:
+                    size = size + len(line)
+                    if size <= self.max_output:
+                        lines.append(line)
+                    else:
+                        capture = False
+
+    def expire(self, popen):
+        popen.expired = True
+        self.kill(popen)
+
+    def kill(self, popen):
+        """ Terminate the process group of the process, and kill it if it does not stop in time. """
+        if popen.poll() is not None:
+            return
+        try:
+            if os.name == 'posix':
+                os.killpg(popen.pid, signal.SIGTERM)
+            else:
+                popen.terminate()
+            popen.wait(5)
+        except subprocess.TimeoutExpired:
+            if os.name == 'posix':
+                os.killpg(popen.pid, signal.SIGKILL)
+            else:
+                popen.kill()
+            popen.wait()
+        except ProcessLookupError:
+            popen.wait()
+
+    def cancel(self):
+        """ Cancel the running processes and the processes that are started until reset is called. """
+        self.cancelled.set()
+        with self.lock:
+            processes = list(self.processes)
+        for popen in processes:
+            self.kill(popen)
+
+    def reset(self):
+        self.cancelled.clear()
+
+
+supervisor = Supervisor()
+
+
+def run(args, **kwargs):
+    """
+    Run a process with the supervisor. All processes of the workspace are started
+    through this function, such that they can be counted, timed out and cancelled.
+    """
+    return supervisor.run(args, **kwargs)
+
+
+def process_count():
+    """ Return the number of processes that were started so far. """
+    return supervisor.count
+
+
+def cancel():
+    supervisor.cancel()
+
+
+def reset():
+    supervisor.reset()
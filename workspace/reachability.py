@@ -0,0 +1,115 @@
+import networkx as nx
+
+
+class ReachabilityIndex:
+    """
+    The transitive closure of a dependency graph in which the edges go from a package
+    to its dependencies. For each node the closure is stored as a bitset of its ancestors
+    and a bitset of its descendants, such that checking whether one package depends
+    on another takes constant time.
+
+    The index must be rebuilt when the graph changes.
+    """
+    def __init__(self, graph):
+        # In a topological order, the dependents come before their dependencies.
+        self._order = list(nx.topological_sort(graph))
+        self._graph = graph
+        self._index = {name: index for index, name in enumerate(self._order)}
+        self._ancestors = {}
+        self._descendants = {}
+        self._levels = {}
+        for name in self._order:
+            bits = 0
+            for predecessor in graph.predecessors(name):
+                bits |= self._bit(predecessor) | self._ancestors[predecessor]
+            self._ancestors[name] = bits
+        for name in reversed(self._order):
+            bits = 0
+            level = 0
+            for successor in graph.successors(name):
+                bits |= self._bit(successor) | self._descendants[successor]
+                level = max(level, self._levels[successor] + 1)
+            self._descendants[name] = bits
+            self._levels[name] = level
+
+    def _bit(self, name):
+        return 1 << self._index[name]
+
+    def _names(self, bits):
+        result = set()
+        while bits:
+            lowest = bits & -bits
+            result.add(self._order[lowest.bit_length() - 1])
+            bits ^= lowest
+        return result
+
+    def order(self):
+        """
+        Return the names of the nodes in topological order: dependents before their dependencies.
+        """
+        return list(self._order)
+
+    def depends_on(self, dependent, dependency):
+        """
+        Check if the first package depends directly or indirectly on the second package.
+        """
+        return bool(self._descendants[dependent] & self._bit(dependency))
+
+    def ancestors(self, name):
+        """ Return the names of the packages that depend directly or indirectly on the given package. """
+        return self._names(self._ancestors[name])
+
+    def descendants(self, name):
+        """ Return the names of the packages on which the given package depends directly or indirectly. """
+        return self._names(self._descendants[name])
+
+    def affected(self, names):
+        """
+        Return the names of the given packages and of all packages that depend on them.
+        """
+        bits = 0
+        for name in names:
+            bits |= self._bit(name) | self._ancestors[name]
+        return self._names(bits)
+
+    def level(self, name):
+        """
+        Return the length of the longest chain of dependencies below the given package.
+        Packages without dependencies have level 0.
+        """
+        return self._levels[name]
+
+    def levels(self, names):
+        """
+        Return a dictionary from the given names to their level in the subgraph that consists
+        of the given packages. A package can be rebuilt once all packages at lower levels are rebuilt.
+        """
+        names = set(names)
+        result = {}
+        for name in reversed(self._order):
+            if name in names:
+                result[name] = max([result[successor] + 1 for successor in self._graph.successors(name) if successor in names], default=0)
+        return result
+
+    def critical_path(self, names):
+        """
+        Return the longest chain of dependencies in the subgraph that consists of the given
+        packages, in rebuild order: dependencies before their dependents.
+        """
+        names = set(names)
+        longest = {}
+        next_in_chain = {}
+        for name in self._order:
+            if name in names:
+                dependents = [predecessor for predecessor in self._graph.predecessors(name) if predecessor in names]
+                best = max(dependents, key=lambda dependent: longest[dependent], default=None)
+                longest[name] = longest[best] + 1 if best else 1
+                next_in_chain[name] = best
+        if not longest:
+            return []
+        name = max(longest, key=lambda candidate: longest[candidate])
+        result = []
+        while name:
+            result.append(name)
+            name = next_in_chain[name]
+        return result
@@ -0,0 +1,99 @@
+import concurrent.futures
+import time
+from workspace import process
+
+
+class TaskResult:
+    """
+    The outcome of a task: 'succeeded', 'failed' or 'cancelled'. A task is cancelled
+    when one of its dependencies did not succeed.
+    """
+    def __init__(self, name, status, value = None, error = None, start = None, duration = 0.0):
+        self.name = name
+        self.status = status
+        self.value = value
+        self.error = error
+        self.start = start
+        self.duration = duration
+
+    @property
+    def succeeded(self):
+        return self.status == 'succeeded'
+
+
+class Scheduler:
+    """
+    Runs tasks concurrently on at most the given number of threads. A task starts when all
+    of its dependencies succeeded, and is cancelled when one of them failed or was cancelled.
+    When the run is interrupted with Ctrl-C, the tasks that did not start are dropped and the
+    processes of the running tasks are cancelled.
+    """
+    def __init__(self, jobs = 8):
+        self.jobs = max(1, jobs)
+
+    def run(self, tasks, dependencies = None, on_finished = None):
+        """
+        Run the tasks of the given dictionary from names to functions without arguments.
+        Dependencies is a dictionary from names to the names of the tasks that must succeed
+        before the task can start; names that are not tasks are ignored. A task fails if its
+        function raises an exception, or if it returns a TaskResult with another status.
+        On_finished is called with every result in the thread that called run.
+        Return a dictionary from names to TaskResult objects, in the order in which the tasks finished.
+        """
+        dependencies = {name: set(dependencies.get(name, ())) & set(tasks) if dependencies else set() for name in tasks}
+        waiting = dict(dependencies)
+        results = {}
+        running = {}
+        start = time.perf_counter()
+
+        def finish(result):
+            results[result.name] = result
+            if on_finished:
+                on_finished(result)
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs)
+        try:
+            while waiting or running:
+                ready = [name for name in waiting if not waiting[name] - set(results)]
+                if not ready and not running:
+                    raise Exception('The dependencies of tasks %s are cyclic.' % ', '.join(sorted(waiting)))
+                for name in ready:
+                    if all(results[dependency].succeeded for dependency in dependencies[name]):
+                        # Tasks are only submitted to free threads, such that an interrupt does not wait for queued tasks.
+                        if len(running) < self.jobs:
+                            del waiting[name]
+                            running[executor.submit(self.execute, name, tasks[name], start)] = name
+                    else:
+                        del waiting[name]
+                        failed = sorted(dependency for dependency in dependencies[name] if not results[dependency].succeeded)
+                        finish(TaskResult(name, 'cancelled', error='Cancelled because %s did not succeed.' % ', '.join(failed)))
+                if not running:
+                    continue
+                done, pending = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    finish(future.result())
+        except KeyboardInterrupt:
+            # The processes run in their own sessions, so they do not get the interrupt themselves.
+            process.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        return results
+
+    def execute(self, name, function, start):
+        task_start = time.perf_counter()
+        try:
+            value = function()
+            status = 'succeeded'
+            error = None
+            if isinstance(value, TaskResult):
+                status, error, value = value.status, value.error, value.value
+        except Exception as exception:
+            value = None
+            status = 'failed'
+            error = str(exception)
+        return TaskResult(name, status, value, error, task_start - start, time.perf_counter() - task_start)
@@ -0,0 +1,149 @@
+import concurrent.futures
+import os
+import subprocess
+import yaml
+from workspace import process
+from workspace.git import *
+from workspace.workspace import Workspace
+
+snapshot_version = 1
+
+
+def create_snapshot(workspace):
+    """
+    Return a snapshot of the workspace as a dictionary that can be written as json: the main
+    package, the repository locations and, for every package in topological order, its main
+    reference, and if it is downloaded its branch, revision, sequence in the branch and
+    whether it is editable.
+    """
+    packages = []
+    with workspace.operation():
+        editables = workspace.editables()
+        for package_name in workspace.package_name_order():
+            package = workspace.package(package_name)
+            entry = {
+                "name": package_name,
+                "reference": package.main_reference().to_string(),
+                "downloaded": package.is_downloaded()
+            }
+            if entry["downloaded"]:
+                entry["branch"] = package.git.branch()
+                entry["revision"] = package.git.revision()
+                entry["sequence_in_branch"] = package.git.sequence_in_branch()
+                entry["editable"] = package_name in editables
+                entry["dirty"] = package.git.is_dirty()
+            packages.append(entry)
+    return {
+        "version": snapshot_version,
+        "main": workspace.main,
+        "git_prefix": workspace.git_prefix,
+        "git_suffix": workspace.git_suffix,
+        "packages": packages
+    }
+
+
+def checkout_package(root, entry, repository, timeouts = None):
+    """
+    Clone the package of the given snapshot entry into the root if it is not there, fetch its
+    revision if it is missing, and check out the revision on the branch of the entry. An existing
+    branch is only moved if the revision contains it, such that no local commits are lost.
+    The given timeouts override the default timeouts of the git commands.
+    Return whether the package was cloned.
+    """
+    directory = os.path.join(root, entry["name"])
+    cloned = not os.path.exists(os.path.join(directory, ".git"))
+    if cloned:
+        completed_process = process.run(['git', 'clone', '--no-checkout', repository, entry["name"]], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        cwd=root, timeouts=timeouts)
+        if completed_process.returncode != 0:
+            raise Exception('Could not clone %s: %s' % (repository, completed_process.stderr.decode('utf-8').strip()))
+    git = Git(directory, timeouts=timeouts)
+    if not cloned and git.is_dirty():
+        raise Exception('Package %s has local changes.' % entry["name"])
+    if not git.has_commit(entry["revision"]):
+        git.fetch_branches([entry["branch"]] if entry["branch"] else [], entry["revision"])
+    if entry["branch"]:
+        head = None if cloned else git.ref_revision('refs/heads/' + entry["branch"])
+        if head and not git.is_ancestor(head, entry["revision"]):
+            raise Exception('Branch %s of package %s has commits that are not in the snapshot.' % (entry["branch"], entry["name"]))
+        git.mutate(['checkout', '-q', '-B', entry["branch"], entry["revision"]])
+    else:
+        git.mutate(['checkout', '-q', '--detach', entry["revision"]])
+    if git.revision() != entry["revision"]:
+        raise Exception('Could not check out revision %s of package %s.' % (entry["revision"], entry["name"]))
+    return cloned
+
+
+def is_editable_at(editable, directory):
+    """ Check if the editable refers to the package in the given directory rather than to another checkout. """
+    path = os.path.normpath(editable.path)
+    if os.path.basename(path) == 'conanfile.py':
+        path = os.path.dirname(path)
+    return path == os.path.normpath(directory)
+
+
+def restore_snapshot(root, snapshot, jobs = 8, force_install = False, conan = None):
+    """
+    Restore the workspace of the snapshot in the given root. The main package is checked out
+    first, because its lockfile determines the workspace. The other downloaded packages are
+    cloned or checked out concurrently. Then the editables are registered and the
+    packages are installed in dependency order.
+    """
+    if snapshot.get("version") != snapshot_version:
+        raise Exception('Unsupported snapshot version %s.' % snapshot.get("version"))
+    os.makedirs(root, exist_ok=True)
+    configuration_path = os.path.join(root, "workspace.yml")
+    if not os.path.exists(configuration_path):
+        with open(configuration_path, 'w') as stream:
+            yaml.safe_dump({"main": snapshot["main"], "git_prefix": snapshot["git_prefix"], "git_suffix": snapshot["git_suffix"]}, stream)
+    with open(configuration_path) as stream:
+        configuration = yaml.safe_load(stream)
+    timeouts = configuration.get("timeouts") if configuration else None
+    entries = {entry["name"]: entry for entry in snapshot["packages"] if entry["downloaded"]}
+    if snapshot["main"] not in entries:
+        raise Exception('The snapshot does not contain the main package.')
+
+    def repository(name):
+        return snapshot["git_prefix"] + name + snapshot["git_suffix"]
+
+    print('Checking out ' + snapshot["main"])
+    cloned = set()
+    if checkout_package(root, entries[snapshot["main"]], repository(snapshot["main"]), timeouts):
+        cloned.add(snapshot["main"])
+    workspace = Workspace(snapshot["main"], root, conan)
+    with workspace.history.record('restore', workspace.graph.number_of_nodes()):
+        names = [name for name in entries if name != snapshot["main"]]
+        with workspace.history.phase('checkout'):
+            errors = []
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+                futures = {executor.submit(checkout_package, root, entries[name], repository(name), timeouts): name for name in names}
+                for future in concurrent.futures.as_completed(futures):
+                    name = futures[future]
+                    try:
+                        if future.result():
+                            cloned.add(name)
+                        print('Checked out ' + name)
+                    except Exception as error:
+                        errors.append(str(error))
+            if errors:
+                raise Exception('The workspace could not be restored.\n' + '\n'.join(sorted(errors)))
+
+        with workspace.operation():
+            with workspace.history.phase('editables'):
+                editables = workspace.editables()
+                for name, entry in entries.items():
+                    package = workspace.package(name)
+                    if entry["editable"] and not (name in editables and is_editable_at(editables[name], package.directory())):
+                        workspace.conan.editable_add(package.directory(), package.main_reference().to_string(), cwd=root)
+                    elif not entry["editable"] and name in editables:
+                        editables[name].disable()
+
+            with workspace.history.phase('install'):
+                for name in workspace.reversed_package_name_order():
+                    if name in entries:
+                        package = workspace.package(name)
+                        workspace.install(package, force_install)
+                        if name in cloned:
+                            workspace.conan.source(package.directory())
+        workspace.print_install_report()
+    return workspace
@@ -26,12 +26,13 @@ class ToolTip(object):
         self.wraplength = 600   #pixels
         self.widget = widget
         self.text = text
-        self.widget.bind("<Enter>", self.enter)
-        self.widget.bind("<Leave>", self.leave)
-        self.widget.bind("<ButtonPress>", self.leave)
+        self.bindings = [(sequence, self.widget.bind(sequence, function, add='+')) for sequence, function in self.events()]
         self.id = None
         self.tw = None
 
+    def events(self):
+        return [("<Enter>", self.enter), ("<Leave>", self.leave), ("<ButtonPress>", self.leave)]
+
     def enter(self, event=None):
         self.schedule()
 
@@ -71,5 +72,51 @@ class ToolTip(object):
             tw.destroy()
 
     def destroy(self):
-        tw = self.tw
-        if tw: tw.destroy()
\ No newline at end of file
+        self.leave()
+        for sequence, binding in self.bindings:
+            self.widget.unbind(sequence, binding)
+        self.bindings = []
+
+
+class TreeviewToolTip(ToolTip):
+    """
+    A single tooltip for all rows of a ttk.Treeview. The text is obtained
+    from the given function for the identifier of the row under the mouse,
+    such that the tooltip does not have to be recreated when the rows change.
+    """
+    def __init__(self, widget, text_function):
+        self.text_function = text_function
+        self.row = None
+        self.x = 0
+        self.y = 0
+        super().__init__(widget, None)
+
+    def events(self):
+        return super().events() + [("<Motion>", self.motion)]
+
+    def motion(self, event):
+        row = self.widget.identify_row(event.y)
+        self.x = event.x_root
+        self.y = event.y_root
+        if row != self.row:
+            self.row = row
+            self.leave()
+            if row:
+                self.schedule()
+
+    def leave(self, event=None):
+        if event:
+            self.row = None
+        super().leave(event)
+
+    def showtip(self, event=None):
+        self.text = self.text_function(self.row) if self.row else None
+        if not self.text:
+            return
+        self.tw = tk.Toplevel(self.widget)
+        self.tw.wm_overrideredirect(True)
+        self.tw.wm_geometry("+%d+%d" % (self.x + 10, self.y + 20))
+        label = tk.Label(self.tw, text=self.text, justify='left',
+                       background="#ffffff", relief='solid', borderwidth=1,
+                       wraplength = self.wraplength)
+        label.pack(ipadx=1)
\ No newline at end of file
@@ -3,157 +3,94 @@ import tkinter.ttk
 from tkinter import font
 from tkinter import messagebox
 from tkinter import simpledialog
+from workspace import process
 from workspace.contract import *
 from workspace.workspace import *
 from workspace.tooltip import *
 import threading
 import subprocess
 
-# Because of a bug in TkInter, getting the default background does not work on Windows.
-# It cannot resolve the color SystemButtonFace.
-default_background_color = 'gray85'
+# The columns of the package table, in addition to the name that is shown in the tree column.
+columns = ('branch', 'revision', 'state', 'level', 'edit')
 
-class PackageView:
-    def __init__(self, ui, name, row):
+class PackageRow:
+    """
+    The state of a package as it is shown in a row of the package table.
+    Rows are kept across refreshes and only the items of which the values
+    changed are updated in the table.
+    """
+    def __init__(self, ui, name):
         self.ui = ui
         self.name = name
-        self.row = row
-        self.label = None
-        self.name_widget = None
-        self.branch_widget = None
-        self.actual_revision_widget = None
         self.is_downloaded = False
-        self.branch_popup = None
-        self.revision_tooltip = None
-        self.editable_widget = None
-        self.editable_var = BooleanVar(False)
+        self.branch = ''
+        self.revision = ''
+        self.state = ''
+        self.level = 0
+        self.is_editable = False
+        self.is_dirty = False
+        self.tooltip = ''
+        self.shown = None
 
     @property
     def workspace(self):
         return self.ui.workspace
 
-    @property
-    def window(self):
-        return self.ui.window
-
-    @property
-    def name_font(self):
-        return self.ui.name_font
-
     @property
     def package(self):
         return self.workspace.package(self.name)
 
-    def create(self):
-        self.name_widget = Label(self.window, font=self.name_font)
-        self.name_widget.grid(column=0, row=self.row, sticky=W)
-
-        self.create_branch_widget()
-
-        self.actual_revision_widget = Text(self.window, font=self.ui.revision_font, relief='flat',  width=41, height=1, borderwidth=0, bg=default_background_color)
-        self.actual_revision_widget.grid(column=2, row=self.row, sticky=W)
-
-        def toggle_editable():
-            self.package.toggle_editable()
-            self.refresh_editable()
-
-        self.editable_widget = Button(self.window, image=self.ui.off_image, command=toggle_editable)
-        self.editable_widget.grid(column=3, row=self.row, sticky=W)
-
-
-        self.refresh()
-
-    def create_branch_widget(self):
-        if self.branch_widget:
-            self.branch_widget.destroy()
-
-        if self.is_downloaded:
-            self.branch_widget = Label(self.window, font=self.name_font, justify=LEFT)
-            self.branch_popup = Menu(self.branch_widget, tearoff=0, title=self.name)
-            def do_popup(event):
-                # display the popup menu
-                self.branch_popup.delete(0, 'end')
-
-                def run_gitk():
-                    subprocess.Popen('gitk', cwd=self.package.directory())
-
-                def run_git_gui():
-                    subprocess.Popen(['git', 'gui'], cwd=self.package.directory())
-
-                self.branch_popup.add_command(label=self.name, state=tkinter.DISABLED)  # , command=next) etc...
-                self.branch_popup.add_command(label="Git History", command=run_gitk)  # , command=next) etc...
-                self.branch_popup.add_command(label="Git Commit", command=run_git_gui)
-
-                self.branch_popup.tk_popup(event.x_root, event.y_root, 0)
-            self.branch_widget.bind("<Button-3>", do_popup)
-
-        else:
-            def download():
-                self.workspace.download(self.name)
-                self.refresh()
-            self.branch_widget = Button(self.window, font=self.name_font, justify=LEFT, command=download)
-        self.branch_widget.grid(column=1, row=self.row, sticky=W)
-
     def refresh(self):
         package = self.package
-
-        self.name_widget.config(text=package.name)
-
-        is_downloaded = package.is_downloaded()
-        if self.is_downloaded != is_downloaded:
-            self.is_downloaded = is_downloaded
-            self.create_branch_widget()
-
-        revision_font = self.ui.revision_font
-
-        if is_downloaded:
+        self.is_downloaded = package.is_downloaded()
+        self.level = self.workspace.reachability.level(self.name)
+        main_revision = package.main_revision()
+        self.is_dirty = False
+        if self.is_downloaded:
             branch = package.git.branch()
-            branch_text = branch + ' ' if branch else 'no branch '
-            branch_color = 'black' if branch else 'red'
-
-            main_revision = package.main_revision()
-            actual_revision = package.git.revision()
-            tooltip = ''
-            if main_revision == actual_revision:
-                revision_color = 'green'
-                tooltip = f'The current revision is equal to main revision\n' + main_revision
+            self.branch = branch if branch else 'no branch'
+            self.revision = package.git.revision()
+            if main_revision == self.revision:
+                self.state = 'equal'
+                self.tooltip = 'The current revision is equal to main revision\n' + main_revision
             elif package.has_valid_revision():
-                revision_color = 'blue'
-                tooltip = f'The current revision is ahead of the main revision\n' + main_revision
+                self.state = 'ahead'
+                self.tooltip = 'The current revision is ahead of the main revision\n' + main_revision
             else:
-                revision_color = 'red'
-                tooltip = 'The current revision is no descendant of the main revision\n' + main_revision
-
+                self.state = 'invalid'
+                self.tooltip = 'The current revision is no descendant of the main revision\n' + main_revision
             if package.git.is_dirty():
-                revision_font = self.ui.revision_font_dirty
-                tooltip = tooltip + '\n' + 'The package has local changes.'
-            self.revision_tooltip = ToolTip(self.actual_revision_widget, tooltip)
+                self.is_dirty = True
+                self.tooltip = self.tooltip + '\n' + 'The package has local changes.'
         else:
-            branch_text = 'Download'
-            branch_color = 'grey'
-            actual_revision = package.main_revision()
-            revision_color = 'gray'
-        self.branch_widget.config(text=branch_text, fg=branch_color)
-        self.actual_revision_widget.config(state=NORMAL, font=revision_font)
-        self.actual_revision_widget.delete(1.0, END)
-        self.actual_revision_widget.insert(1.0, actual_revision)
-        self.actual_revision_widget.config(state=DISABLED, fg = revision_color, selectforeground = revision_color)
-
+            self.branch = 'Download'
+            self.revision = main_revision
+            self.state = 'remote'
+            self.tooltip = 'The package is not downloaded. Double click to download it.'
         self.refresh_editable()
 
-
     def refresh_editable(self):
-        editable = self.package.is_editable()
-        self.editable_widget.config(image=self.ui.on_image if editable else self.ui.off_image)
-
-
-    def destroy(self):
-        if self.name_widget: self.name_widget.destroy()
-        if self.branch_widget: self.branch_widget.destroy()
-        if self.actual_revision_widget: self.actual_revision_widget.destroy()
-        if self.branch_popup: self.branch_popup.destroy()
-        if self.revision_tooltip: self.revision_tooltip.destroy()
-        if self.editable_widget: self.editable_widget.destroy()
+        self.is_editable = self.package.is_editable()
+
+    def values(self):
+        return (self.branch, self.revision + (' *' if self.is_dirty else ''), self.state, self.level, 'on' if self.is_editable else 'off')
+
+    def tags(self):
+        result = [self.state]
+        if self.is_downloaded and self.branch == 'no branch':
+            result.append('detached')
+        if self.is_dirty:
+            result.append('dirty')
+        return tuple(result)
+
+    def sort_key(self, column):
+        if column == '#0':
+            return self.name
+        elif column == 'level':
+            return (self.level, self.name)
+        elif column == 'edit':
+            return (not self.is_editable, self.name)
+        return (getattr(self, column), self.name)
 
 class UI:
     def __init__(self, workspace):
@@ -163,17 +100,13 @@ class UI:
 
         self.mutate_widgets = []
         self.refreshable_widgets = []
-        self.package_views=[]
-        self.number_of_packages = 0
-        self.on_image = tk.PhotoImage(width=48, height=24)
-        self.off_image = tk.PhotoImage(width=48, height=24)
-        self.on_image.put(default_background_color, to=(0, 0, 47, 23))
-        self.on_image.put(("green",), to=(0, 0, 23, 23))
-        self.off_image.put(default_background_color, to=(0, 0, 47, 23))
-        self.off_image.put(("red",), to=(24, 0, 47, 23))
-        self.window.resizable(width=False, height=False)
+        self.rows = {}
+        self.sort_column = '#0'
+        self.sort_reverse = False
+        self.window.resizable(width=True, height=True)
         self.is_processing = False
         self.create_header()
+        self.create_table()
         self.create_footer()
 
     @property
@@ -189,14 +122,96 @@ class UI:
         self.name_font = font.Font(family='Courier', size=12, weight=font.BOLD)
         self.revision_font = font.Font(family='Courier', weight=font.BOLD, size=12)
         self.revision_font_dirty = font.Font(family='Courier', weight=font.BOLD, slant=font.ITALIC, size=12)
-        row = 0
-        Label(self.window, text='Name ', font=self.name_font).grid(column=0, row=row, sticky=W)
-        Label(self.window, text='Branch ', font=self.name_font).grid(column=1, row=row, sticky=W)
-        Label(self.window, text='Revision ', font=self.name_font).grid(column=2, row=row, sticky=W)
-        Label(self.window, text='Edit ', font=self.name_font).grid(column=3, row=row, sticky=W)
-        row = row + 1
-        separator = tkinter.ttk.Separator(self.window, orient=HORIZONTAL)
-        separator.grid(row=row, columnspan=4, sticky='WE')
+        header_frame = Frame(self.window)
+        Label(header_frame, text='Filter ', font=self.name_font).pack(side=tkinter.LEFT)
+        self.filter_var = StringVar()
+        self.filter_var.trace_add('write', lambda *args: self.apply_filter())
+        Entry(header_frame, textvariable=self.filter_var, font=self.name_font).pack(side=tkinter.LEFT, fill=X, expand=True)
+        header_frame.pack(side=tkinter.TOP, fill=X)
+
+    def create_table(self):
+        table_frame = Frame(self.window)
+        style = tkinter.ttk.Style(self.window)
+        style.configure('Treeview', font=self.revision_font, rowheight=self.revision_font.metrics('linespace') + 4)
+        style.configure('Treeview.Heading', font=self.name_font)
+        # A Treeview only draws the rows that are visible, so it scales to large workspaces.
+        self.table = tkinter.ttk.Treeview(table_frame, columns=columns, height=25, selectmode='browse')
+        self.table.heading('#0', text='Name', command=lambda: self.sort('#0'))
+        self.table.column('#0', width=250, stretch=False)
+        headings = {'branch': 'Branch', 'revision': 'Revision', 'state': 'State', 'level': 'Level', 'edit': 'Edit'}
+        widths = {'branch': 200, 'revision': 430, 'state': 80, 'level': 60, 'edit': 60}
+        for column in columns:
+            self.table.heading(column, text=headings[column], command=lambda column=column: self.sort(column))
+            self.table.column(column, width=widths[column], stretch=column == 'revision')
+        self.table.tag_configure('equal', foreground='green')
+        self.table.tag_configure('ahead', foreground='blue')
+        self.table.tag_configure('invalid', foreground='red')
+        self.table.tag_configure('remote', foreground='gray')
+        self.table.tag_configure('detached', foreground='red')
+        self.table.tag_configure('dirty', font=self.revision_font_dirty)
+        scrollbar = tkinter.ttk.Scrollbar(table_frame, orient=VERTICAL, command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        self.table.pack(side=tkinter.LEFT, fill=BOTH, expand=True)
+        scrollbar.pack(side=tkinter.RIGHT, fill=Y)
+        table_frame.pack(side=tkinter.TOP, fill=BOTH, expand=True)
+
+        self.tooltip = TreeviewToolTip(self.table, self.row_tooltip)
+        self.popup = Menu(self.table, tearoff=0)
+        self.table.bind("<Button-3>", self.do_popup)
+        self.table.bind("<Double-1>", self.do_double_click)
+
+    def row_tooltip(self, name):
+        row = self.rows.get(name)
+        return row.tooltip if row else None
+
+    def do_popup(self, event):
+        name = self.table.identify_row(event.y)
+        if not name:
+            return
+        self.table.selection_set(name)
+        row = self.rows[name]
+        directory = row.package.directory()
+
+        def run_gitk():
+            subprocess.Popen('gitk', cwd=directory)
+
+        def run_git_gui():
+            subprocess.Popen(['git', 'gui'], cwd=directory)
+
+        self.popup.delete(0, 'end')
+        self.popup.add_command(label=name, state=tkinter.DISABLED)
+        if row.is_downloaded:
+            self.popup.add_command(label="Git History", command=run_gitk)
+            self.popup.add_command(label="Git Commit", command=run_git_gui)
+            self.popup.add_command(label="Toggle Editable", command=lambda: self.toggle_editable(name))
+        else:
+            self.popup.add_command(label="Download", command=lambda: self.download(name))
+        self.popup.tk_popup(event.x_root, event.y_root, 0)
+
+    def do_double_click(self, event):
+        name = self.table.identify_row(event.y)
+        if not name:
+            return
+        if not self.rows[name].is_downloaded:
+            self.download(name)
+        elif self.table.identify_column(event.x) == '#%d' % (columns.index('edit') + 1):
+            self.toggle_editable(name)
+
+    def toggle_editable(self, name):
+        row = self.rows[name]
+        row.package.toggle_editable()
+        row.refresh_editable()
+        self.show_row(row)
+
+    def download(self, name):
+        try:
+            self.workspace.download(name)
+        except Exception as error:
+            messagebox.showerror('Workspace Error', error, icon='warning')
+        finally:
+            row = self.rows[name]
+            row.refresh()
+            self.show_row(row)
 
     def create_footer(self):
         def refresh():
@@ -204,7 +219,7 @@ class UI:
 
         def peg():
             try:
-                dirty_package_names = [package.name for package in self.workspace.packages() if package.git.is_dirty()]
+                dirty_package_names = [package.name for package in self.workspace.packages() if package.is_downloaded() and package.git.is_dirty()]
                 commit_message = None
                 if len(dirty_package_names) > 0:
                     commit_message = simpledialog.askstring('Commit message', 'Packages ' + ', '.join(
@@ -236,12 +251,19 @@ class UI:
             if do_push:
                 self.run_async(self.workspace.push)
 
+        def cancel():
+            if self.is_processing:
+                process.cancel()
+
         self.status_frame = Frame(self.window)
+        self.cancel_button = Button(self.status_frame, text="Cancel", command=cancel, state=DISABLED)
+        self.cancel_button.pack(side=tkinter.LEFT)
         self.add_button(Button(self.status_frame, text="Refresh", command=refresh))
         self.add_button(Button(self.status_frame, text="Peg", command=peg))
         self.add_button(Button(self.status_frame, text="Fetch", command=fetch))
         self.add_button(Button(self.status_frame, text="Push", command=push))
         self.add_button(Button(self.status_frame, text="Branch", command=create_branch))
+        self.status_frame.pack(side=tkinter.BOTTOM, fill=X)
 
     def add_button(self, button):
         button.pack(side=tkinter.RIGHT)
@@ -258,39 +280,71 @@ class UI:
     def run_async(self, task):
         if not self.is_processing:
             self.is_processing = True
+            process.reset()
+            self.cancel_button.config(state=NORMAL)
             def execute():
-                task()
-                self.is_processing = False
+                try:
+                    task()
+                except process.Cancelled:
+                    print('Cancelled.')
+                finally:
+                    # The actions that run on the Tk thread must not be cancelled as well.
+                    process.reset()
+                    self.is_processing = False
+                    # Tk must only be used by its own thread.
+                    self.window.after(0, lambda: self.cancel_button.config(state=DISABLED))
 
             t = threading.Thread(target=execute)
             t.start()
 
     def refresh(self):
         self.workspace.update_graph()
-        number_of_packages = self.workspace.graph.number_of_nodes()
-        if number_of_packages == self.number_of_packages:
-            for package_view in self.package_views:
-                package_view.refresh()
+        package_names = self.workspace.package_name_order()
+        with self.workspace.history.record('refresh', len(package_names)), self.workspace.operation():
+            # Remove the rows of packages that are no longer in the workspace and reuse the others.
+            for name in list(self.rows):
+                if not self.workspace.has_package(name):
+                    del self.rows[name]
+                    self.table.delete(name)
+            for name in package_names:
+                row = self.rows.get(name)
+                if not row:
+                    row = PackageRow(self, name)
+                    self.rows[name] = row
+                    self.table.insert('', 'end', iid=name, text=name)
+                row.refresh()
+                self.show_row(row)
+            self.apply_filter()
+
+    def show_row(self, row):
+        shown = (row.values(), row.tags())
+        if row.shown != shown:
+            row.shown = shown
+            self.table.item(row.name, values=shown[0], tags=shown[1])
+
+    def sort(self, column):
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
         else:
-            for package_view in self.package_views:
-                package_view.destroy()
-                self.status_frame.destroy()
-            self.package_views = []
-            package_names = self.workspace.package_name_order()
-            self.number_of_packages = len(package_names)
-            row = 2
-            for package_name in package_names:
-                package_view = PackageView(self, package_name, row)
-                self.package_views.append(package_view)
-                package_view.create()
-                row = row + 1
-
-            separator = tkinter.ttk.Separator(self.window, orient=HORIZONTAL)
-            separator.grid(row=row, columnspan=3, sticky='WE')
-            row = row + 1
-            self.status_frame.grid(row=row, column=0, columnspan=4, stick ='EW')
-
+            self.sort_column = column
+            self.sort_reverse = False
+        self.apply_filter()
+
+    def apply_filter(self):
+        """
+        Show the rows of which the name or branch contains the filter text, in the current sort order.
+        Rows that do not match are detached from the table, but not destroyed.
+        """
+        text = self.filter_var.get().strip().lower()
+        rows = sorted(self.rows.values(), key=lambda row: row.sort_key(self.sort_column), reverse=self.sort_reverse)
+        index = 0
+        for row in rows:
+            if text in row.name.lower() or text in row.branch.lower():
+                self.table.move(row.name, '', index)
+                index = index + 1
+            else:
+                self.table.detach(row.name)
 
     def refreshable(self, widget):
         self.refreshable_widgets.append(widget)
-        return widget
\ No newline at end of file
+        return widget
@@ -1,13 +1,27 @@
 #!/usr/bin/env python
 import networkx as nx
+import fileinput
 import json
-import argparse
+import hashlib
+import re
+import subprocess
+import sys
+import threading
 import yaml
-from pathlib import Path
+from workspace import process
 from workspace.ui import *
 from workspace.package import *
 from workspace.editable import *
 from workspace.packagereference import *
+from workspace.journal import *
+from workspace.cache import *
+from workspace.lockfile import *
+from workspace.reachability import *
+from workspace.history import *
+from workspace.cli import *
+from workspace.client import *
+from workspace.conan import *
+from workspace.memo import *
 
 class Workspace:
     """
@@ -17,8 +31,10 @@ class Workspace:
         * forall p in downloaded packages : p.git.revision() contains p.main_revision()
         * forall p in downloaded packages : p.git.branch() == main.git.branch()
     """
-    def __init__(self, main, root):
+    def __init__(self, main, root, conan = None):
         self.yaml = None
+        self.git_prefix = ""
+        self.git_suffix = ""
         if (os.path.exists(os.path.join(root, "workspace.yml"))):
             with open(os.path.join(root, "workspace.yml")) as stream:
                 self.yaml = yaml.safe_load(stream)
@@ -31,56 +47,92 @@ class Workspace:
         elif (self.yaml and "main" in self.yaml):
             self.main = self.yaml["main"]
         else:
-            max_size = 0
-            with os.scandir(root) as dirs:
-                for entry in dirs:
-                    if (entry.is_dir() and os.path.exists(os.path.join(entry.path, "conan.lock"))):
-                        size = os.path.getsize(os.path.join(entry.path, "conan.lock"))
-                        if (size > max_size) :
-                            max_size = size
-                            self.main = entry.name
-            if (max_size == 0):
+            self.main = detect_main(root)
+            if (not self.main):
                 raise Exception('The main project could not be determined.')
-            print("Auto-detected main based on conan.lock file size: " + self.main)
+            print("Auto-detected main based on conan.lock file size: " + self.main, file=sys.stderr)
         self.main_directory = os.path.join(root, self.main)
         self.root = root
+        # The timeouts of this workspace override the default timeouts of its processes.
+        self.timeouts = self.yaml.get("timeouts") if self.yaml else None
+        self.scope = OperationScope()
+        self.conan = ScopedConan(conan if conan else conan_backend(self.yaml.get("conan_backend") if self.yaml else None, self.timeouts), self.scope)
+        self.package_map = {}
+        self.history = History(os.path.join(self.state_directory(), "history.sqlite"))
+        self.install_cache = InputCache(os.path.join(self.state_directory(), "install_cache.json"))
+        self.build_cache = InputCache(os.path.join(self.state_directory(), "build_cache.json"))
+        # The packages are installed concurrently by the build.
+        self.install_count_lock = threading.Lock()
+        self.reset_install_counts()
+        # The counts are reported per operation, also by a daemon that runs many operations.
+        self.history.on_start.append(lambda record: self.reset_install_counts())
         self.update_graph()
 
     def update_graph(self):
         self.graph, self.main_references = self.read_graph()
+        self.reachability = ReachabilityIndex(self.graph)
+        self.package_map = {name: package for name, package in self.package_map.items() if self.graph.has_node(name)}
+        self.scope.invalidate()
+
+    def operation(self):
+        """
+        Return a context manager for an operation on the workspace. Within an operation the
+        git facts of the packages and the editables are memoized. They are forgotten when
+        the workspace changes them itself, so changes by others during an operation are not seen.
+        """
+        return self.scope.operation()
 
     def read_graph(self):
         graph = nx.DiGraph()
         references = {}
 
-        with open(os.path.join(self.main_directory, "conan.lock")) as json_file:
-            data = json.load(json_file)
-            packages = data["graph_lock"]["nodes"]
-
-            for index, value in packages.items():
-                descriptor = PackageDescriptor(value)
-                name = descriptor.name
-                graph.add_node(name)
-                semantic_version = descriptor.semantic_version
-                sequence_in_branch = descriptor.sequence_in_branch
-                revision = descriptor.revision
-                user = descriptor.user
-                channel = descriptor.channel
-                references[name] = PackageReference(name, semantic_version, sequence_in_branch, revision, user, channel)
-
-            for index, value in packages.items():
-                descriptor = PackageDescriptor(value)
-                dependencies = descriptor.dependencies
-                for dependency in dependencies:
-                    dep = packages[dependency]
-                    dep_pkg = PackageDescriptor(dep)
-                    graph.add_edge(descriptor.name, dep_pkg.name)
+        nodes = self.lock_file().graph_nodes()
+        names = {}
+
+        for index, node in nodes.items():
+            package_reference = PackageReference.from_string(node.ref)
+            names[index] = package_reference.name
+            graph.add_node(package_reference.name)
+            references[package_reference.name] = package_reference
+
+        for index, node in nodes.items():
+            for dependency in node.requires:
+                graph.add_edge(names[index], names[dependency])
         return graph, references
 
+    def lock_file(self):
+        return LockFile(os.path.join(self.main_directory, "conan.lock"))
+
+    def update_lock(self, journal):
+        """
+        Use the references of the packages that were pegged in the main references
+        and in the conan.lock file of the main package, such that the workspace
+        remains consistent without generating the lockfile again.
+
+        The reference of the main package itself is not updated. The lockfile is
+        committed with the main package, so it cannot contain the revision of that
+        commit, and the editable of the main package keeps the reference of the lockfile.
+        """
+        references = {}
+        for package_name in journal.editable_package_names:
+            step = journal.step(peg_step(package_name))
+            if step:
+                references[package_name] = PackageReference.from_string(step["reference"])
+        references.pop(self.main, None)
+        self.main_references.update(references)
+        # The editables of the workspace depend on the main references.
+        self.scope.invalidate(ScopedConan.subject)
+        lock_file = self.lock_file()
+        if lock_file.update_references(references) > 0:
+            lock_file.save()
+            self.scope.invalidate(self.main_directory)
+
     def package(self, package_name):
         if (not self.has_package(package_name)):
             raise Exception("The workspace does not have a package named " + package_name)
-        return Package(package_name, self)
+        if package_name not in self.package_map:
+            self.package_map[package_name] = Package(package_name, self)
+        return self.package_map[package_name]
 
     def has_package(self, package_name):
         return self.graph.has_node(package_name)
@@ -89,174 +141,476 @@ class Workspace:
         return reversed(self.package_name_order())
 
     def package_name_order(self):
-        graph = self.graph
-        sort = nx.topological_sort(graph)
-        return list(sort)
+        return self.reachability.order()
 
     def packages(self):
         nodes = self.graph.nodes
-        return [ Package(name, self) for name in nodes ]
+        return [ self.package(name) for name in nodes ]
 
+    @recorded('close')
+    @in_operation
     def close(self):
         for name, editable in self.editables().items():
             editable.disable()
 
+    @recorded('edit')
+    @in_operation
     def edit(self, actual):
         for package in self.packages():
             package.edit(actual)
 
-    def peg_package(self, package_name, commit_message = None):
-        package = self.package(package_name)
-        if package.is_downloaded() and package.is_editable():
-            import fileinput
+    def state_directory(self):
+        """ Return the directory in which the workspace keeps its own state. """
+        return os.path.join(self.root, ".workspace")
+
+    def peg_journal(self):
+        return PegJournal(os.path.join(self.state_directory(), "peg_journal.json"))
 
+    def peg_package(self, package_name, commit_message = None, journal = None):
+        """
+        Commit the given package, make its new revision editable and pin the new
+        revision in the conanfiles of the packages that depend on it. The editable of
+        the main package keeps the reference of the lockfile, such that the workspace
+        still finds it when it is loaded again.
+
+        If a journal is given, the steps that were recorded in it and that are still
+        valid are skipped, and the completed steps are recorded in it.
+        """
+        package = self.package(package_name)
+        step = journal.step(peg_step(package_name)) if journal else None
+        if step and self.is_valid_peg_step(package, step):
+            hash = step["revision"]
+            sequence_in_branch = step["sequence_in_branch"]
+        elif self.is_pegged_editable(package, journal):
             # Commit the package and obtain the new revision.
             hash = package.commit(commit_message)
             sequence_in_branch = package.git.sequence_in_branch()
-            # Remove the editable for the old revision.
-            editable = package.editable()
-            if (editable):
-                editable.disable()
-
-            # Add the editable for the new revision.
-            new_package_reference = package.main_reference().clone(sequence_in_branch, hash)
-            new_editable = Editable(new_package_reference, package.directory(), None)
-            new_editable.edit()
-
-            # Update the revision in the conanfiles that depend on this package and install their dependencies.
-            for dependency_name in nx.ancestors(self.graph, package_name):
-                dependency = self.package(dependency_name)
-                if dependency.is_downloaded() and dependency.is_editable():
-                    regex = re.compile(package_name + '/(.*)\.([0-9]+)\.([a-z0-9]{40})')
-                    # Use the new revision in the conanfile. We substitute regardless of whether it uses it directly.
-                    print("Setting requirement revision of " + package_name + " to " + hash + " in " + dependency_name)
-                    for line in fileinput.input(os.path.join(dependency.directory(), "conanfile.py"), inplace=True):
-                        newcontent = re.sub(regex, package_name + r'/\1.' + str(sequence_in_branch) + '.' + hash, line)
-                        print(newcontent, end="")
-                    # Install the package again such that Conan call still work correctly for that package.
-
-    def peg(self, commit_message = None):
+            if package_name == self.main:
+                new_package_reference = package.main_reference()
+            else:
+                # Remove the editable for the old revision.
+                editable = package.editable()
+                if (editable):
+                    editable.disable()
+
+                # Add the editable for the new revision.
+                new_package_reference = package.main_reference().clone(sequence_in_branch, hash)
+                new_editable = Editable(new_package_reference, package.directory(), None, self.conan)
+                new_editable.edit()
+            if journal:
+                journal.record(peg_step(package_name), revision=hash, sequence_in_branch=sequence_in_branch, reference=new_package_reference.to_string())
+        else:
+            return
+
+        # Update the revision in the conanfiles that depend on this package and install their dependencies.
+        for dependency_name in self.reachability.ancestors(package_name):
+            dependency = self.package(dependency_name)
+            if self.is_pegged_editable(dependency, journal):
+                if journal and journal.step(pin_step(dependency_name, package_name)) and self.is_pinned(dependency, package_name, sequence_in_branch, hash):
+                    continue
+                regex = requirement_regex(package_name)
+                # Use the new revision in the conanfile. We substitute regardless of whether it uses it directly.
+                print("Setting requirement revision of " + package_name + " to " + hash + " in " + dependency_name)
+                for line in fileinput.input(dependency.conanfile(), inplace=True):
+                    newcontent = re.sub(regex, package_name + r'/\2.' + str(sequence_in_branch) + '.' + hash, line)
+                    print(newcontent, end="")
+                dependency.git.changed()
+                if journal:
+                    journal.record(pin_step(dependency_name, package_name), revision=hash, sequence_in_branch=sequence_in_branch)
+                # Install the package again such that Conan call still work correctly for that package.
+
+    def is_pegged_editable(self, package, journal):
+        """
+        Check if the given package takes part in a peg. During a peg the editables
+        are replaced, so when a journal is used the editables that were determined
+        at the start of the peg are used.
+        """
+        if journal:
+            return package.name in journal.editable_package_names
+        return package.is_downloaded() and package.is_editable()
+
+    def is_valid_peg_step(self, package, step):
+        """
+        Check that a recorded peg of a package is still in effect: the package is
+        at the pegged revision and the editable for the pegged reference exists.
+        """
+        return package.is_downloaded() and package.git.revision() == step["revision"] and step["reference"] in self.editable_packages_dictionary()
+
+    def is_pinned(self, dependency, package_name, sequence_in_branch, hash):
+        """
+        Check that every requirement of the given package in the conanfile of the
+        dependency uses the given sequence number and revision.
+        """
+        with open(dependency.conanfile()) as conanfile:
+            matches = re.findall(requirement_regex(package_name), conanfile.read())
+        return all(match[2] == str(sequence_in_branch) and match[3] == hash for match in matches)
+
+    def is_valid_install_step(self, package, step):
+        """
+        Check that a recorded install is still in effect: the conanfile did not change
+        since the install and the files generated by the install are present.
+        """
+        marker = os.path.join(package.directory(), "conaninfo.txt")
+        return os.path.exists(marker) and file_digest(package.conanfile()) == step["conanfile"]
+
+    def impact(self, package_name):
+        """
+        Return the names of the packages that are affected by a change of the given package:
+        the package itself and the packages that depend on it, in rebuild order.
+        """
+        if (not self.has_package(package_name)):
+            raise Exception("The workspace does not have a package named " + package_name)
+        affected_names = self.reachability.affected([package_name])
+        return [name for name in self.reversed_package_name_order() if name in affected_names]
+
+    def changed_package_names(self):
+        """
+        Return the names of the editable packages that have local changes or whose
+        revision differs from the revision that is pinned in the workspace. The lockfile
+        cannot pin the revision of the main package that contains it, so the main package
+        only changed if it has local changes.
+        """
+        return [package.name for package in self.packages() if package.is_downloaded() and package.is_editable() and
+                ((package.name != self.main and package.git.revision() != package.main_revision()) or package.git.is_dirty())]
+
+    def peg_plan(self, incremental = False):
+        """
+        Return the names of the packages that are pegged and installed by a peg,
+        in the order in which they are pegged.
+
+        A full peg handles all downloaded editable packages. An incremental peg handles
+        only the packages that changed and the editable packages that depend on them.
+        """
+        package_names = set(package.name for package in self.packages() if package.is_downloaded() and package.is_editable())
+        if incremental:
+            package_names = package_names & self.reachability.affected(self.changed_package_names())
+        return [package_name for package_name in self.reversed_package_name_order() if package_name in package_names]
+
+    def install_digest(self, package):
+        """
+        Return the digest of the inputs of conan install for the given package: its conanfile
+        and lockfile, the references of its dependencies and the editables they resolve to,
+        and the Conan profile and settings.
+        """
+        digest = Digest()
+        digest.add_file('conanfile', package.conanfile())
+        digest.add_file('lockfile', os.path.join(package.directory(), "conan.lock"))
+        digest.add_file('profile', os.path.join(conan_home(), "profiles", "default"))
+        digest.add_file('settings', os.path.join(conan_home(), "settings.yml"))
+        dependency_names = self.reachability.descendants(package.name)
+        for dependency_name in sorted(dependency_names):
+            digest.add('dependency', self.main_references[dependency_name])
+        for key, value in sorted(self.editable_packages_dictionary().items()):
+            if PackageReference.from_string(key).name in dependency_names:
+                digest.add('editable', key)
+                digest.add('path', value["path"])
+                digest.add('layout', value["layout"])
+        return digest.hexdigest()
+
+    def build_digest(self, package, dependency_digests):
+        """
+        Return the digest of the inputs of conan build for the given package: the inputs of its
+        install, its sources including the changes that are not committed, and the build digests
+        of the given dictionary for the editable packages on which it depends.
+        """
+        digest = Digest()
+        digest.add('install', self.install_digest(package))
+        digest.add('sources', package.git.source_tree())
+        for dependency_name in sorted(self.reachability.descendants(package.name)):
+            if dependency_name in dependency_digests:
+                digest.add(dependency_name, dependency_digests[dependency_name])
+        return digest.hexdigest()
+
+    def install(self, package, force = False):
+        """
+        Run conan install for the given package, unless the inputs of the install are unchanged
+        since the last successful install of the package and force is false.
+        Return whether conan install was run.
+        """
+        digest = self.install_digest(package)
+        marker = os.path.join(package.directory(), "conaninfo.txt")
+        if not force and os.path.exists(marker) and self.install_cache.is_current(package.name, digest):
+            self.count_install(skipped=True)
+            return False
+        succeeded = self.conan.install(package.directory())
+        self.count_install(skipped=False)
+        if not succeeded:
+            self.install_cache.forget(package.name)
+            raise Exception('Conan install failed for package %s.' % package.name)
+        self.install_cache.record(package.name, digest)
+        return True
+
+    def reset_install_counts(self):
+        with self.install_count_lock:
+            self.run_installs = 0
+            self.skipped_installs = 0
+
+    def count_install(self, skipped):
+        with self.install_count_lock:
+            if skipped:
+                self.skipped_installs += 1
+            else:
+                self.run_installs += 1
+
+    def print_install_report(self):
+        total = self.run_installs + self.skipped_installs
+        if total > 0:
+            print('Skipped %d of %d conan installs because their inputs did not change.' % (self.skipped_installs, total))
+
+    @recorded('peg')
+    @in_operation
+    def peg(self, commit_message = None, resume = False, incremental = False, dry_run = False, force_install = False):
+        """
+        Peg the revisions of the editable packages and install the editable packages again.
+        If incremental is true, only the changed packages and the packages that depend on them
+        are pegged. If dry_run is true, the packages that would be pegged are printed
+        and nothing is changed. Installs of which the inputs did not change are skipped
+        unless force_install is true.
+
+        The completed steps are recorded in a journal in the workspace root. If a peg fails,
+        it can be resumed, and the steps that were completed and are still valid are skipped.
+        """
         if commit_message and len(commit_message) == 0:
             commit_message = None
-        packages = self.packages()
-        # The packages will update their editables before install is ran on the main package.
-        # That means that we have to check for editability beforehand. Otherwise, we can't figure
-        # out on which packages to run conan install afterwards.
-        editable_packages_names = [package.name for package in packages if package.is_downloaded() and package.is_editable()]
-        for package in packages:
-            if package.is_editable() and not package.has_valid_revision():
-                raise Exception('Package %s does not have a valid revision.' % package.name)
-        if not commit_message:
+        journal = self.peg_journal()
+        if resume:
+            if not journal.exists():
+                raise Exception('There is no interrupted peg to resume.')
+            journal = PegJournal.load(journal.path)
+            commit_message = commit_message or journal.commit_message
+            # The packages will update their editables before install is ran on the main package.
+            # That means that the packages to peg were determined when the peg was started.
+            package_names = journal.editable_package_names
+        else:
+            package_names = self.peg_plan(incremental)
+        if dry_run:
+            self.history.current.operation = 'peg --dry-run'
+            print('Packages affected by the peg (%d of %d): %s' % (len(package_names), self.graph.number_of_nodes(), ', '.join(package_names)))
+            return
+        if not resume and journal.exists():
+            print("Discarding the journal of an interrupted peg.")
+
+        packages = [self.package(package_name) for package_name in package_names]
+        with self.history.phase('check'):
             for package in packages:
-                if package.git.is_dirty():
-                    raise Exception('Package %s has local changes. Peg is not allowed without a commit message.' % package.name)
-
-        for package_name in self.reversed_package_name_order():
-            self.peg_package(package_name, commit_message if package.git.is_dirty() else None)
+                if package.is_editable() and not package.has_valid_revision():
+                    raise Exception('Package %s does not have a valid revision.' % package.name)
+            if not commit_message:
+                for package in packages:
+                    # The changes of a resumed peg are committed with the default message.
+                    if package.git.is_dirty() and not (resume and journal.has_changed(package.name)):
+                        raise Exception('Package %s has local changes. Peg is not allowed without a commit message.' % package.name)
+        if not resume:
+            journal.start(package_names, commit_message)
+
+        with self.history.phase('peg'):
+            for package in packages:
+                if package.name == self.main:
+                    # Update the lockfile before the main package is pegged, such that it is committed along.
+                    self.update_lock(journal)
+                self.peg_package(package.name, commit_message if package.git.is_dirty() else None, journal)
+            self.update_lock(journal)
         # We install the packages again after changing all of the dependencies to
         # avoid doing it a quadratic number of times.
-        for package_name in self.reversed_package_name_order():
-            package = self.package(package_name)
-            if package_name in editable_packages_names:
-                subprocess.run(['conan', 'install', '.'], cwd=package.directory())
-        # In case the workspace object is kept alive, we update the graph.
-        self.update_graph()
-
-    def download(self, package_name):
+        with self.history.phase('install'):
+            for package in packages:
+                step = journal.step(install_step(package.name))
+                if step and self.is_valid_install_step(package, step):
+                    continue
+                try:
+                    self.install(package, force_install)
+                except Exception as error:
+                    raise Exception(str(error) + ' Use peg --resume to continue the peg.')
+                journal.record(install_step(package.name), conanfile=file_digest(package.conanfile()))
+        journal.finish()
+        self.print_install_report()
+        with self.history.phase('check'):
+            from workspace.grep import check_pins
+            for message in check_pins(self):
+                print('Warning: ' + message)
+
+    @recorded('download')
+    @in_operation
+    def download(self, package_name, force_install = False):
         package = self.package(package_name)
         if not os.path.exists(os.path.join(package.directory(), ".git")):
-            repo = self.git_prefix + package_name + self.git_suffix
-            print("Cloning repository " + repo)
-            subprocess.run(['git', 'clone', repo, package_name], stdout=subprocess.PIPE, cwd=self.root)
-            main_branch = self.package(self.main).git.branch()
-            if main_branch :
-                local_package_branches = package.git.local_branches()
-                if main_branch in local_package_branches:
-                    package.git.checkout_branch(main_branch)
+            with self.history.phase('clone'):
+                repo = self.git_prefix + package_name + self.git_suffix
+                print("Cloning repository " + repo)
+                process.run(['git', 'clone', repo, package_name], stdout=subprocess.PIPE, cwd=self.root, timeouts=self.timeouts)
+                package.git.changed()
+                main_branch = self.package(self.main).git.branch()
+                if main_branch :
+                    local_package_branches = package.git.local_branches()
+                    if main_branch in local_package_branches:
+                        package.git.checkout_branch(main_branch)
+                    else:
+                        package.git.checkout(package.main_revision())
+                        package.git.create_branch(main_branch)
                 else:
                     package.git.checkout(package.main_revision())
-                    package.git.create_branch(main_branch)
-            else:
-                package.git.checkout(package.main_revision())
-            subprocess.run([ 'conan', 'install', '.' ], cwd=package.directory())
-            subprocess.run([ 'conan', 'source', '.' ], cwd=package.directory())
+            with self.history.phase('install'):
+                if not self.install(package, force_install):
+                    print('Skipped conan install of %s because its inputs did not change.' % package_name)
+            with self.history.phase('source'):
+                self.conan.source(package.directory())
             package.edit()
 
-    def fetch(self):
+    def fetch_configuration(self):
+        """
+        Return the fetch configuration of workspace.yml with the defaults filled in:
+        the mode, which is 'targeted' or 'full', and the stable branches.
+        """
+        configuration = dict(self.yaml["fetch"]) if self.yaml and self.yaml.get("fetch") else {}
+        configuration.setdefault("mode", "targeted")
+        configuration.setdefault("stable_branches", ["master", "main", "develop"])
+        if configuration["mode"] not in ("targeted", "full"):
+            raise Exception('The fetch mode in workspace.yml must be targeted or full.')
+        return configuration
+
+    @recorded('fetch')
+    @in_operation
+    def fetch(self, full = False):
+        """
+        Fetch the editable packages. A targeted fetch only fetches the branch of the main
+        package, the stable branches and the main revision of every package.
+        A full fetch fetches all branches and tags of all remotes.
+        Raise an exception with the packages that could not be fetched, after all packages were fetched.
+        """
+        configuration = self.fetch_configuration()
+        full = full or configuration["mode"] == "full"
+        branch = self.package(self.main).git.branch()
+        branch_names = ([branch] if branch else []) + [name for name in configuration["stable_branches"] if name != branch]
+        failures = []
         for package in self.packages():
             if package.is_downloaded() and package.is_editable():
-                package.git.fetch()
-
+                try:
+                    if full:
+                        succeeded = package.git.fetch()
+                    else:
+                        succeeded = package.git.fetch_branches(branch_names, package.main_revision())
+                    if not succeeded:
+                        failures.append(package.name)
+                except Exception as error:
+                    print(str(error))
+                    failures.append(package.name)
+        if failures:
+            raise Exception('Could not fetch the packages %s.' % ', '.join(failures))
+
+    @recorded('push')
+    @in_operation
     def push(self):
         for package in self.packages():
             if package.is_downloaded() and package.is_editable():
                 package.git.push()
 
+    @in_operation
     def create_branch(self, branch_name):
         for package in self.packages():
             if package.is_downloaded() and package.is_editable():
                 package.git.create_branch(branch_name)
 
+    @in_operation
+    def status(self, include_dirty = True):
+        """
+        Return the status of every package in topological order as a dictionary with
+        the name, the main reference, and whether the package is downloaded and editable.
+        For downloaded packages it also contains the branch, the revision, whether the
+        revision is valid and, if include_dirty is true, whether there are local changes.
+        """
+        editables = self.editables()
+        result = []
+        for package_name in self.package_name_order():
+            package = self.package(package_name)
+            status = {
+                "name": package_name,
+                "reference": package.main_reference().to_string(),
+                "downloaded": package.is_downloaded(),
+                "editable": package_name in editables
+            }
+            if status["downloaded"]:
+                status["branch"] = package.git.branch()
+                status["revision"] = package.git.revision()
+                status["valid"] = package.has_valid_revision()
+                if include_dirty:
+                    status["dirty"] = package.git.is_dirty()
+            result.append(status)
+        return result
+
     def editable_packages(self):
         return [self.package(name) for name in self.editables()]
 
+    def editable_packages_dictionary(self):
+        """
+        Return the editable packages that are registered in Conan, regardless of
+        the workspace, as a dictionary from reference strings to their path and layout.
+        """
+        return self.conan.editables()
+
     def editables(self):
         """ Return the editables of this workspace. """
+        return self.scope.memoized((ScopedConan.subject, 'workspace'), self.read_editables)
+
+    def read_editables(self):
         result = {}
-        editable_packages_file = os.path.join(Path.home(), ".conan", "editable_packages.json")
-        if (os.path.exists(editable_packages_file)):
-            with open(editable_packages_file) as json_file:
-                editables_dictionary = json.load(json_file)
-                for key, value in editables_dictionary.items():
-                    package_reference = PackageReference.from_string(key)
-                    if (self.has_package(package_reference.name)):
-                        pkg = self.package(package_reference.name)
-                        if (pkg.main_semantic_version() ==  package_reference.semantic_version and pkg.main_revision() == package_reference.revision and pkg.main_user() == package_reference.user and pkg.main_channel() == package_reference.channel):
-                            result[pkg.name] = Editable(pkg.main_reference(), value["path"], value["layout"])
+        for key, value in self.editable_packages_dictionary().items():
+            package_reference = PackageReference.from_string(key)
+            if (self.has_package(package_reference.name)):
+                pkg = self.package(package_reference.name)
+                if (pkg.main_semantic_version() ==  package_reference.semantic_version and pkg.main_revision() == package_reference.revision and pkg.main_user() == package_reference.user and pkg.main_channel() == package_reference.channel):
+                    result[pkg.name] = Editable(pkg.main_reference(), value["path"], value["layout"], self.conan)
         return result
 
-def main():
-    parser = argparse.ArgumentParser(description='Manage a feature branch workspace.')
-    subparsers = parser.add_subparsers(help='sub-command help', dest='command')
-    parser_peg = subparsers.add_parser('peg', help='peg the revision of a package or all packages')
-    parser_peg.add_argument('--push', action="store_true")
-
-    # Download
-    parser_download = subparsers.add_parser('download', help='download help')
-    parser_download.add_argument('package')
-    parser.add_argument('-m', '--main', type=str, required=False)
-
-    # Edit
-    parser_edit = subparsers.add_parser('edit', help='Make the specified packages editable. If no packages are provided, all packages in the workspace are made editable.')
-    parser_edit.add_argument('package', nargs='*')
-    parser_edit.add_argument('--actual', action="store_true")
-
-    # List
-    parser_list = subparsers.add_parser('list', help='List all packages in the workspace')
-    parser_list.add_argument('--revision', action="store_true")
-    parser_list.add_argument('--branch', action="store_true")
-    parser_list.add_argument('--branches', action="store_true")
-    parser_list.add_argument('--remote-branches', action="store_true")
-    parser_list.add_argument('--upstream', action="store_true")
-    parser_list.add_argument('--remotes', action="store_true")
-
-    # Close
-    parser_close = subparsers.add_parser('close', help='Remove the editable for the specified packages. If not packages are provided, the editable is removed for all packages in the workspace.')
-    parser_close.add_argument('package', nargs='*')
-
-    args = parser.parse_args()
+def run(args):
+    """
+    Run the command of the given command line arguments in this process.
+    """
+    if (args.command == 'restore'):
+        from workspace.snapshot import restore_snapshot
+        with open(args.snapshot) as json_file:
+            restore_snapshot(os.getcwd(), json.load(json_file), args.jobs, args.force_install)
+        return
+    if (args.command == 'status' and args.roots):
+        from workspace.multistatus import multi_status, print_summaries
+        print_summaries(multi_status(args.roots, args.jobs), args.json)
+        return
     workspace = Workspace(args.main, os.getcwd())
 
     if (args.command == 'peg'):
-        workspace.peg()
-        if (args.push):
+        workspace.peg(resume=args.resume, incremental=args.incremental, dry_run=args.dry_run, force_install=args.force_install)
+        if (args.push and not args.dry_run):
             for package_name in workspace.reversed_package_name_order():
                 package = workspace.package(package_name)
                 package.git.push()
 
     elif (args.command == 'download'):
-        workspace.download(args.package)
+        workspace.download(args.package, args.force_install)
         workspace.package(args.package).edit()
+    elif (args.command == 'snapshot'):
+        from workspace.snapshot import create_snapshot
+        print(json.dumps(create_snapshot(workspace), indent=4))
+    elif (args.command == 'foreach'):
+        from workspace.foreach import foreach, exit_status, print_summary
+        command = args.cmd[1:] if args.cmd and args.cmd[0] == '--' else args.cmd
+        if not command:
+            raise Exception('No command given. Use workspace foreach -- COMMAND.')
+        results = foreach(workspace, command, args.editable, args.topo, args.jobs, args.group, args.timeout)
+        print_summary(results, workspace.reversed_package_name_order())
+        sys.exit(exit_status(results))
+    elif (args.command == 'build'):
+        from workspace.build import build, print_build_summary
+        results = build(workspace, args.jobs, args.force)
+        print_build_summary(results, workspace.reversed_package_name_order())
+        workspace.print_install_report()
+        if not all(result.succeeded for result in results.values()):
+            sys.exit(1)
+    elif (args.command == 'grep'):
+        from workspace.grep import grep, print_match
+        matches = grep(workspace, [args.pattern], args.conanfiles_only, args.related, args.ignore_case, args.fixed_strings, args.jobs, print_match)
+        if not matches:
+            sys.exit(1)
+    elif (args.command == 'fetch'):
+        workspace.fetch(args.full)
     elif (args.command == 'edit'):
         if not args.package:
             workspace.edit(args.actual)
@@ -264,37 +618,32 @@ def main():
             for package_name in args.package:
                 workspace.package(package_name).edit(args.actual)
     elif (args.command == 'list'):
-        for package_name in workspace.package_name_order():
-            package = workspace.package(package_name)
-            reference_string = package.main_reference().to_string()
-            msg = reference_string
-
-            if args.revision:
-                sequence_in_branch = package.git.sequence_in_branch()
-                revision_string = package.git.revision()
-                msg = msg + " : " + str(sequence_in_branch) + ' : ' + revision_string
-            if args.branch and not args.branches:
-                branch_name = package.git.branch()
-                if branch_name:
-                    msg = msg + " : " + branch_name
-                else:
-                    msg = msg + " is detached"
-            if args.branches:
-                msg = append_branches_message(package.git.current_branches(), msg)
-            if args.remote_branches:
-                msg = append_branches_message(package.git.remote_branches(), msg)
-            if args.upstream:
-                upstream_branch_name = package.git.upstream_branch()
-                if (upstream_branch_name):
-                    msg = msg + " : " + upstream_branch_name
-                else:
-                    msg = msg + " has no upstream branch"
-            if args.remotes:
-                remotes = package.git.remotes()
-                msg = msg + " : " + (". ".join(remotes))
-
-
+        with workspace.history.record('list', workspace.graph.number_of_nodes()):
+            messages = list_messages(workspace, args.revision, args.branch, args.branches, args.remote_branches, args.upstream, args.remotes)
+        for msg in messages:
             print(msg)
+    elif (args.command == 'status'):
+        with workspace.history.record('status', workspace.graph.number_of_nodes()):
+            statuses = workspace.status()
+        print_status(statuses, args.json)
+    elif (args.command == 'stats'):
+        print_statistics(workspace.history.statistics(args.operation, args.window))
+    elif (args.command == 'impact'):
+        affected_names = workspace.impact(args.package)
+        print('Packages affected by a change of %s (%d of %d):' % (args.package, len(affected_names), workspace.graph.number_of_nodes()))
+        if args.levels:
+            levels = workspace.reachability.levels(affected_names)
+            for level in range(max(levels.values()) + 1):
+                print('Level ' + str(level) + ' : ' + ', '.join(name for name in affected_names if levels[name] == level))
+        else:
+            for name in affected_names:
+                print(name)
+        if args.critical_path:
+            critical_path = workspace.reachability.critical_path(affected_names)
+            print('Critical path (%d packages): %s' % (len(critical_path), ' -> '.join(critical_path)))
+    elif (args.command == 'serve'):
+        from workspace.daemon import WorkspaceDaemon
+        WorkspaceDaemon(workspace, args.interval).serve()
     elif (args.command == 'close'):
         if not args.package:
             workspace.close()
@@ -305,6 +654,72 @@ def main():
         ui = UI(workspace)
         ui.run()
 
+def detect_main(root):
+    """
+    Return the name of the package in the given directory with the largest conan.lock file,
+    or None if no package has one.
+    """
+    main = None
+    max_size = 0
+    with os.scandir(root) as dirs:
+        for entry in dirs:
+            if (entry.is_dir() and os.path.exists(os.path.join(entry.path, "conan.lock"))):
+                size = os.path.getsize(os.path.join(entry.path, "conan.lock"))
+                if (size > max_size) :
+                    max_size = size
+                    main = entry.name
+    return main
+
+def requirement_regex(package_name):
+    """
+    Return the regular expression that matches a requirement of the given package in a conanfile.
+    The groups are those of requirement_pattern.
+    """
+    return re.compile(requirement_pattern % re.escape(package_name))
+
+def file_digest(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+def list_messages(workspace, revision = False, branch = False, branches = False, remote_branches = False, upstream = False, remotes = False):
+    """
+    Return the lines that are printed by the list command, one for every package in topological order.
+    """
+    result = []
+    for package_name in workspace.package_name_order():
+        package = workspace.package(package_name)
+        reference_string = package.main_reference().to_string()
+        msg = reference_string
+        if not package.is_downloaded():
+            result.append(msg + " is not downloaded")
+            continue
+
+        if revision:
+            sequence_in_branch = package.git.sequence_in_branch()
+            revision_string = package.git.revision()
+            msg = msg + " : " + str(sequence_in_branch) + ' : ' + revision_string
+        if branch and not branches:
+            branch_name = package.git.branch()
+            if branch_name:
+                msg = msg + " : " + branch_name
+            else:
+                msg = msg + " is detached"
+        if branches:
+            msg = append_branches_message(package.git.current_branches(), msg)
+        if remote_branches:
+            msg = append_branches_message(package.git.remote_branches(), msg)
+        if upstream:
+            upstream_branch_name = package.git.upstream_branch()
+            if (upstream_branch_name):
+                msg = msg + " : " + upstream_branch_name
+            else:
+                msg = msg + " has no upstream branch"
+        if remotes:
+            remote_names = package.git.remotes()
+            msg = msg + " : " + (". ".join(remote_names))
+        result.append(msg)
+    return result
+
 def append_branches_message(branches, msg):
     if len(branches) == 0:
         result = msg + ' is detached'
@@ -312,42 +727,6 @@ def append_branches_message(branches, msg):
         result = msg + ' : ' + (', '.join(branches))
     return result
 
-class PackageDescriptor:
-    def __init__(self, value):
-        if ("requires" in value):
-            self.deps = value["requires"]
-        else:
-            self.deps = []
-        self.package_reference = PackageReference.from_string(value["ref"])
-
-    @property
-    def name(self):
-        return self.package_reference.name
-
-    @property
-    def semantic_version(self):
-        return self.package_reference.semantic_version
-
-    @property
-    def sequence_in_branch(self):
-        return self.package_reference.sequence_in_branch
-
-    @property
-    def revision(self):
-        return self.package_reference.revision
-
-    @property
-    def user(self):
-        return self.package_reference.user
-
-    @property
-    def channel(self):
-        return self.package_reference.channel
-
-    @property
-    def dependencies(self):
-        return [] + self.deps
-
-
 if __name__ == '__main__':
+    # The entry point of the workspace command is workspace.client.main.
     main()